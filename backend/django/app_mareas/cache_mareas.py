@@ -0,0 +1,303 @@
+# ================================================================
+# Formato de los archivos de cache de mareas (job <-> vistas)
+#
+# Propósito: definir en un solo lugar cómo se codifica, valida y
+#            comprime el payload que sirven las vistas, para que el job
+#            lo calcule al escribir y las vistas solo lo lean.
+#
+# Formatos por estación (MAREA_FORMATOS_CACHE elige los adicionales):
+#   - marea_<estacion_id>.json       filas legibles (se sirve minificado)
+#   - marea_<estacion_id>.col.json   columnar minificado: un array por campo
+#   - marea_<estacion_id>.msgpack    columnar en MessagePack (si está instalado)
+#
+# Resoluciones (cada una en los mismos formatos, p. ej. marea_<id>.3h.col.json):
+#   - horaria   marea_<estacion_id>.json          serie completa
+#   - 3h        marea_<estacion_id>.3h.json       bloques de 3 h (paso del SMN)
+#   - diaria    marea_<estacion_id>.diaria.json   máxima/mínima del día con hora
+#
+# Extremos: marea_<estacion_id>.extremos.json (pleamares/bajamares; solo JSON)
+#
+# Sidecars de cada archivo servido (p. ej. marea_<estacion_id>.json.gz):
+#   - <archivo>.gz / <archivo>.br    payload comprimido (brotli si está instalado)
+#   - <archivo>.meta                 ETag fuerte + firma del archivo de origen
+#
+# Escritura atómica: cada archivo se escribe en un temporal del mismo
+# directorio, se hace fsync y se renombra encima (os.replace). Un lector
+# ve la versión anterior completa o la nueva completa, nunca una parcial.
+# manifest.json registra la generación de cada refresco y el ETag vigente
+# por estación. MAREA_FSYNC=0 omite los fsync (desarrollo).
+# MAREA_MODO_ARCHIVO (octal, 644) fija los permisos de lo publicado; se
+# aplican con fchmod sobre el temporal, sin tocar el umask del proceso.
+#
+# Sin dependencias de Django ni pandas: importable desde el job y las vistas.
+# ================================================================
+
+"""
+Codificación, validadores y variantes comprimidas del payload de cache.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+try:
+    import brotli  # opcional
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack  # opcional
+except ImportError:
+    msgpack = None
+
+# Codificaciones precomputadas en orden de preferencia
+CODIFICACIONES = ("br", "gzip") if brotli else ("gzip",)
+EXTENSION = {"br": ".br", "gzip": ".gz"}
+
+MANIFIESTO = "manifest.json"
+FSYNC = os.getenv("MAREA_FSYNC", "1") != "0"
+
+# mkstemp crea con 0600; los archivos publicados se leen desde otros procesos
+MODO_ARCHIVO = int(os.getenv("MAREA_MODO_ARCHIVO", "644"), 8)
+
+# Formatos de payload: sufijo del archivo y content-type
+FORMATOS = {
+    "json": (".json", "application/json"),
+    "columnar": (".col.json", "application/json"),
+    "msgpack": (".msgpack", "application/x-msgpack"),
+}
+FORMATOS_ADICIONALES = [
+    f.strip() for f in os.getenv("MAREA_FORMATOS_CACHE", "columnar,msgpack").split(",")
+    if f.strip() in FORMATOS and f.strip() != "json"
+]
+
+
+def directorio_cache() -> Path:
+    """Devolver directorio de cache según entorno (Railway vs local)."""
+    if os.environ.get("RAILWAY_ENVIRONMENT"):
+        return Path("/app/marea/cache")  # Producción (Railway)
+    return Path(__file__).resolve().parents[1] / "marea" / "cache"  # Desarrollo local
+
+
+# Resoluciones publicadas: infijo del archivo
+RESOLUCIONES = {
+    "horaria": "",
+    "3h": ".3h",
+    "diaria": ".diaria",
+}
+
+
+def archivo_estacion(cache_dir: Path, estacion_id: str, formato: str = "json",
+                     resolucion: str = "horaria") -> Path:
+    """Ruta del archivo de cache de la estación en el formato y resolución indicados."""
+    return Path(cache_dir) / (
+        f"marea_{estacion_id}{RESOLUCIONES[resolucion]}{FORMATOS[formato][0]}")
+
+
+def archivo_extremos(cache_dir: Path, estacion_id: str) -> Path:
+    """Ruta del archivo de pleamares/bajamares de la estación."""
+    return Path(cache_dir) / f"marea_{estacion_id}.extremos.json"
+
+# ===============================
+# Codificación y validadores
+# ===============================
+
+
+def codificar_compacto(datos) -> bytes:
+    """Serializar a JSON minificado en UTF-8."""
+    return json.dumps(datos, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def calcular_etag(cuerpo: bytes) -> str:
+    """Calcular ETag fuerte (entre comillas) a partir del cuerpo."""
+    return '"' + hashlib.sha256(cuerpo).hexdigest()[:32] + '"'
+
+
+def comprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    """Comprimir el cuerpo con gzip o brotli."""
+    if codificacion == "br":
+        return brotli.compress(cuerpo)
+    # mtime=0 para que el mismo cuerpo produzca siempre los mismos bytes
+    return gzip.compress(cuerpo, compresslevel=9, mtime=0)
+
+
+def a_columnar(datos: dict) -> dict:
+    """Pasar "datos" de lista de filas a un array por campo (resto sin cambios)."""
+    filas = datos.get("datos") or []
+    campos = list(filas[0]) if filas else []
+    salida = dict(datos)
+    salida["datos"] = {c: [fila.get(c) for fila in filas] for c in campos}
+    return salida
+
+
+def variantes(cuerpo: bytes) -> dict:
+    """Devolver {codificación: bytes} para todas las codificaciones disponibles."""
+    return {c: comprimir(cuerpo, c) for c in CODIFICACIONES}
+
+
+def _firma(ruta: Path) -> list:
+    """Firma del archivo (mtime_ns, tamaño) para validar los sidecars."""
+    st = os.stat(ruta)
+    return [st.st_mtime_ns, st.st_size]
+
+
+# ===============================
+# Escritura (job)
+# ===============================
+
+
+def _fsync_directorio(directorio: Path) -> None:
+    """Persistir el rename en el directorio (no disponible en Windows)."""
+    try:
+        fd = os.open(directorio, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def escribir_atomico(ruta: Path, contenido: bytes) -> None:
+    """Escribir en un temporal junto a `ruta`, fsync y renombrar encima."""
+    ruta = Path(ruta)
+    fd, tmp = tempfile.mkstemp(dir=ruta.parent, prefix=f".{ruta.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(f.fileno(), MODO_ARCHIVO)
+            f.write(contenido)
+            if FSYNC:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, ruta)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if FSYNC:
+        _fsync_directorio(ruta.parent)
+
+
+def _escribir_sidecars(ruta: Path, cuerpo: bytes) -> dict:
+    """Escribir variantes comprimidas y <ruta>.meta para el cuerpo servido."""
+    meta = {
+        "etag": calcular_etag(cuerpo),
+        "bytes": len(cuerpo),
+        "codificaciones": {},
+    }
+    for codificacion, comprimido in variantes(cuerpo).items():
+        escribir_atomico(Path(str(ruta) + EXTENSION[codificacion]), comprimido)
+        meta["codificaciones"][codificacion] = len(comprimido)
+
+    # La firma se toma al final y el .meta se publica último: mientras no
+    # coincida con el archivo de origen, las vistas ignoran los sidecars
+    meta["fuente"] = _firma(ruta)
+    escribir_atomico(Path(str(ruta) + ".meta"), json.dumps(meta).encode("utf-8"))
+    return meta
+
+
+def escribir_cache(ruta: Path, datos, formatos: Optional[list] = None) -> dict:
+    """Escribir JSON legible y los formatos adicionales, cada uno con sidecars.
+
+    `ruta` es el marea_<estacion>.json; los otros formatos van a su lado.
+    Devuelve {formato: meta}.
+    """
+    formatos = FORMATOS_ADICIONALES if formatos is None else formatos
+    legible = json.dumps(datos, indent=2, ensure_ascii=False)
+    escribir_atomico(ruta, legible.encode("utf-8"))
+    metas = {"json": _escribir_sidecars(ruta, codificar_compacto(datos))}
+
+    columnar = a_columnar(datos) if formatos else None
+    for formato in formatos:
+        if formato == "msgpack" and msgpack is None:
+            continue
+        if formato == "msgpack":
+            cuerpo = msgpack.packb(columnar, use_bin_type=True)
+        else:
+            cuerpo = codificar_compacto(columnar)
+        destino = Path(str(ruta)[:-len(".json")] + FORMATOS[formato][0])
+        escribir_atomico(destino, cuerpo)
+        metas[formato] = _escribir_sidecars(destino, cuerpo)
+    return metas
+
+
+def escribir_manifiesto(cache_dir: Path, estaciones: list) -> dict:
+    """Publicar una nueva generación del cache.
+
+    Registra el ETag vigente de cada resolución y formato de las estaciones
+    refrescadas (tomado de sus .meta); las demás conservan su entrada anterior.
+    """
+    previo = leer_manifiesto(cache_dir)
+    ahora = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    entradas = dict(previo.get("estaciones", {}))
+    for estacion_id in estaciones:
+        etags = {}
+        for resolucion in RESOLUCIONES:
+            for formato in FORMATOS:
+                ruta = archivo_estacion(cache_dir, estacion_id, formato, resolucion)
+                try:
+                    meta = leer_meta(ruta, _firma(ruta))
+                except OSError:
+                    continue
+                if meta:
+                    etags.setdefault(resolucion, {})[formato] = meta["etag"]
+        ruta = archivo_extremos(cache_dir, estacion_id)
+        try:
+            meta = leer_meta(ruta, _firma(ruta))
+        except OSError:
+            meta = None
+        if meta:
+            etags["extremos"] = meta["etag"]
+        entradas[estacion_id] = {"etags": etags, "actualizado": ahora}
+    manifiesto = {
+        "generacion": int(previo.get("generacion", 0)) + 1,
+        "actualizado": ahora,
+        "estaciones": entradas,
+    }
+    escribir_atomico(Path(cache_dir) / MANIFIESTO,
+                     json.dumps(manifiesto, indent=2, ensure_ascii=False).encode("utf-8"))
+    return manifiesto
+
+
+# ===============================
+# Lectura (vistas)
+# ===============================
+
+
+def leer_manifiesto(cache_dir: Path) -> dict:
+    """Leer manifest.json ({} si no existe o está dañado)."""
+    try:
+        with open(Path(cache_dir) / MANIFIESTO, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def leer_meta(ruta: Path, firma: tuple) -> Optional[dict]:
+    """Leer <ruta>.meta si corresponde a la firma (mtime_ns, tamaño) dada."""
+    try:
+        with open(str(ruta) + ".meta", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("fuente") == list(firma) else None
+
+
+def leer_variante(ruta: Path, codificacion: str, tamano: int) -> Optional[bytes]:
+    """Leer el payload precomprimido si existe y tiene el tamaño esperado."""
+    try:
+        with open(str(ruta) + EXTENSION[codificacion], "rb") as f:
+            comprimido = f.read()
+    except OSError:
+        return None
+    return comprimido if len(comprimido) == tamano else None
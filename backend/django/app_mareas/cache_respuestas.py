@@ -0,0 +1,323 @@
+# ================================================================
+# Cache de respuestas en memoria (por worker)
+#
+# Propósito: evitar json.load + re-serialización en cada request de
+#            los archivos de cache que escribe el job de actualización.
+#
+# Funcionamiento:
+#   - Guarda el cuerpo ya codificado (bytes), su ETag fuerte y las
+#     variantes gzip/brotli por archivo.
+#   - Revalida con os.stat: si cambia mtime, inode o tamaño se recarga.
+#   - LRU acotado por cantidad de archivos (MAREA_CACHE_RESPUESTAS_MAX).
+#   - Contadores de aciertos, fallos y descartes.
+#   - Responde 304 ante If-None-Match / If-Modified-Since y elige la
+#     variante comprimida según Accept-Encoding.
+#   - Lotes (responder_lote): varias entradas en un solo objeto JSON,
+#     enviado por streaming a partir de los cuerpos ya codificados.
+#   - Archivos (responder_archivo): el archivo o su variante comprimida
+#     se envía desde disco con FileResponse, sin pasar por la memoria.
+# ================================================================
+
+"""
+Cache LRU de respuestas codificadas, invalidada por cambios en el archivo.
+"""
+
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from django.http import (
+    FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse)
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.text import compress_sequence
+
+from app_mareas.cache_mareas import (
+    EXTENSION, calcular_etag, codificar_compacto, leer_meta, leer_variante, variantes)
+
+# Segundos que clientes y proxies pueden reutilizar sin revalidar
+MAX_AGE = int(os.getenv("MAREA_CACHE_MAX_AGE", "300"))
+
+# ===============================
+# Carga de archivos
+# ===============================
+
+
+def cargar_json(archivo: Path, firma: tuple) -> tuple:
+    """Preparar (cuerpo minificado, ETag, variantes comprimidas) del archivo.
+
+    Si el job dejó <archivo>.meta para esta misma versión del archivo, se
+    reutilizan su ETag y sus variantes (el cuerpo sale de descomprimir el
+    gzip, sin parsear JSON). Si no, se calculan una vez aquí.
+    """
+    meta = leer_meta(archivo, (firma[0], firma[2]))
+    if meta:
+        precomp = {c: leer_variante(archivo, c, n)
+                   for c, n in meta.get("codificaciones", {}).items()}
+        if precomp.get("gzip") and all(precomp.values()):
+            cuerpo = gzip.decompress(precomp["gzip"])
+            if len(cuerpo) == meta["bytes"]:
+                return cuerpo, meta["etag"], precomp
+
+    with open(archivo, "r", encoding="utf-8") as f:
+        cuerpo = codificar_compacto(json.load(f))
+    return cuerpo, calcular_etag(cuerpo), variantes(cuerpo)
+
+
+def cargar_crudo(archivo: Path, firma: tuple) -> tuple:
+    """Como cargar_json, pero el archivo ya es el cuerpo a servir (columnar/binario)."""
+    with open(archivo, "rb") as f:
+        cuerpo = f.read()
+    meta = leer_meta(archivo, (firma[0], firma[2]))
+    if meta and meta["bytes"] == len(cuerpo):
+        precomp = {c: leer_variante(archivo, c, n)
+                   for c, n in meta.get("codificaciones", {}).items()}
+        if all(precomp.values()):
+            return cuerpo, meta["etag"], precomp
+    return cuerpo, calcular_etag(cuerpo), variantes(cuerpo)
+
+
+# ===============================
+# Cache
+# ===============================
+
+
+class EntradaRespuesta:
+    """Cuerpo codificado, ETag, variantes y firma (mtime, inode, tamaño) del origen."""
+
+    __slots__ = ("firma", "cuerpo", "etag", "variantes")
+
+    def __init__(self, firma: tuple, cuerpo: bytes, etag: str, variantes: dict):
+        self.firma = firma
+        self.cuerpo = cuerpo
+        self.etag = etag
+        self.variantes = variantes
+
+    @property
+    def mtime(self) -> float:
+        """Devolver mtime del archivo de origen en segundos."""
+        return self.firma[0] / 1e9
+
+
+class CacheRespuestas:
+    """LRU de respuestas codificadas por archivo, seguro entre hilos."""
+
+    def __init__(self, max_entradas: int = 64):
+        self.max_entradas = max(1, max_entradas)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+
+    def obtener(self, archivo: Path,
+                cargar: Callable[[Path, tuple], tuple] = cargar_json) -> EntradaRespuesta:
+        """Devolver la entrada del archivo, recodificándola si el archivo cambió.
+
+        Propaga FileNotFoundError si el archivo no existe.
+        """
+        st = os.stat(archivo)
+        firma = (st.st_mtime_ns, st.st_ino, st.st_size)
+        clave = str(archivo)
+
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada.firma == firma:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada
+            self.fallos += 1
+
+        # Cargar fuera del lock para no bloquear a otras estaciones
+        entrada = EntradaRespuesta(firma, *cargar(archivo, firma))
+
+        with self._lock:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.descartes += 1
+        return entrada
+
+    def estadisticas(self) -> dict:
+        """Devolver contadores y ocupación actual."""
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "descartes": self.descartes,
+                "bytes": sum(len(e.cuerpo) + sum(len(v) for v in e.variantes.values())
+                             for e in self._entradas.values()),
+            }
+
+
+# ===============================
+# Respuesta HTTP condicional
+# ===============================
+
+
+def _acepta(request, codificacion: str) -> bool:
+    """Indicar si Accept-Encoding admite la codificación (ignora q=0)."""
+    for parte in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        nombre, _, params = parte.partition(";")
+        if nombre.strip().lower() != codificacion:
+            continue
+        clave, _, q = params.partition("=")
+        try:
+            return clave.strip() != "q" or float(q) > 0
+        except ValueError:
+            return True
+    return False
+
+
+def _etag_coincide(request, etag: str) -> bool:
+    """Comparar If-None-Match con el ETag (comparación débil)."""
+    valor = request.META.get("HTTP_IF_NONE_MATCH")
+    if not valor:
+        return False
+    if valor.strip() == "*":
+        return True
+    candidatos = (c.strip() for c in valor.split(","))
+    return etag.removeprefix("W/") in (c.removeprefix("W/") for c in candidatos)
+
+
+def _no_modificado(request, etag: str, mtime: int) -> bool:
+    """Evaluar If-None-Match (o, si no viene, If-Modified-Since)."""
+    if "HTTP_IF_NONE_MATCH" in request.META:
+        return _etag_coincide(request, etag)
+    desde = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    return desde is not None and desde >= mtime
+
+
+def _validadores(resp, etag: str, mtime: int, vary: str):
+    """Agregar ETag (si hay), Last-Modified, Cache-Control y Vary a la respuesta."""
+    if etag:
+        resp["ETag"] = etag
+    resp["Last-Modified"] = http_date(mtime)
+    resp["Cache-Control"] = f"public, max-age={MAX_AGE}"
+    resp["Vary"] = vary
+    return resp
+
+
+def responder(request, entrada: EntradaRespuesta,
+              content_type: str = "application/json",
+              vary: str = "Accept-Encoding") -> HttpResponse:
+    """Responder la entrada con validadores, 304 o la variante comprimida.
+
+    Cada variante tiene su propio ETag fuerte ("<hash>-gzip", "<hash>-br").
+    """
+    codificacion = next((c for c in entrada.variantes if _acepta(request, c)), None)
+    etag = entrada.etag if codificacion is None else f'{entrada.etag[:-1]}-{codificacion}"'
+    mtime = int(entrada.mtime)
+    no_modificado = _no_modificado(request, etag, mtime)
+
+    if no_modificado:
+        resp = HttpResponseNotModified()
+    elif codificacion is None:
+        resp = HttpResponse(entrada.cuerpo, content_type=content_type)
+    else:
+        resp = HttpResponse(entrada.variantes[codificacion], content_type=content_type)
+        resp["Content-Encoding"] = codificacion
+    if not no_modificado:
+        resp["Content-Length"] = str(len(resp.content))
+    return _validadores(resp, etag, mtime, vary)
+
+
+def responder_lote(request, entradas: dict, faltantes: list,
+                   content_type: str = "application/json",
+                   vary: str = "Accept-Encoding"):
+    """Responder {"estaciones": {clave: <cuerpo>, ...}, "faltantes": [...]}.
+
+    Los cuerpos (JSON ya codificado) se concatenan tal cual, sin parsear, y
+    se envían por streaming. El ETag combina los de cada entrada; con
+    Accept-Encoding gzip el lote se comprime al vuelo.
+    """
+    firmas = [[clave, e.etag] for clave, e in entradas.items()] + [faltantes]
+    etag = calcular_etag(json.dumps(firmas).encode("utf-8"))
+    gzip_ok = _acepta(request, "gzip")
+    if gzip_ok:
+        etag = f'{etag[:-1]}-gzip"'
+    mtime = int(max((e.mtime for e in entradas.values()), default=0))
+
+    if _no_modificado(request, etag, mtime):
+        return _validadores(HttpResponseNotModified(), etag, mtime, vary)
+
+    def _partes():
+        yield b'{"estaciones":{'
+        for i, (clave, entrada) in enumerate(entradas.items()):
+            yield (b"," if i else b"") + json.dumps(clave).encode("utf-8") + b":"
+            yield entrada.cuerpo
+        yield b'},"faltantes":' + json.dumps(faltantes).encode("utf-8") + b"}"
+
+    if gzip_ok:
+        resp = StreamingHttpResponse(compress_sequence(_partes()), content_type=content_type)
+        resp["Content-Encoding"] = "gzip"
+    else:
+        resp = StreamingHttpResponse(_partes(), content_type=content_type)
+    return _validadores(resp, etag, mtime, vary)
+
+
+def _abrir_variante(archivo: Path, codificacion: str, tamano: int):
+    """Abrir <archivo>.gz/.br si existe y tiene el tamaño del .meta (o None)."""
+    try:
+        variante = open(str(archivo) + EXTENSION[codificacion], "rb")
+    except OSError:
+        return None
+    if os.fstat(variante.fileno()).st_size != tamano:
+        variante.close()
+        return None
+    return variante
+
+
+def responder_archivo(request, archivo: Path,
+                      content_type: str = "application/json",
+                      vary: str = "Accept-Encoding"):
+    """Enviar el archivo desde disco con FileResponse (sendfile si el servidor lo admite).
+
+    Con un .meta vigente se usa su ETag y, si el cliente la acepta, la
+    variante comprimida escrita por el job. Si el archivo no es el cuerpo
+    del .meta (el JSON legible frente al minificado) el ETag es débil: el
+    contenido es equivalente, no idéntico. Propaga FileNotFoundError.
+    """
+    # Abrir antes de mirar la firma: si el job reemplaza el archivo, se
+    # sigue leyendo la versión abierta (os.replace no la modifica)
+    origen = cuerpo = open(archivo, "rb")
+    try:
+        st = os.fstat(origen.fileno())
+        mtime = int(st.st_mtime)
+        meta = leer_meta(archivo, (st.st_mtime_ns, st.st_size))
+        etag, codificacion = "", None
+        if meta:
+            etag = meta["etag"] if meta["bytes"] == st.st_size else f"W/{meta['etag']}"
+            for c, tamano in meta.get("codificaciones", {}).items():
+                variante = _acepta(request, c) and _abrir_variante(archivo, c, tamano)
+                if variante:
+                    cuerpo, codificacion = variante, c
+                    etag = f'{meta["etag"][:-1]}-{c}"'
+                    break
+
+        if _no_modificado(request, etag, mtime):
+            cuerpo.close()
+            resp = HttpResponseNotModified()
+        else:
+            resp = FileResponse(cuerpo, content_type=content_type)
+            resp.headers.pop("Content-Disposition", None)
+            if codificacion:
+                resp["Content-Encoding"] = codificacion
+    except BaseException:
+        cuerpo.close()
+        raise
+    finally:
+        if cuerpo is not origen:
+            origen.close()
+    return _validadores(resp, etag, mtime, vary)
+
+
+# Instancia compartida por las vistas del worker
+cache_respuestas = CacheRespuestas(
+    int(os.getenv("MAREA_CACHE_RESPUESTAS_MAX", "64")))
@@ -0,0 +1,212 @@
+# ================================================================
+# Histórico de alturas por estación (SQLite)
+#
+# Propósito: conservar las series que trae cada refresco (el JSON de
+#            cache solo cubre la ventana actual) y responder rangos de
+#            fechas sin volver a consultar al INA.
+#
+# Almacenamiento:
+#   - Archivo: <cache>/historico.sqlite3 (MAREA_HISTORICO_DB lo reemplaza)
+#   - Modo WAL: el job escribe mientras las vistas leen sin bloquearse.
+#   - Clave primaria (estacion, instante) en tabla WITHOUT ROWID: las
+#     filas de una estación quedan contiguas y ordenadas por tiempo, así
+#     un rango es una búsqueda en el índice + lectura secuencial.
+#   - instante = epoch en segundos (UTC); fecha/hora se guardan en hora
+#     local tal como se publican en el JSON.
+#   - Upsert: un refresco actualiza alturas; la meteo nueva reemplaza a
+#     la anterior solo si viene con valor.
+#
+# Sin dependencias de Django ni pandas: importable desde el job y las vistas.
+# ================================================================
+
+"""
+Almacén histórico de alturas con consultas por rango de tiempo.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Iterator, Optional
+from zoneinfo import ZoneInfo
+
+# Zona horaria de todas las series (índice temporal y fecha/hora del JSON)
+ZONA_HORARIA = "America/Argentina/Buenos_Aires"
+ZONA = ZoneInfo(ZONA_HORARIA)
+
+ARCHIVO = "historico.sqlite3"
+
+# Columnas publicadas por fila (mismo orden que el JSON de cache)
+COLUMNAS_ALTURA = ["altura_minima", "altura_maxima", "altura_promedio"]
+COLUMNAS_METEO = [
+    "temperatura",
+    "viento_direccion",
+    "viento_direccion_abreviatura",
+    "viento_direccion_nombre",
+    "viento_direccion_grados",
+    "viento_km_h",
+    "precipitacion_mm",
+]
+COLUMNAS = ["fecha", "hora"] + COLUMNAS_ALTURA + COLUMNAS_METEO
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS alturas (
+    estacion TEXT NOT NULL,
+    instante INTEGER NOT NULL,
+    fecha TEXT NOT NULL,
+    hora TEXT NOT NULL,
+    altura_minima REAL,
+    altura_maxima REAL,
+    altura_promedio REAL,
+    temperatura REAL,
+    viento_direccion REAL,
+    viento_direccion_abreviatura TEXT,
+    viento_direccion_nombre TEXT,
+    viento_direccion_grados REAL,
+    viento_km_h INTEGER,
+    precipitacion_mm REAL,
+    PRIMARY KEY (estacion, instante)
+) WITHOUT ROWID
+"""
+
+_UPSERT = (
+    f"INSERT INTO alturas (estacion, instante, {', '.join(COLUMNAS)}) "
+    f"VALUES ({', '.join('?' * (len(COLUMNAS) + 2))}) "
+    "ON CONFLICT (estacion, instante) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in ["fecha", "hora"] + COLUMNAS_ALTURA)
+    + ", "
+    + ", ".join(f"{c} = COALESCE(excluded.{c}, {c})" for c in COLUMNAS_METEO)
+)
+
+_RANGO = (
+    f"SELECT {', '.join(COLUMNAS)} FROM alturas "
+    "WHERE estacion = ? AND instante >= ? AND instante < ? ORDER BY instante"
+)
+
+
+def ruta_historico(cache_dir: Path) -> Path:
+    """Ruta de la base histórica (MAREA_HISTORICO_DB o <cache_dir>/historico.sqlite3)."""
+    return Path(os.getenv("MAREA_HISTORICO_DB") or Path(cache_dir) / ARCHIVO)
+
+
+# ===============================
+# Conversión de tiempos
+# ===============================
+
+
+def a_epoch(momento: datetime) -> int:
+    """Segundos desde epoch; un datetime sin zona se toma como hora local."""
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=ZONA)
+    return int(momento.timestamp())
+
+
+def a_iso(epoch: int) -> str:
+    """Epoch en segundos a ISO 8601 en hora local (con offset)."""
+    return datetime.fromtimestamp(epoch, ZONA).isoformat()
+
+
+def parsear_limite(texto: str, fin: bool = False) -> int:
+    """Interpretar "AAAA-MM-DD" o "AAAA-MM-DDTHH:MM[:SS][±hh:mm]" como epoch.
+
+    Una fecha sola como `fin` incluye el día completo (se toma el 00:00
+    del día siguiente, límite exclusivo). Lanza ValueError si no se entiende.
+    """
+    texto = texto.strip()
+    if len(texto) == 10:
+        dia = date.fromisoformat(texto)
+        if fin:
+            dia += timedelta(days=1)
+        return a_epoch(datetime.combine(dia, time()))
+    return a_epoch(datetime.fromisoformat(texto))
+
+
+# ===============================
+# Conexiones
+# ===============================
+
+_local = threading.local()
+
+
+def _conectar(ruta: Path) -> sqlite3.Connection:
+    """Abrir conexión con WAL y espera ante bloqueos, creando el esquema."""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    conexion = sqlite3.connect(ruta, timeout=10)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    conexion.execute(_ESQUEMA)
+    return conexion
+
+
+def _conexion_lectura(ruta: Path) -> Optional[sqlite3.Connection]:
+    """Conexión de solo lectura reutilizada por hilo (None si no hay base)."""
+    conexiones = getattr(_local, "conexiones", None)
+    if conexiones is None:
+        conexiones = _local.conexiones = {}
+    clave = str(ruta)
+    conexion = conexiones.get(clave)
+    if conexion is None:
+        if not ruta.exists():
+            return None
+        conexion = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True, timeout=10)
+        conexiones[clave] = conexion
+    return conexion
+
+
+# ===============================
+# Escritura (job)
+# ===============================
+
+
+def guardar_serie(ruta: Path, estacion: str, instantes: list, filas: list) -> int:
+    """Insertar o actualizar filas de una estación; devuelve cuántas se escribieron.
+
+    `instantes` son epoch en segundos, alineados con `filas` (dicts con
+    las claves de COLUMNAS, como en el JSON de cache).
+    """
+    valores = [
+        (estacion, int(instante), *(fila.get(c) for c in COLUMNAS))
+        for instante, fila in zip(instantes, filas)
+    ]
+    conexion = _conectar(Path(ruta))
+    try:
+        with conexion:
+            conexion.executemany(_UPSERT, valores)
+    finally:
+        conexion.close()
+    return len(valores)
+
+
+# ===============================
+# Lectura (vistas)
+# ===============================
+
+
+def consultar_rango(ruta: Path, estacion: str, desde: int, hasta: int) -> Optional[list]:
+    """Filas de la estación con desde <= instante < hasta, en orden temporal.
+
+    Devuelve None si todavía no existe la base histórica.
+    """
+    conexion = _conexion_lectura(Path(ruta))
+    if conexion is None:
+        return None
+    cursor = conexion.execute(_RANGO, (estacion, desde, hasta))
+    return [dict(zip(COLUMNAS, fila)) for fila in cursor]
+
+
+def iterar_rango(ruta: Path, estacion: str, desde: int, hasta: int,
+                 lote: int = 500) -> Iterator[list]:
+    """Como consultar_rango, pero en tandas de `lote` filas.
+
+    Usa una conexión propia que se abre al empezar a iterar (en el hilo que
+    consume la respuesta) y se cierra al terminar: la memoria no depende
+    del largo del rango. El llamador verifica antes que la base exista.
+    """
+    conexion = sqlite3.connect(f"file:{Path(ruta)}?mode=ro", uri=True, timeout=10)
+    try:
+        cursor = conexion.execute(_RANGO, (estacion, desde, hasta))
+        while filas := cursor.fetchmany(lote):
+            yield [dict(zip(COLUMNAS, fila)) for fila in filas]
+    finally:
+        conexion.close()
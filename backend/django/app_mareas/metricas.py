@@ -0,0 +1,211 @@
+# ================================================================
+# Métricas del servicio (tramos, contadores, formato Prometheus)
+#
+# Propósito: medir cada etapa del job (descarga SMN/INA, codificación,
+#            parseo, merge, escritura) y el tiempo de las vistas, y
+#            exponerlo en formato de texto Prometheus.
+#
+# Uso:
+#   with tramo("smn_parseo"):
+#       ...
+#   contar("marea_smn_total", resultado="304")
+#   @medir_vista("alturas")  (decorador de vistas Django)
+#
+# Notas:
+#   - Registro en memoria por proceso, seguro entre hilos.
+#   - Los tramos son histogramas marea_tramo_segundos{tramo=...}.
+#   - MAREA_PERFIL=<directorio> activa cProfile en perfilar(...) y deja
+#     un .prof por corrida (vacío = desactivado).
+#   - Sin dependencias de Django: importable desde el job y las vistas.
+# ================================================================
+
+"""
+Tramos con tiempo, contadores y exportación en formato Prometheus.
+"""
+
+import cProfile
+import functools
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Límites (s) de los histogramas; +Inf se agrega al exportar
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DIRECTORIO_PERFIL = os.getenv("MAREA_PERFIL", "")
+
+# ===============================
+# Registro
+# ===============================
+
+
+def _clave(etiquetas: dict) -> tuple:
+    """Etiquetas como tupla ordenada (clave de la serie)."""
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _etiquetas(clave: tuple, extra: tuple = ()) -> str:
+    """Formatear {k="v",...} escapando comillas, barras y saltos de línea."""
+    pares = clave + extra
+    if not pares:
+        return ""
+    texto = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pares)
+    return "{" + texto + "}"
+
+
+class Registro:
+    """Contadores, valores instantáneos e histogramas por nombre y etiquetas."""
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._contadores = {}    # nombre -> {clave: valor}
+        self._valores = {}       # nombre -> {clave: valor}
+        self._histogramas = {}   # nombre -> {clave: [conteos..., suma, total]}
+        self._ayuda = {}
+
+    def describir(self, nombre: str, ayuda: str) -> None:
+        """Registrar el texto # HELP de una métrica."""
+        self._ayuda[nombre] = ayuda
+
+    def contar(self, nombre: str, valor: float = 1, **etiquetas) -> None:
+        """Sumar `valor` al contador."""
+        clave = _clave(etiquetas)
+        with self._lock:
+            serie = self._contadores.setdefault(nombre, {})
+            serie[clave] = serie.get(clave, 0) + valor
+
+    def fijar(self, nombre: str, valor: float, **etiquetas) -> None:
+        """Fijar un valor instantáneo (gauge)."""
+        with self._lock:
+            self._valores.setdefault(nombre, {})[_clave(etiquetas)] = valor
+
+    def observar(self, nombre: str, segundos: float, **etiquetas) -> None:
+        """Registrar una duración en el histograma."""
+        clave = _clave(etiquetas)
+        with self._lock:
+            serie = self._histogramas.setdefault(nombre, {})
+            datos = serie.get(clave)
+            if datos is None:
+                datos = serie[clave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if segundos <= limite:
+                    datos[i] += 1
+            datos[-2] += segundos
+            datos[-1] += 1
+
+    def reiniciar(self) -> None:
+        """Vaciar todas las series (p. ej. entre corridas de un benchmark)."""
+        with self._lock:
+            self._contadores.clear()
+            self._valores.clear()
+            self._histogramas.clear()
+
+    def resumen_tramos(self, nombre: str = "marea_tramo_segundos") -> list:
+        """[(etiquetas, cantidad, total_s)] ordenado por tiempo total."""
+        with self._lock:
+            serie = dict(self._histogramas.get(nombre, {}))
+        filas = [(dict(clave), datos[-1], datos[-2]) for clave, datos in serie.items()]
+        return sorted(filas, key=lambda f: f[2], reverse=True)
+
+    def exportar(self) -> str:
+        """Serializar en formato de texto Prometheus (versión 0.0.4)."""
+        lineas = []
+        with self._lock:
+            for tipo, familias in (("counter", self._contadores), ("gauge", self._valores)):
+                for nombre, serie in sorted(familias.items()):
+                    self._encabezado(lineas, nombre, tipo)
+                    for clave, valor in sorted(serie.items()):
+                        lineas.append(f"{nombre}{_etiquetas(clave)} {valor}")
+            for nombre, serie in sorted(self._histogramas.items()):
+                self._encabezado(lineas, nombre, "histogram")
+                for clave, datos in sorted(serie.items()):
+                    for limite, conteo in zip(self.buckets, datos):
+                        lineas.append(
+                            f"{nombre}_bucket{_etiquetas(clave, (('le', repr(limite)),))} {conteo}")
+                    lineas.append(f"{nombre}_bucket{_etiquetas(clave, (('le', '+Inf'),))} {datos[-1]}")
+                    lineas.append(f"{nombre}_sum{_etiquetas(clave)} {datos[-2]:.6f}")
+                    lineas.append(f"{nombre}_count{_etiquetas(clave)} {datos[-1]}")
+        return "\n".join(lineas) + "\n"
+
+    def _encabezado(self, lineas: list, nombre: str, tipo: str) -> None:
+        if nombre in self._ayuda:
+            lineas.append(f"# HELP {nombre} {self._ayuda[nombre]}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+
+
+# Instancia compartida del proceso
+registro = Registro()
+registro.describir("marea_tramo_segundos", "Duración de cada etapa del job de actualización")
+registro.describir("marea_vista_segundos", "Duración de las vistas HTTP")
+registro.describir("marea_vista_total", "Respuestas de las vistas HTTP por código")
+
+
+# ===============================
+# API de instrumentación
+# ===============================
+
+
+def contar(nombre: str, valor: float = 1, **etiquetas) -> None:
+    """Sumar al contador del registro compartido."""
+    registro.contar(nombre, valor, **etiquetas)
+
+
+@contextmanager
+def tramo(nombre: str, **etiquetas):
+    """Medir el bloque como marea_tramo_segundos{tramo=nombre}."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro.observar("marea_tramo_segundos", time.perf_counter() - t0,
+                          tramo=nombre, **etiquetas)
+
+
+def medir_vista(nombre: str):
+    """Decorador: medir duración y código de respuesta de una vista."""
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            t0 = time.perf_counter()
+            estado = 500
+            try:
+                respuesta = vista(request, *args, **kwargs)
+                estado = respuesta.status_code
+                return respuesta
+            finally:
+                registro.observar("marea_vista_segundos", time.perf_counter() - t0, vista=nombre)
+                registro.contar("marea_vista_total", vista=nombre, codigo=estado)
+        return envoltura
+    return decorador
+
+
+@contextmanager
+def perfilar(nombre: str, directorio: str = None):
+    """Capturar cProfile del bloque si MAREA_PERFIL indica un directorio.
+
+    Deja <directorio>/<nombre>_<AAAAMMDD-HHMMSS>.prof (ver con pstats o snakeviz)
+    e imprime las 15 funciones con más tiempo acumulado.
+    """
+    directorio = DIRECTORIO_PERFIL if directorio is None else directorio
+    if not directorio:
+        yield
+        return
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        destino = Path(directorio)
+        destino.mkdir(parents=True, exist_ok=True)
+        archivo = destino / f"{nombre}_{datetime.now():%Y%m%d-%H%M%S}.prof"
+        perfil.dump_stats(str(archivo))
+        print(f"🧪 Perfil guardado en {archivo}")
+        pstats.Stats(perfil).sort_stats("cumulative").print_stats(15)
@@ -0,0 +1,236 @@
+# ================================================================
+# Refresco en segundo plano del job de mareas
+#
+# Propósito: sacar la actualización de estaciones del hilo de la
+#            solicitud HTTP y evitar corridas duplicadas.
+#
+# Piezas:
+#   - Candado: flock exclusivo no bloqueante sobre <cache>/refresco.lock.
+#     Vale entre hilos y entre procesos (varios workers, cron + API); el
+#     sistema lo libera solo si el proceso muere.
+#   - Estado: <cache>/refresco.json (escritura atómica) con el avance por
+#     estación; lo lee /marea/actualizar-mareas/estado/.
+#   - Worker: un hilo daemon por corrida que toma el candado y lo suelta
+#     al terminar. Si ya hay una corrida, se devuelve su estado (no se
+#     encola otra).
+#
+# Estado (refresco.json):
+#   {"id", "modo": "async"|"sync", "estado": "corriendo"|"terminado"|"error",
+#    "pid", "inicio", "fin", "total", "ok", "errores", "error",
+#    "estaciones": {id: {"estado": "pendiente"|"ok"|"sin_cambios"|"error",
+#                        "duracion_s", "error"}}}
+#   Una corrida "corriendo" cuyo proceso (pid) ya no existe se informa
+#   "interrumpido" (murió a mitad de camino). Leer el estado nunca toca el
+#   candado: tomarlo aunque sea un instante haría fallar un POST simultáneo.
+#
+# Sin dependencias de Django ni pandas: el job se importa dentro del hilo.
+# ================================================================
+
+"""
+Candado, estado y worker del refresco asíncrono.
+"""
+
+import copy
+import fcntl
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from app_mareas.cache_mareas import escribir_atomico
+
+ARCHIVO_CANDADO = "refresco.lock"
+ARCHIVO_ESTADO = "refresco.json"
+
+# ===============================
+# Candado entre procesos
+# ===============================
+
+
+class Candado:
+    """flock exclusivo y no bloqueante sobre un archivo."""
+
+    def __init__(self, ruta: Path):
+        self.ruta = Path(ruta)
+        self._fd = None
+
+    def adquirir(self) -> bool:
+        """Tomar el candado; False si otro hilo o proceso ya lo tiene."""
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def liberar(self) -> None:
+        """Soltar el candado (idempotente)."""
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+# ===============================
+# Estado de la corrida
+# ===============================
+
+
+def _ahora() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class Seguimiento:
+    """Estado de una corrida, persistido en refresco.json en cada cambio."""
+
+    def __init__(self, cache_dir: Path, modo: str):
+        self.ruta = Path(cache_dir) / ARCHIVO_ESTADO
+        self.datos = {
+            "id": uuid.uuid4().hex[:12],
+            "modo": modo,
+            "estado": "corriendo",
+            "pid": os.getpid(),
+            "inicio": _ahora(),
+            "fin": None,
+            "total": 0,
+            "ok": 0,
+            "errores": 0,
+            "error": None,
+            "estaciones": {},
+        }
+        self._lock = threading.Lock()
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._guardar()
+
+    def instantanea(self) -> dict:
+        """Copia profunda del estado, tomada bajo el lock del seguimiento."""
+        with self._lock:
+            return copy.deepcopy(self.datos)
+
+    def _guardar(self) -> None:
+        cuerpo = json.dumps(self.datos, ensure_ascii=False, separators=(",", ":"))
+        escribir_atomico(self.ruta, cuerpo.encode("utf-8"))
+
+    def comenzar(self, estaciones: list) -> None:
+        """Registrar las estaciones de la corrida como pendientes."""
+        with self._lock:
+            self.datos["total"] = len(estaciones)
+            self.datos["estaciones"] = {
+                est: {"estado": "pendiente", "duracion_s": None, "error": None}
+                for est in estaciones
+            }
+            self._guardar()
+
+    def estacion(self, r: dict) -> None:
+        """Registrar el resultado de una estación (entrada del reporte del job)."""
+        with self._lock:
+            self.datos["estaciones"][r["estacion"]] = {
+                "estado": ("sin_cambios" if r.get("sin_cambios")
+                           else "ok" if r["ok"] else "error"),
+                "duracion_s": r["duracion_s"],
+                "error": r["error"],
+            }
+            self.datos["ok" if r["ok"] else "errores"] += 1
+            self._guardar()
+
+    def terminar(self, error: Optional[str] = None) -> None:
+        """Cerrar la corrida como terminada o con error."""
+        with self._lock:
+            self.datos["estado"] = "error" if error else "terminado"
+            self.datos["error"] = error
+            self.datos["fin"] = _ahora()
+            self._guardar()
+
+
+def _proceso_vivo(pid: Optional[int]) -> bool:
+    """Indicar si existe el proceso `pid` (sin pid, se asume vivo)."""
+    if not pid:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def leer_estado(cache_dir: Path) -> Optional[dict]:
+    """Último estado conocido (None si nunca se corrió un refresco)."""
+    try:
+        with open(Path(cache_dir) / ARCHIVO_ESTADO, "r", encoding="utf-8") as f:
+            estado = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if estado.get("estado") == "corriendo" and not _proceso_vivo(estado.get("pid")):
+        estado["estado"] = "interrumpido"
+    return estado
+
+
+# ===============================
+# Ejecución
+# ===============================
+
+# Función que corre el job informando avance: recibe el Seguimiento y
+# devuelve el reporte por estación
+Ejecutar = Callable[[Seguimiento], list]
+
+
+def _correr(candado: Candado, seguimiento: Seguimiento, ejecutar: Ejecutar) -> list:
+    """Ejecutar el job con el candado tomado y cerrar el estado pase lo que pase."""
+    try:
+        reporte = ejecutar(seguimiento)
+    except Exception as e:
+        seguimiento.terminar(error=str(e))
+        raise
+    else:
+        seguimiento.terminar()
+        return reporte
+    finally:
+        candado.liberar()
+
+
+def iniciar_refresco(cache_dir: Path, ejecutar: Ejecutar) -> tuple:
+    """Lanzar el refresco en un hilo si no hay otro en curso.
+
+    Devuelve (iniciado, estado): si ya había una corrida, (False, su estado).
+    """
+    candado = Candado(Path(cache_dir) / ARCHIVO_CANDADO)
+    if not candado.adquirir():
+        return False, leer_estado(cache_dir)
+    try:
+        seguimiento = Seguimiento(cache_dir, modo="async")
+    except BaseException:
+        candado.liberar()
+        raise
+
+    def _hilo():
+        try:
+            _correr(candado, seguimiento, ejecutar)
+        except Exception as e:
+            print(f"❌ Refresco {seguimiento.datos['id']} falló: {e}")
+
+    # Copiar antes de arrancar el hilo: el worker modifica "estaciones"
+    # mientras la vista serializa la respuesta
+    estado = seguimiento.instantanea()
+    threading.Thread(target=_hilo, name="marea-refresco", daemon=True).start()
+    return True, estado
+
+
+def refrescar_sincronico(cache_dir: Path, ejecutar: Ejecutar) -> Optional[list]:
+    """Correr el refresco en el hilo actual; None si ya hay otro en curso."""
+    candado = Candado(Path(cache_dir) / ARCHIVO_CANDADO)
+    if not candado.adquirir():
+        return None
+    try:
+        seguimiento = Seguimiento(cache_dir, modo="sync")
+    except BaseException:
+        candado.liberar()
+        raise
+    return _correr(candado, seguimiento, ejecutar)
@@ -0,0 +1,97 @@
+"""
+===============================================================
+Benchmark: arranque en frío de los módulos que importa el worker
+===============================================================
+
+Importa cada módulo en un intérprete nuevo y mide el tiempo de import,
+si se cargaron pandas/numpy y si quedó algún efecto de import (pronóstico
+descargado). Sirve para vigilar que las vistas sigan arrancando rápido y
+que el job de actualización siga siendo importable sin efectos.
+
+El presupuesto de tiempo es relativo: cada vista se compara contra el
+import de `django.http` (piso que paga toda vista), medido en las mismas
+repeticiones y alternado con el módulo, así la carga de la máquina afecta
+a ambos por igual. Un umbral absoluto daba falsos positivos en máquinas
+lentas o cargadas.
+
+Ejecución
+- python bench_arranque.py [repeticiones] [margen_ms]
+  (sale con código 1 si una vista importa pandas o tarda más que
+  django.http + margen; por defecto 9 repeticiones y 150 ms de margen)
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[3]
+
+VISTAS = [
+    "app_mareas.views.ping",
+    "app_mareas.views.estaciones",
+    "app_mareas.views.alturas",
+    "app_mareas.views.actualizar_alturas",
+]
+JOB = "app_mareas.scripts.jobs.actualizacion"
+# Import que toda vista paga de todos modos; referencia del presupuesto
+REFERENCIA = "django.http"
+
+# Código que corre en el intérprete hijo: mide solo el import del módulo
+_SONDA = """
+import json, sys, time
+t0 = time.perf_counter()
+modulo = __import__(sys.argv[1], fromlist=["_"])
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({
+    "ms": ms,
+    "pandas": "pandas" in sys.modules,
+    "numpy": "numpy" in sys.modules,
+    "pronostico_cargado": getattr(modulo, "df_pronostico_global", None) is not None,
+}))
+"""
+
+
+def _importar(modulo: str) -> dict:
+    """Importar `modulo` en un intérprete nuevo y devolver la sonda."""
+    salida = subprocess.run(
+        [sys.executable, "-c", _SONDA, modulo],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def medir_import(modulo: str, repeticiones: int) -> tuple:
+    """Mejor tiempo de `modulo` y de REFERENCIA, alternando las corridas."""
+    mejor, referencia = None, float("inf")
+    for _ in range(repeticiones):
+        referencia = min(referencia, _importar(REFERENCIA)["ms"])
+        r = _importar(modulo)
+        if mejor is None or r["ms"] < mejor["ms"]:
+            mejor = r
+    return mejor, referencia
+
+
+def main(repeticiones: int = 9, margen_ms: float = 150.0) -> int:
+    fallas = []
+    for modulo in VISTAS + [JOB]:
+        r, referencia = medir_import(modulo, repeticiones)
+        pesado = "pandas" if r["pandas"] else "numpy" if r["numpy"] else "-"
+        print(f"⏱️ {modulo}: {r['ms']:.1f} ms "
+              f"({REFERENCIA} {referencia:.1f} ms, pesados: {pesado})")
+        if r["pronostico_cargado"]:
+            fallas.append(f"{modulo} descarga el pronóstico al importarse")
+        if modulo in VISTAS and (r["pandas"] or r["numpy"]):
+            fallas.append(f"{modulo} importa pandas/numpy")
+        if modulo in VISTAS and r["ms"] > referencia + margen_ms:
+            fallas.append(f"{modulo} supera {REFERENCIA} + {margen_ms:.0f} ms")
+
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if not fallas:
+        print("✅ Arranque sin efectos de import ni dependencias pesadas en las vistas")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 9,
+                  float(sys.argv[2]) if len(sys.argv) > 2 else 150.0))
@@ -0,0 +1,105 @@
+"""
+===============================================================
+Micro-benchmark: filas "23:59" de transición de día
+===============================================================
+
+Compara actualizacion.agregar_cierre_dia (máscara + desplazamiento sobre
+el índice temporal) contra la implementación anterior (iterrows + row.copy
++ concat de Series sobre fecha/hora de texto) en agregados horarios
+sintéticos de distintas ventanas. La equivalencia de ambas (mismas filas
+en el mismo orden, casos borde incluidos) se verifica en
+app_mareas/tests/test_cierre_dia.py, que importa la referencia de aquí.
+
+Ejecución
+- python bench_cierre_dia.py [repeticiones]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BASE_DIR))
+
+from app_mareas.scripts.jobs.actualizacion import (
+    ZONA_HORARIA, agregar_cierre_dia, indexar_serie)
+
+VENTANAS_DIAS = [4, 15, 60]
+
+# ============================================================
+# Implementación de referencia (previa)
+# ============================================================
+
+
+def cierre_referencia(df_ag: pd.DataFrame, inicio: datetime) -> pd.DataFrame:
+    """Versión fila a fila que se reemplazó."""
+    df_ag = df_ag.copy()
+    df_ag["datetime"] = pd.to_datetime(df_ag["fecha"] + " " + df_ag["hora"])
+    nuevas_filas = []
+    for _, row in df_ag.iterrows():
+        if row["hora"] == "00:00:00" and row["datetime"] > inicio:
+            nueva_fila = row.copy()
+            nueva_fila["datetime"] = row["datetime"] - timedelta(minutes=1)
+            nueva_fila["fecha"] = nueva_fila["datetime"].date().isoformat()
+            nueva_fila["hora"] = nueva_fila["datetime"].time().isoformat()
+            nuevas_filas.append(nueva_fila)
+    df_ag = pd.concat([df_ag, pd.DataFrame(nuevas_filas)], ignore_index=True)
+    return df_ag.drop(columns=["datetime"]).sort_values(by=["fecha", "hora"])
+
+
+# ============================================================
+# Datos sintéticos
+# ============================================================
+
+
+def agregados_sinteticos(inicio: datetime, dias: int, semilla: int = 0) -> pd.DataFrame:
+    """Agregados horarios con huecos (incluye algunas 00:00 faltantes)."""
+    rng = np.random.default_rng(semilla)
+    instantes = pd.date_range(inicio, periods=dias * 24, freq="h")
+    instantes = instantes[rng.random(len(instantes)) > 0.1]
+    base = rng.normal(1.0, 0.3, len(instantes))
+    return pd.DataFrame({
+        "fecha": instantes.strftime("%Y-%m-%d"),
+        "hora": instantes.strftime("%H:%M:%S"),
+        "altura_minima": base - 0.05,
+        "altura_maxima": base + 0.05,
+        "altura_promedio": base,
+    })
+
+
+# ============================================================
+# Medición
+# ============================================================
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Devolver el mejor tiempo (s) de `repeticiones` corridas."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def main(repeticiones: int = 5) -> None:
+    inicio = datetime(2025, 3, 1)
+    inicio_local = pd.Timestamp(inicio).tz_localize(ZONA_HORARIA)
+    for dias in VENTANAS_DIAS:
+        df_ag = agregados_sinteticos(inicio, dias, semilla=dias)
+        df_idx = indexar_serie(df_ag)
+        filas_salida = len(agregar_cierre_dia(df_idx, inicio_local))
+
+        t_ref = _medir(lambda: cierre_referencia(df_ag, inicio), repeticiones)
+        t_nuevo = _medir(lambda: agregar_cierre_dia(df_idx, inicio_local), repeticiones)
+        print(f"🧾 {dias} días ({len(df_ag)} filas → {filas_salida}): "
+              f"iterrows {t_ref * 1000:.2f} ms | vectorizado {t_nuevo * 1000:.2f} ms "
+              f"| x{t_ref / t_nuevo:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
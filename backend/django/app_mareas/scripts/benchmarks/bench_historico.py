@@ -0,0 +1,108 @@
+"""
+===============================================================
+Micro-benchmark: consultas por rango al histórico SQLite
+===============================================================
+
+Carga en una base temporal varias estaciones con años de datos horarios
+(mismo esquema y upsert que usa el job) y mide consultas de distintos
+rangos con historico.consultar_rango, como las atiende la vista
+/marea/alturas/<id>/?desde=&hasta=.
+
+Para cada rango compara además la respuesta armada en memoria
+(consultar_rango + JSON compacto) con la de ?stream=1 (iterar_rango por
+tandas): pico de memoria (tracemalloc) y tiempo hasta la primera tanda.
+
+Ejecución
+- python bench_historico.py [años] [estaciones]
+"""
+
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BASE_DIR))
+
+from app_mareas.cache_mareas import codificar_compacto
+from app_mareas.historico import ZONA, a_epoch, consultar_rango, guardar_serie, iterar_rango
+
+RANGOS_DIAS = [1, 7, 31, 183, 366]
+
+
+def cargar(ruta: Path, estaciones: list, anios: int) -> int:
+    """Insertar series horarias sintéticas; devuelve filas totales."""
+    inicio = a_epoch(datetime(2024, 1, 1))
+    horas = anios * 365 * 24
+    total = 0
+    for est in estaciones:
+        instantes = [inicio + h * 3600 for h in range(horas)]
+        filas = []
+        for t in instantes:
+            local = datetime.fromtimestamp(t, ZONA)
+            altura = 1.0 + random.random()
+            filas.append({
+                "fecha": local.date().isoformat(),
+                "hora": local.time().isoformat(),
+                "altura_minima": altura - 0.05,
+                "altura_maxima": altura + 0.05,
+                "altura_promedio": altura,
+            })
+        total += guardar_serie(ruta, est, instantes, filas)
+    return total
+
+
+def main(anios: int = 2, n_estaciones: int = 3) -> None:
+    estaciones = [f"estacion_{i}" for i in range(n_estaciones)]
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = Path(tmp) / "historico.sqlite3"
+        t0 = time.perf_counter()
+        total = cargar(ruta, estaciones, anios)
+        print(f"🧾 {total} filas ({n_estaciones} estaciones × {anios} años) "
+              f"cargadas en {time.perf_counter() - t0:.2f}s")
+
+        desde = a_epoch(datetime(2024, 3, 1))
+        for dias in RANGOS_DIAS:
+            mejor, filas = float("inf"), []
+            for _ in range(5):
+                t0 = time.perf_counter()
+                filas = consultar_rango(ruta, estaciones[-1], desde, desde + dias * 86400)
+                mejor = min(mejor, time.perf_counter() - t0)
+            print(f"⏱️ {dias:>3} días: {len(filas):>5} filas en {mejor * 1000:.2f} ms")
+
+        print("🌊 Respuesta en memoria vs. por tandas (?stream=1)")
+        for dias in RANGOS_DIAS:
+            hasta = desde + dias * 86400
+            pico_memoria, _ = medir_pico(
+                lambda: codificar_compacto({"datos": consultar_rango(ruta, estaciones[-1], desde, hasta)}))
+
+            def por_tandas():
+                t0, primera = time.perf_counter(), None
+                for tanda in iterar_rango(ruta, estaciones[-1], desde, hasta):
+                    codificar_compacto(tanda)
+                    primera = primera or time.perf_counter() - t0
+                return primera or 0.0
+
+            pico_tandas, primera = medir_pico(por_tandas)
+            print(f"⏱️ {dias:>3} días: pico {pico_memoria / 1024:>8.0f} KiB en memoria, "
+                  f"{pico_tandas / 1024:>6.0f} KiB por tandas "
+                  f"(primera tanda en {primera * 1000:.2f} ms)")
+
+
+def medir_pico(funcion) -> tuple:
+    """Ejecutar `funcion` y devolver (pico de memoria en bytes, resultado)."""
+    tracemalloc.start()
+    try:
+        resultado = funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico, resultado
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,287 @@
+"""
+===============================================================
+Benchmark + regresión: ingesta completa (SMN + INA) sin red
+===============================================================
+
+Reproduce, etapa por etapa y con las mismas funciones que usa
+actualizacion.py, una corrida del job a partir de los fixtures del repo:
+
+- cache/debug_pron.zip / debug_pron_raw.bin: hash del miembro por bloques,
+  detección de codificación, detección de encabezados, parseo de filas
+  (descomprimiendo y decodificando en el mismo recorrido, como el job) e
+  índice y huella por estación del pronóstico del SMN.
+- Payload sintético del INA por estación (marea semidiurna + ruido, dos
+  lecturas por instante): JSON, huella, agregación, fusión con la meteo,
+  preparación de filas, extremos y JSON compacto.
+
+Cada escenario escala estaciones (3 → 500; las estaciones del SMN se
+reparten entre las del fixture) y días de ventana (4 → 60). Por defecto
+corre los extremos de la grilla; --completa corre 3/50/500 × 4/15/60
+(unos minutos). Se informa la mediana de las repeticiones por etapa.
+
+Regresiones
+- --guardar escribe la línea base (JSON) con los tiempos por escenario y
+  una calibración de la máquina (carga fija ajena al job), medida antes de
+  cada repetición y resumida por mediana junto con las etapas: si la carga
+  de la máquina cambia a mitad de corrida, cada escenario se reescala con
+  la calibración de su propio tramo y no con una sola medida al inicio.
+- --comparar (por defecto si existe baseline_ingesta.json) reescala la
+  línea base con esa calibración y sale con código 1 si alguna etapa
+  supera la tolerancia relativa (y un mínimo absoluto, para no fallar por
+  ruido en etapas de pocos milisegundos).
+- Una etapa regresa solo si supera la base reescalada en más de la
+  tolerancia (25 %) Y en más de --minimo-ms (15 ms): las etapas de pocas
+  decenas de milisegundos varían más que eso entre corridas idénticas.
+- En CI: guardar la línea base en la rama principal y comparar en el PR,
+  o comparar contra la línea base versionada.
+
+Por qué un script y no pytest-benchmark/asv
+- Ninguno de los dos es dependencia del proyecto; este script solo usa lo
+  que ya usa el job. La línea base, la calibración y la comparación cubren
+  lo que aportaría el plugin; si se adopta pytest-benchmark, correr()
+  puede envolverse tal cual en un test.
+
+Ejecución
+- python bench_ingesta.py [--repeticiones 5] [--completa]
+                          [--estaciones 3 50 500] [--dias 4 15 60]
+                          [--guardar [RUTA] | --comparar RUTA]
+                          [--tolerancia 0.25] [--minimo-ms 15]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import statistics
+import sys
+import time
+import zipfile
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BASE_DIR))
+
+from app_mareas.cache_mareas import codificar_compacto
+from app_mareas.scripts.jobs.actualizacion import (
+    PRON_COLS, ZONA_HORARIA, agregar_mediciones, completar_meteo, huella_datos,
+    huella_meteo, indexar_serie, preparar_salida, resumir_miembro)
+from app_mareas.scripts.jobs.extremos import extremos_serie
+from app_mareas.scripts.jobs.pronostico_smn import (
+    PATRON_NOMBRE, _es_iguales, detectar_codificacion, iterar_filas, normalizar_nombre,
+    parsear_pronostico)
+
+CACHE_DIR = BASE_DIR / "app_mareas" / "cache"
+FIXTURE_ZIP = CACHE_DIR / "debug_pron.zip"
+FIXTURE_RAW = CACHE_DIR / "debug_pron_raw.bin"
+BASELINE = Path(__file__).with_name("baseline_ingesta.json")
+
+ESTACIONES = [3, 50, 500]
+DIAS = [4, 15, 60]
+# Por defecto, extremos y centro de la grilla (la grilla completa con --completa)
+ESCENARIOS = [(3, 4), (3, 60), (50, 15), (500, 4)]
+
+# Primer día del pronóstico del fixture; la ventana termina con el pronóstico
+INICIO_PRONOSTICO = pd.Timestamp("2025-08-19")
+DIAS_PRONOSTICO = 5
+
+# ============================================================
+# Entradas
+# ============================================================
+
+
+def estaciones_fixture(contenido: str) -> list:
+    """Nombres normalizados de los bloques de estación del TXT del SMN."""
+    lineas = [l.rstrip("\r") for l in contenido.split("\n")]
+    return [
+        normalizar_nombre(lineas[i]) for i in range(len(lineas) - 1)
+        if PATRON_NOMBRE.fullmatch(lineas[i]) and _es_iguales(lineas[i + 1])
+    ]
+
+
+def payload_ina(inicio: pd.Timestamp, dias: int, semilla: int) -> bytes:
+    """JSON del INA con dos lecturas horarias por instante (marea M2 + ruido)."""
+    rng = np.random.default_rng(semilla)
+    instantes = pd.date_range(inicio, periods=dias * 24, freq="h")
+    horas = np.arange(len(instantes), dtype=float)
+    base = 1.2 + 0.8 * np.sin(2 * np.pi * horas / 12.42 + rng.uniform(0, 6.28))
+    textos = instantes.strftime("%Y-%m-%dT%H:%M:%S").tolist()
+    data = []
+    for texto, valor in zip(textos, base.tolist()):
+        for ruido in rng.normal(0, 0.02, 2).tolist():
+            data.append({"timestart": texto, "valor": round(valor + ruido, 3)})
+    return json.dumps({"data": data}).encode("utf-8")
+
+
+def calibrar(repeticiones: int = 3) -> float:
+    """Carga fija (hash + orden NumPy + bucle Python) para reescalar entre máquinas."""
+    datos = bytes(range(256)) * 16384
+    valores = np.random.default_rng(0).random(500_000)
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        hashlib.sha256(datos).hexdigest()
+        np.sort(valores)
+        sum(i * i for i in range(300_000))
+        tiempos.append(time.perf_counter() - t0)
+    return statistics.median(tiempos)
+
+
+# ============================================================
+# Escenario: una corrida con N estaciones y D días
+# ============================================================
+
+
+class Cronometro:
+    """Acumular segundos por etapa."""
+
+    def __init__(self):
+        self.etapas = defaultdict(float)
+
+    def medir(self, etapa: str, funcion, *args):
+        t0 = time.perf_counter()
+        resultado = funcion(*args)
+        self.etapas[etapa] += time.perf_counter() - t0
+        return resultado
+
+
+def correr(n_estaciones: int, dias: int, nombres_smn: list) -> dict:
+    """Ejecutar las etapas del job y devolver {etapa: segundos}."""
+    c = Cronometro()
+
+    # --- Pronóstico SMN (una vez por corrida; el ZIP ya volcado en memoria) ---
+    zip_ref = zipfile.ZipFile(io.BytesIO(FIXTURE_ZIP.read_bytes()))
+    nombre = next(n for n in zip_ref.namelist() if n.lower().endswith(".txt"))
+
+    def lineas(enc: str):
+        return io.TextIOWrapper(zip_ref.open(nombre), encoding=enc, errors="ignore")
+
+    _, prefijo = c.medir("smn_zip_hash", resumir_miembro, zip_ref, nombre)
+    enc = c.medir("smn_codificacion", detectar_codificacion, prefijo)
+    c.medir("smn_encabezados", lambda: sum(1 for _ in iterar_filas(lineas(enc), [])))
+
+    ids = nombres_smn[:n_estaciones]
+    df_pron = c.medir("smn_filas", lambda: parsear_pronostico(lineas(enc), ids))
+    por_estacion = c.medir("smn_indexado", lambda: {
+        str(est): indexar_serie(grupo[["fecha", "hora"] + PRON_COLS])
+        for est, grupo in df_pron.groupby("estacion_pronostico", observed=True, sort=False)
+    })
+    c.medir("smn_huella", lambda: {est: huella_meteo(m) for est, m in por_estacion.items()})
+
+    # --- INA por estación ---
+    inicio = INICIO_PRONOSTICO - pd.Timedelta(days=max(0, dias - DIAS_PRONOSTICO))
+    inicio_local = inicio.tz_localize(ZONA_HORARIA)
+    fin_local = (inicio + pd.Timedelta(days=dias)).tz_localize(ZONA_HORARIA)
+    filas_totales = 0
+    for i in range(n_estaciones):
+        payload = payload_ina(inicio, dias, semilla=i)  # fuera de la medición
+        data = c.medir("ina_json", lambda: json.loads(payload)["data"])
+        c.medir("ina_huella", huella_datos, data)
+        df_ag, indice_medido = c.medir("agregacion", agregar_mediciones, data, inicio_local, fin_local)
+        meteo = por_estacion.get(ids[i % len(ids)])
+        df_ag = c.medir("fusion_meteo", completar_meteo, df_ag, meteo)
+
+        _, filas, df_medido = c.medir("preparacion_json", preparar_salida, df_ag, indice_medido)
+        extremos = c.medir("extremos", extremos_serie, df_medido["altura_promedio"])
+        c.medir("json_compacto", codificar_compacto, {"datos": filas, "extremos": extremos})
+        filas_totales += len(filas)
+
+    etapas = dict(c.etapas)
+    etapas["total"] = sum(etapas.values())
+    etapas["_filas"] = filas_totales
+    return etapas
+
+
+def medir_escenario(n_estaciones: int, dias: int, nombres_smn: list, repeticiones: int) -> dict:
+    """Mediana por etapa de varias corridas, cada una precedida de una calibración."""
+    corridas = []
+    for _ in range(repeticiones):
+        calibracion = calibrar()
+        corridas.append(dict(correr(n_estaciones, dias, nombres_smn), _calibracion_s=calibracion))
+    return {etapa: statistics.median(r[etapa] for r in corridas) for etapa in corridas[0]}
+
+
+# ============================================================
+# Línea base y comparación
+# ============================================================
+
+
+def comparar(actual: dict, base: dict, tolerancia: float, minimo_s: float) -> list:
+    """Devolver [(escenario, etapa, base_reescalada, actual)] que regresaron."""
+    regresiones = []
+    for escenario, etapas in actual["escenarios"].items():
+        previas = base["escenarios"].get(escenario)
+        if previas is None or "_calibracion_s" not in previas:
+            continue
+        factor = etapas["_calibracion_s"] / previas["_calibracion_s"]
+        print(f"⚖️ {escenario} calibración: base {previas['_calibracion_s']:.4f}s, "
+              f"actual {etapas['_calibracion_s']:.4f}s (factor {factor:.2f})")
+        for etapa, segundos in etapas.items():
+            if etapa.startswith("_") or etapa not in previas:
+                continue
+            esperado = previas[etapa] * factor
+            if segundos > esperado * (1 + tolerancia) and segundos - esperado > minimo_s:
+                regresiones.append((escenario, etapa, esperado, segundos))
+        if etapas.get("_filas") != previas.get("_filas"):
+            print(f"⚠️ {escenario}: filas {previas.get('_filas')} → {etapas.get('_filas')}")
+    return regresiones
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--completa", action="store_true")
+    parser.add_argument("--estaciones", type=int, nargs="+")
+    parser.add_argument("--dias", type=int, nargs="+")
+    parser.add_argument("--guardar", nargs="?", const=str(BASELINE), metavar="RUTA")
+    parser.add_argument("--comparar", metavar="RUTA")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    parser.add_argument("--minimo-ms", type=float, default=15.0)
+    args = parser.parse_args(argv)
+
+    raw = FIXTURE_RAW.read_bytes()
+    nombres = estaciones_fixture(raw.decode(detectar_codificacion(raw)))
+    print(f"📄 Fixture SMN: {len(nombres)} estaciones")
+
+    escenarios = ESCENARIOS
+    if args.completa or args.estaciones or args.dias:
+        escenarios = [(n, d) for n in args.estaciones or ESTACIONES
+                      for d in args.dias or DIAS]
+
+    resultado = {"escenarios": {}}
+    for n, dias in escenarios:
+        etapas = medir_escenario(n, dias, nombres, args.repeticiones)
+        resultado["escenarios"][f"{n}x{dias}"] = etapas
+        detalle = ", ".join(f"{k} {v * 1000:.1f}" for k, v in etapas.items()
+                            if not k.startswith("_") and k != "total")
+        print(f"⏱️ {n:>3} estaciones × {dias:>2} días: {etapas['total']:.3f}s "
+              f"({etapas['_filas']} filas) | ms: {detalle}")
+
+    if args.guardar:
+        redondeado = {
+            "escenarios": {e: {k: round(v, 6) for k, v in etapas.items()}
+                           for e, etapas in resultado["escenarios"].items()},
+        }
+        Path(args.guardar).write_text(json.dumps(redondeado, indent=2) + "\n", encoding="utf-8")
+        print(f"💾 Línea base guardada en {args.guardar}")
+        return 0
+
+    ruta_base = Path(args.comparar) if args.comparar else BASELINE
+    if not ruta_base.exists():
+        print("ℹ️ Sin línea base para comparar (usar --guardar).")
+        return 0
+    base = json.loads(ruta_base.read_text(encoding="utf-8"))
+    regresiones = comparar(resultado, base, args.tolerancia, args.minimo_ms / 1000)
+    for escenario, etapa, esperado, segundos in regresiones:
+        print(f"❌ {escenario} {etapa}: {segundos * 1000:.1f} ms "
+              f"(base {esperado * 1000:.1f} ms, +{(segundos / esperado - 1) * 100:.0f}%)")
+    if not regresiones:
+        print(f"✅ Sin regresiones (tolerancia {args.tolerancia:.0%})")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+===============================================================
+Micro-benchmark: parser del TXT pron5d del SMN
+===============================================================
+
+Compara el parser de una pasada (pronostico_smn.parsear_pronostico) contra
+la implementación anterior de varias pasadas (splitlines + detección de
+encabezados por índice + findall por bloque), usando el fixture
+cache/debug_pron_latin1.txt. Verifica además que ambos produzcan las
+mismas filas (salvo el sector del viento: la referencia conserva el
+catálogo previo con huecos entre sectores).
+
+Ejecución
+- python bench_parser_pronostico.py [repeticiones]
+"""
+
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BASE_DIR))
+
+from app_mareas.scripts.jobs.pronostico_smn import (
+    DIRECCIONES_VIENTO, a_tipos_json, parsear_pronostico)
+
+FIXTURE = BASE_DIR / "app_mareas" / "cache" / "debug_pron_latin1.txt"
+ESTACIONES = ["SAN_FERNANDO", "ROSARIO_AERO"]
+COLUMNAS_SECTOR = [
+    "viento_direccion_abreviatura",
+    "viento_direccion_nombre",
+    "viento_direccion_grados",
+]
+
+# ============================================================
+# Implementación de referencia (parser previo, sin trazas)
+# ============================================================
+
+
+def convertir_direccion(grados: float):
+    """Clasificación previa fila a fila (ventanas de ±11.25° con huecos)."""
+    for abrev, nombre, ang in DIRECCIONES_VIENTO:
+        rango_min = (ang - 11.25) % 360
+        rango_max = (ang + 11.25) % 360
+        if rango_min < rango_max:
+            if rango_min <= grados < rango_max:
+                return abrev, nombre, ang
+        else:
+            if grados >= rango_min or grados < rango_max:
+                return abrev, nombre, ang
+    return "N", "Norte", 0.0
+
+
+def parsear_referencia(contenido: str, estaciones_pronostico: list) -> list:
+    """Parser multi-pasada previo; devuelve lista de dicts."""
+    lineas = contenido.splitlines()
+
+    def _norm(s: str) -> str:
+        return re.sub(r'[^A-Z0-9]+', '_', s.upper()).strip('_')
+
+    def _is_eq(s: str) -> bool:
+        return re.fullmatch(r"\s*=+\s*", (s or "")) is not None
+
+    headers_detectados = []
+    for i in range(len(lineas)):
+        nombre = lineas[i]
+        if re.fullmatch(r"\s*[A-Z0-9_]+(?:\s+[A-Z0-9_]+)*\s*", nombre or ""):
+            before1 = lineas[i-1] if i-1 >= 0 else ""
+            before2 = lineas[i-2] if i-2 >= 0 else ""
+            after1 = lineas[i+1] if i+1 < len(lineas) else ""
+            after2 = lineas[i+2] if i+2 < len(lineas) else ""
+            if (_is_eq(before1) or _is_eq(before2)) and (_is_eq(after1) or _is_eq(after2)):
+                headers_detectados.append((_norm(nombre), nombre.strip(), i))
+    header_idx_set = {idx for _, _, idx in headers_detectados}
+
+    pattern_datos = re.compile(
+        r"(\d{2}/[A-Z]{3}/\d{4})\s+(\d{2})Hs\.\s+([-]?\d+(?:\.\d+)?)"
+        r"\s+([A-Z]{1,3}|\d+)\s*\|\s*(\d+)\s+([\d\.]+)"
+    )
+
+    datos = []
+    for estacion in estaciones_pronostico:
+        est_norm = _norm(estacion)
+        idx_header = None
+        for norm_name, _, idx in headers_detectados:
+            if norm_name == est_norm:
+                idx_header = idx
+                break
+        if idx_header is None:
+            continue
+
+        l_idx = idx_header + 1
+        while l_idx < len(lineas) and (not lineas[l_idx].strip() or _is_eq(lineas[l_idx])):
+            l_idx += 1
+        bloque_lineas = []
+        while l_idx < len(lineas):
+            if l_idx in header_idx_set and l_idx != idx_header:
+                break
+            l = lineas[l_idx]
+            if not l.strip() or any(k in l for k in ["FECHA", "TEMPERATURA", "VIENTO", "PRECIPITACION"]):
+                l_idx += 1
+                continue
+            bloque_lineas.append(l)
+            l_idx += 1
+        filas = pattern_datos.findall("\n".join(bloque_lineas))
+
+        for fecha, hora, temp, viento_dir, viento_vel, prec in filas:
+            def _parse_fecha_es(fecha_txt: str):
+                m = re.match(
+                    r"^(\d{2})/([A-Z]{3})/(\d{4})$", fecha_txt.strip().upper())
+                if not m:
+                    return None
+                d, mes_abbr, y = m.groups()
+                meses = {
+                    "ENE": 1, "FEB": 2, "MAR": 3, "ABR": 4, "MAY": 5, "JUN": 6,
+                    "JUL": 7, "AGO": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DIC": 12
+                }
+                mes = meses.get(mes_abbr)
+                if not mes:
+                    return None
+                return datetime(int(y), mes, int(d)).date()
+
+            fecha_dt = _parse_fecha_es(fecha)
+            if not fecha_dt:
+                continue
+            abbr_to_name_deg = {a: (n, deg)
+                                for (a, n, deg) in DIRECCIONES_VIENTO}
+            raw_dir = viento_dir.strip().upper()
+            try:
+                grados = float(raw_dir.replace(",", "."))
+                abrev, nombre, grados_base = convertir_direccion(grados)
+            except ValueError:
+                if raw_dir in abbr_to_name_deg:
+                    nombre, grados_base = abbr_to_name_deg[raw_dir]
+                    abrev = raw_dir
+                    grados = float(grados_base)
+                else:
+                    abrev, nombre, grados_base = ("N", "Norte", 0.0)
+                    grados = 0.0
+            datos.append({
+                "estacion_pronostico": estacion,
+                "fecha": fecha_dt.isoformat(),
+                "hora": f"{hora}:00:00",
+                "temperatura": float(temp),
+                "viento_direccion": grados,
+                "viento_direccion_abreviatura": abrev,
+                "viento_direccion_nombre": nombre,
+                "viento_direccion_grados": grados_base,
+                "viento_km_h": int(viento_vel),
+                "precipitacion_mm": float(prec),
+            })
+    return datos
+
+
+# ============================================================
+# Medición
+# ============================================================
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Devolver el mejor tiempo (s) de `repeticiones` corridas."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def main(repeticiones: int = 20) -> None:
+    contenido = FIXTURE.read_text(encoding="utf-8")
+
+    # El parser nuevo emite en orden de archivo; comparar sin importar el orden
+    def clave(d: dict) -> tuple:
+        return d["estacion_pronostico"], d["fecha"], d["hora"]
+
+    def sin_sector(filas: list) -> list:
+        return sorted(({k: v for k, v in f.items() if k not in COLUMNAS_SECTOR}
+                       for f in filas), key=clave)
+
+    referencia = parsear_referencia(contenido, ESTACIONES)
+    nuevo = parsear_pronostico(contenido.splitlines(), ESTACIONES)
+    registros = a_tipos_json(nuevo).to_dict(orient="records")
+    assert sin_sector(registros) == sin_sector(referencia), "Los parsers difieren"
+    print(f"🧾 Filas: {len(nuevo)} ({', '.join(ESTACIONES)})")
+
+    t_ref = _medir(lambda: parsear_referencia(contenido, ESTACIONES), repeticiones)
+
+    # El parser nuevo recibe un stream de líneas (como desde el ZIP)
+    def _nuevo():
+        with open(FIXTURE, "r", encoding="utf-8") as f:
+            parsear_pronostico(f, ESTACIONES)
+
+    t_nuevo = _medir(_nuevo, repeticiones)
+    print(f"⏱️ Referencia (multi-pasada): {t_ref * 1000:.2f} ms")
+    print(f"⏱️ Una pasada (stream):       {t_nuevo * 1000:.2f} ms")
+    print(f"🚀 Aceleración: x{t_ref / t_nuevo:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,95 @@
+"""
+===============================================================
+Micro-benchmark + regresión: recorte por tiempo y columnas
+===============================================================
+
+Compara series.Serie (instantes ordenados + bisect + cortes por columna)
+contra recorrer las filas del JSON comparando fecha/hora y armando cada
+dict con los campos pedidos, como haría la vista sin serie precargada.
+Usa series horarias sintéticas de distintas ventanas y verifica que ambas
+devuelvan exactamente las mismas filas.
+
+Ejecución
+- python bench_series.py [repeticiones]
+"""
+
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(BASE_DIR))
+
+from app_mareas.historico import COLUMNAS, a_epoch
+from app_mareas.series import CAMPOS_TIEMPO, cargar_serie
+
+VENTANAS_DIAS = [4, 60, 366]
+CAMPOS = ["altura_promedio", "viento_km_h"]
+HORAS_PEDIDAS = 12
+
+
+def filas_sinteticas(dias: int) -> list:
+    """Filas horarias con todas las columnas del JSON de cache."""
+    inicio = datetime(2025, 1, 1)
+    filas = []
+    for h in range(dias * 24):
+        momento = inicio + timedelta(hours=h)
+        fila = {c: float(h % 13) for c in COLUMNAS}
+        fila["fecha"] = momento.strftime("%Y-%m-%d")
+        fila["hora"] = momento.strftime("%H:%M:%S")
+        filas.append(fila)
+    return filas
+
+
+def recorte_referencia(filas: list, desde: int, hasta: int, campos: list) -> list:
+    """Recorrer todas las filas, calcular su instante y proyectar."""
+    elegidos = [c for c in COLUMNAS if c in CAMPOS_TIEMPO or c in campos]
+    salida = []
+    for fila in filas:
+        instante = a_epoch(datetime.fromisoformat(f"{fila['fecha']}T{fila['hora']}"))
+        if desde <= instante < hasta:
+            salida.append({c: fila[c] for c in elegidos})
+    return salida
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mejor tiempo de varias ejecuciones."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def main(repeticiones: int = 20) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for dias in VENTANAS_DIAS:
+            filas = filas_sinteticas(dias)
+            archivo = Path(tmp) / f"serie_{dias}.json"
+            archivo.write_text(json.dumps({"datos": filas}), encoding="utf-8")
+
+            t0 = time.perf_counter()
+            serie = cargar_serie(archivo, (0, 0, 0))
+            carga = time.perf_counter() - t0
+
+            # Próximas horas a mitad de la ventana
+            desde = serie.instantes[len(serie) // 2]
+            hasta = desde + HORAS_PEDIDAS * 3600
+            esperado = recorte_referencia(filas, desde, hasta, CAMPOS)
+            i, j = serie.rango(desde, hasta)
+            assert serie.filas(i, j, CAMPOS) == esperado, "Las filas recortadas difieren"
+
+            t_ref = medir(lambda: recorte_referencia(filas, desde, hasta, CAMPOS), repeticiones)
+            t_serie = medir(lambda: serie.filas(*serie.rango(desde, hasta), CAMPOS), repeticiones)
+            print(f"⏱️ {dias:>3} días ({len(filas)} filas): recorrido {t_ref * 1000:.3f} ms, "
+                  f"bisect {t_serie * 1000:.4f} ms (x{t_ref / t_serie:.0f}); "
+                  f"carga única {carga * 1000:.1f} ms")
+    print("✅ Mismas filas en todas las ventanas")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -11,7 +11,8 @@ Resumen (para reclutadores)
 - Diseñado para correr en un job/cron y no depender de base de datos.
 
 Fuentes de datos
-- INA (API JSON): serie de alturas por estación en una ventana [hoy 00:00, +3 días].
+- INA (API JSON): serie de alturas por estación en una ventana [hoy 00:00, +3 días]
+  (MAREA_DIAS_VENTANA días desde hoy; MAREA_DIAS_PREVIOS agrega días hacia atrás).
 - SMN (ZIP TXT “pron5d”): pronóstico de 5 días por localidades; se decodifica,
   se detectan bloques por estación y se parsean filas por fecha/hora.
 
@@ -21,6 +22,10 @@ Entradas y configuración
 
 Salida (por estación)
 - Archivo: marea/cache/marea_<estacion>.json
+  (+ .json.gz/.json.br precomprimidos y .json.meta con el ETag; ver cache_mareas.py)
+- Además marea_<estacion>.col.json (columnar) y .msgpack (MAREA_FORMATOS_CACHE)
+- Resoluciones reducidas para gráficos: marea_<estacion>.3h.json (bloques de
+  3 h) y marea_<estacion>.diaria.json (máxima/mínima del día con su hora)
 - Estructura:
   {
     "datos": [
@@ -39,52 +44,95 @@ Salida (por estación)
         "precipitacion_mm": float | null
       },
       ...
+    ],
+    "extremos": [
+      {"tipo": "pleamar" | "bajamar", "instante": ISO local, "fecha": "YYYY-MM-DD",
+       "hora": "HH:MM", "altura": float},
+      ...
     ]
   }
+- marea/cache/marea_<estacion>.extremos.json: solo la sección "extremos"
 
 Flujo 
 - Carga catálogo de estaciones desde JSON.
 - Descarga y parsea el pronóstico del SMN UNA vez por ejecución:
-   -- Abre el ZIP, prueba varias codificaciones (latin1/utf-8/cp1252/utf-16*),
-   -- Detecta encabezados por estación (línea + “====”),
-   -- Extrae filas (fecha, hora, temp, viento, precipitación),
-   -- Mapea viento en 16 rumbos (N, NNE, NE, …) con abreviatura/nombre/ángulo.
-   -- Guarda artefactos de depuración (ZIP y TXT decodificado).
-- Por cada estación:
+   -- Descarga condicional (ETag/Last-Modified) + hash del TXT; si no cambió
+      se reutiliza el snapshot pron5d_snapshot.json sin volver a parsear,
+   -- Descarga en streaming a un SpooledTemporaryFile (memoria hasta
+      MAREA_SMN_SPOOL_BYTES, luego disco); el hash del TXT se calcula por
+      bloques, sin copias completas del ZIP ni del TXT en memoria,
+   -- Detecta la codificación sobre los bytes (BOM o prefijo UTF-8 válido;
+      si no, cp1252) y decodifica una sola vez con un TextIOWrapper,
+   -- Recorre el TXT en una sola pasada (pronostico_smn.py): detecta
+      encabezados por estación (línea + “====”) y extrae filas (fecha, hora,
+      temp, viento, precipitación) solo de las estaciones configuradas,
+   -- Mapea viento en 16 rumbos (N, NNE, NE, …) con abreviatura/nombre/ángulo,
+      clasificando todo el lote en una sola operación (MAREA_ROSA_VIENTOS=8
+      para la rosa de 8).
+   -- Con MAREA_DEBUG_SMN=1 guarda artefactos de depuración (ZIP, TXT crudo
+      y decodificado).
+- Por cada estación (en paralelo, pool acotado por MAREA_MAX_CONCURRENCIA):
    -- Llama al endpoint del INA para la ventana temporal,
-   -- Agrupa por (fecha, hora) y calcula mín/prom/máx,
+   -- Indexa por instante (datetime64 con zona horaria, único y ordenado),
+   -- Agrupa por instante y calcula mín/prom/máx,
    -- Inserta una fila “23:59” cuando hay “00:00” (transición de día),
-   -- Fusiona por (fecha, hora) con el pronóstico si corresponde,
-   -- Persiste el JSON de caché.
+   -- Une por índice con el pronóstico si corresponde (sin filas repetidas),
+   -- Detecta pleamares/bajamares (parábola + histéresis, extremos.py),
+   -- Compara la huella de su entrada (lecturas del INA, ventana y tramo de
+      pronóstico) con la de la última escritura: si no cambió, no agrega,
+      no fusiona ni reescribe (MAREA_FORZAR=1 o --forzar reescribe todo),
+   -- Persiste el JSON de caché y acumula la ventana en el histórico
+      SQLite (historico.py; consultas /marea/alturas/<id>/?desde=&hasta=).
 
 Robustez y trazabilidad
 - Manejo explícito de errores HTTP/JSON y logs legibles (con emojis).
-- Decodificación tolerante del TXT del SMN (múltiples encodings).
+- Decodificación del TXT del SMN con el códec detectado (sin mojibake).
 - Zona horaria fija: America/Argentina/Buenos_Aires.
 - Falla suave si una estación no tiene pronóstico (campos nulos en clima).
 
 Rendimiento
 - Una sola descarga/parseo del pronóstico por corrida; merges por estación.
+- Refresco incremental: las estaciones sin cambios no se reescriben, sus
+  ETag siguen valiendo y no entran en la nueva generación del manifest.
+- Consultas al INA concurrentes con límite de solicitudes por host
+  (MAREA_INTERVALO_HOST) y reporte de duración/resultado por estación.
+- Cliente HTTP compartido (http_cliente.py): pool keep-alive, timeouts,
+  reintentos con backoff y contadores de latencia/bytes por endpoint.
 - Operaciones vectorizadas con pandas (groupby/merge) para volumen diario.
+- Tramos medidos (metricas.py): descarga/codificación/parseo SMN,
+  descarga INA, agregación, merge, extremos, escritura e histórico; resumen
+  al final de la corrida y archivo Prometheus en MAREA_METRICAS_ARCHIVO.
+- MAREA_PERFIL=<directorio> guarda un cProfile de la corrida (las
+  estaciones se procesan en serie mientras se perfila).
 
 Ejecución (CLI)
 - Todas las estaciones:  python actualizacion.py --todas
+  (toma el candado de refresco.py; si hay otra corrida en curso, no hace nada)
 - Estación puntual:      python actualizacion.py <estacion_id>
+- --forzar (en cualquiera de los dos) reescribe aunque la entrada no cambió
+- Como librería: importar el módulo no configura Django ni descarga nada;
+  actualizar_estaciones() carga catálogo y pronóstico al correr.
 
 """
 
 
 import re
 import io
+import hashlib
+import shutil
+import sqlite3
+import tempfile
 import zipfile
-import django
 import requests
 import pandas as pd
 import os
 import json
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Callable, Optional
 import pytz
 import numpy as np
 
@@ -105,63 +153,87 @@ def df_pron_vacio() -> pd.DataFrame:
 
 
 # ============================================================
-# Configurar entorno Django
+# Rutas del proyecto
 # ============================================================
-# Definir BASE_DIR del proyecto y registrar en sys.path
+# Definir BASE_DIR del proyecto y registrar en sys.path (ejecución como script).
+# Importar este módulo no tiene efectos: Django, el catálogo y el pronóstico
+# se cargan recién al correr el job (ver configurar_django y
+# cargar_pronostico_global).
 BASE_DIR = Path(__file__).resolve().parents[3]
-sys.path.append(str(BASE_DIR))
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app_mareas.cache_mareas import (
+    FORMATOS_ADICIONALES, RESOLUCIONES, archivo_estacion, archivo_extremos,
+    directorio_cache, escribir_atomico, escribir_cache, escribir_manifiesto)
+from app_mareas.scripts.jobs.extremos import HISTERESIS_M, extremos_serie
+from app_mareas.historico import ZONA_HORARIA, guardar_serie, ruta_historico
+from app_mareas.refresco import refrescar_sincronico
+from app_mareas.metricas import DIRECTORIO_PERFIL, contar, perfilar, registro, tramo
+from app_mareas.scripts.jobs.http_cliente import cliente_http
+from app_mareas.scripts.jobs.pronostico_smn import (
+    MUESTRA_CODIFICACION, SECTORES_VIENTO, a_tipos_json, detectar_codificacion,
+    parsear_pronostico, tipar_pronostico)
+
+# Endpoints de origen (sobrescribibles para apuntar a un servidor local)
+SMN_URL = os.getenv(
+    "MAREA_SMN_URL", "https://ssl.smn.gob.ar/dpd/zipopendata.php?dato=pron5d")
+INA_URL = os.getenv(
+    "MAREA_INA_URL", "https://alerta.ina.gob.ar/pub/datos/datosProno")
+
+# ============================================================
+# Cargar estaciones desde JSON de configuración (perezoso)
+# ============================================================
+_ESTACIONES: Optional[dict] = None
 
-# Establecer módulo de settings y preparar Django
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chipap.settings")
-django.setup()
+
+def cargar_estaciones() -> dict:
+    """Devolver el catálogo {estacion_id: config}; se lee una vez por proceso."""
+    global _ESTACIONES
+    if _ESTACIONES is not None:
+        return _ESTACIONES
+    estaciones = {}
+    try:
+        estaciones_path = BASE_DIR / "marea" / "scripts" / "data" / "estaciones.json"
+        with open(estaciones_path, "r", encoding="utf-8") as f:
+            estaciones_data = json.load(f)
+            for est in estaciones_data:
+                estaciones[est["id"]] = {
+                    "series_id": est["series_id"],
+                    "site_code": est["site_code"],
+                    "cal_id": est["cal_id"],
+                    "pronostico_id": est.get("pronostico_id"),
+                }
+    except Exception as e:
+        print(f"❌ Error cargando estaciones.json: {e}")
+    _ESTACIONES = estaciones
+    return _ESTACIONES
 
 # ============================================================
-# Catálogo de direcciones de viento
+# Concurrencia
 # ============================================================
-# Definir rosa de vientos con abreviatura, nombre y ángulo base
-DIRECCIONES_VIENTO = [
-    ("N", "Norte", 0.0),
-    ("NE", "Nordeste", 45.0),
-    ("E", "Este", 90.0),
-    ("SE", "Sudeste", 135.0),
-    ("S", "Sur", 180.0),
-    ("SO", "Suroeste", 225.0),
-    ("O", "Oeste", 270.0),
-    ("NO", "Noroeste", 315.0),
-]
+# Máximo de estaciones consultadas en simultáneo (el límite por host
+# lo aplica el cliente HTTP compartido)
+MAX_CONCURRENCIA = int(os.getenv("MAREA_MAX_CONCURRENCIA", "8"))
 
+# Acumular cada ventana en el histórico SQLite (ver historico.py)
+HISTORICO = os.getenv("MAREA_HISTORICO", "1") != "0"
 
-def convertir_direccion(grados: float):
-    """Calcular sector de viento más cercano y devolver (abrev, nombre, ang_base)."""
-    for abrev, nombre, ang in DIRECCIONES_VIENTO:
-        rango_min = (ang - 11.25) % 360
-        rango_max = (ang + 11.25) % 360
-        if rango_min < rango_max:
-            if rango_min <= grados < rango_max:
-                return abrev, nombre, ang
-        else:
-            if grados >= rango_min or grados < rango_max:
-                return abrev, nombre, ang
-    return "N", "Norte", 0.0
+# Volcar ZIP/TXT del SMN al directorio de cache para inspección (apagado por defecto)
+DEBUG_SMN = os.getenv("MAREA_DEBUG_SMN", "0") == "1"
+
+# Tamaño hasta el que el ZIP descargado se mantiene en memoria (luego a disco)
+SMN_SPOOL_BYTES = int(os.getenv("MAREA_SMN_SPOOL_BYTES", str(1024 * 1024)))
 
+# Reescribir todas las estaciones aunque su entrada no haya cambiado
+FORZAR = os.getenv("MAREA_FORZAR", "0") == "1"
 
 # ============================================================
-# Cargar estaciones desde JSON de configuración
+# Ventana temporal consultada al INA
 # ============================================================
-ESTACIONES = {}
-try:
-    estaciones_path = BASE_DIR / "marea" / "scripts" / "data" / "estaciones.json"
-    with open(estaciones_path, "r", encoding="utf-8") as f:
-        estaciones_data = json.load(f)
-        for est in estaciones_data:
-            ESTACIONES[est["id"]] = {
-                "series_id": est["series_id"],
-                "site_code": est["site_code"],
-                "cal_id": est["cal_id"],
-                "pronostico_id": est.get("pronostico_id"),
-            }
-except Exception as e:
-    print(f"❌ Error cargando estaciones.json: {e}")
+# Días desde hoy 00:00 (incluido) y días hacia atrás (hindcast)
+DIAS_VENTANA = max(1, int(os.getenv("MAREA_DIAS_VENTANA", "4")))
+DIAS_PREVIOS = max(0, int(os.getenv("MAREA_DIAS_PREVIOS", "0")))
 
 # ============================================================
 # Utilidad: extraer bloque de una estación dentro del TXT del SMN
@@ -174,231 +246,483 @@ def extraer_bloque_estacion(contenido: str, estacion: str):
     match = patron.search(contenido)
     return match.group(1) if match else None
 
+# ============================================================
+# Directorio de cache y snapshot del último pronóstico parseado
+# ============================================================
+# El SMN publica pron5d pocas veces al día: se guardan los validadores HTTP
+# (ETag/Last-Modified) y el hash del TXT interno junto con el DataFrame ya
+# parseado para evitar decodificar y escanear el archivo si no cambió.
+# El snapshot ya trae el rumbo clasificado: vale solo para el mismo catálogo
+# de estaciones y la misma rosa de vientos (MAREA_ROSA_VIENTOS).
+PRON_ESTADO = "pron5d_estado.json"
+PRON_SNAPSHOT = "pron5d_snapshot.json"
+
+
+def _ids_pronostico() -> list:
+    """Listar pronostico_id configurados (define el contenido del snapshot)."""
+    return sorted({cfg["pronostico_id"] for cfg in cargar_estaciones().values()
+                   if cfg.get("pronostico_id")})
+
+
+def _leer_estado_pronostico() -> dict:
+    """Leer validadores y hash del último TXT procesado ({} si no hay)."""
+    try:
+        with open(directorio_cache() / PRON_ESTADO, "r", encoding="utf-8") as f:
+            estado = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Un snapshot parseado con otro catálogo o con otra rosa de vientos no sirve
+    if estado.get("estaciones") != _ids_pronostico() or \
+            estado.get("sectores_viento") != SECTORES_VIENTO:
+        return {}
+    return estado
+
+
+def _guardar_estado_pronostico(estado: dict) -> None:
+    """Persistir validadores HTTP y hash del TXT."""
+    cache_dir = directorio_cache()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    escribir_atomico(cache_dir / PRON_ESTADO,
+                     json.dumps(estado, indent=2, ensure_ascii=False).encode("utf-8"))
+
+
+def _cargar_snapshot_pronostico() -> Optional[pd.DataFrame]:
+    """Cargar el último pronóstico parseado o None si no hay snapshot útil."""
+    try:
+        with open(directorio_cache() / PRON_SNAPSHOT, "r", encoding="utf-8") as f:
+            df = pd.DataFrame(json.load(f))
+    except (OSError, ValueError):
+        return None
+    return None if df.empty else tipar_pronostico(df)
+
+
+def _guardar_snapshot_pronostico(df: pd.DataFrame, estado: dict) -> None:
+    """Persistir el pronóstico parseado y, después, el estado que lo valida."""
+    cache_dir = directorio_cache()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    registros = a_tipos_json(df).to_dict(orient="records")
+    escribir_atomico(cache_dir / PRON_SNAPSHOT,
+                     json.dumps(registros, ensure_ascii=False).encode("utf-8"))
+    _guardar_estado_pronostico(estado)
+
+
+def _encabezados_condicionales(estado: dict) -> Optional[dict]:
+    """Armar If-None-Match / If-Modified-Since si hay snapshot para reutilizar."""
+    if not estado.get("sha256_txt") or not (directorio_cache() / PRON_SNAPSHOT).exists():
+        return None
+    headers = {}
+    if estado.get("etag"):
+        headers["If-None-Match"] = estado["etag"]
+    if estado.get("last_modified"):
+        headers["If-Modified-Since"] = estado["last_modified"]
+    return headers or None
+
+
 # ============================================================
 # Descargar y parsear pronóstico del SMN
 # ============================================================
 
 
+def resumir_miembro(zip_ref: zipfile.ZipFile, nombre: str,
+                    bloque: int = 64 * 1024) -> tuple:
+    """Leer el miembro por bloques y devolver (sha256 hex, prefijo).
+
+    El prefijo trae un byte más que MUESTRA_CODIFICACION para que
+    detectar_codificacion sepa que el archivo continúa.
+    """
+    sha = hashlib.sha256()
+    prefijo = b""
+    with zip_ref.open(nombre) as miembro:
+        while parte := miembro.read(bloque):
+            sha.update(parte)
+            if len(prefijo) <= MUESTRA_CODIFICACION:
+                prefijo += parte[:MUESTRA_CODIFICACION + 1 - len(prefijo)]
+    return sha.hexdigest(), prefijo
+
+
+def _guardar_depuracion(archivo_zip, zip_ref: zipfile.ZipFile, nombre: str, enc: str) -> None:
+    """Volcar ZIP, TXT crudo y TXT decodificado para inspección (MAREA_DEBUG_SMN).
+
+    Se escriben en directorio_cache(), junto a la cache que describen (en
+    Railway, /app/marea/cache). Todo se copia por bloques desde el temporal
+    y el miembro del ZIP.
+    """
+    debug_dir = directorio_cache()
+    debug_dir.mkdir(parents=True, exist_ok=True)
+    posicion = archivo_zip.tell()
+    archivo_zip.seek(0)
+    with open(debug_dir / "debug_pron.zip", "wb") as f:
+        shutil.copyfileobj(archivo_zip, f)
+    archivo_zip.seek(posicion)
+    with zip_ref.open(nombre) as miembro, open(debug_dir / "debug_pron_raw.bin", "wb") as f:
+        shutil.copyfileobj(miembro, f)
+    with zip_ref.open(nombre) as miembro, \
+            open(debug_dir / f"debug_pron_{enc}.txt", "w", encoding="utf-8", newline="") as f:
+        shutil.copyfileobj(
+            io.TextIOWrapper(miembro, encoding=enc, errors="replace", newline=""), f)
+    print(f"🐞 Artefactos de depuración del SMN en {debug_dir}")
+
+
 def descargar_y_parsear_pronostico() -> pd.DataFrame:
-    """Descargar ZIP del SMN, parsear TXT y devolver DataFrame normalizado (con trazas)."""
+    """Descargar ZIP del SMN, parsear TXT y devolver DataFrame normalizado (con trazas).
+
+    Usa descarga condicional y hash del TXT: si el SMN no publicó nada nuevo
+    devuelve el snapshot del último pronóstico parseado sin decodificar.
+    """
     global PRON_OK
-    url = "https://ssl.smn.gob.ar/dpd/zipopendata.php?dato=pron5d"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(url, headers=headers)
+    estado_prev = _leer_estado_pronostico()
+    try:
+        with tramo("smn_descarga"):
+            response = cliente_http.get(
+                SMN_URL, endpoint="smn", headers=_encabezados_condicionales(estado_prev),
+                stream=True)
+        if response.status_code == 304:
+            response.close()
+            with tramo("smn_snapshot"):
+                df_snapshot = _cargar_snapshot_pronostico()
+            if df_snapshot is not None:
+                print("♻️ SMN sin cambios (304). Se usa el último pronóstico parseado.")
+                contar("marea_smn_total", resultado="no_modificado")
+                PRON_OK = True
+                return df_snapshot
+            print("⚠️ 304 sin snapshot utilizable. Se descarga el ZIP completo.")
+            with tramo("smn_descarga"):
+                response = cliente_http.get(SMN_URL, endpoint="smn", stream=True)
+    except requests.RequestException as e:
+        print(f"❌ Error de red al descargar pronóstico: {e}")
+        contar("marea_smn_total", resultado="error")
+        PRON_OK = False
+        return df_pron_vacio()
     if response.status_code != 200:
+        response.close()
         print(f"❌ Error al descargar pronóstico: {response.status_code}")
+        contar("marea_smn_total", resultado="error")
         PRON_OK = False
         return df_pron_vacio()
 
-    # Leer archivo TXT interno
-    zip_bytes = io.BytesIO(response.content)
-
-    with zipfile.ZipFile(zip_bytes, "r") as zip_ref:
-        candidatos = [n for n in zip_ref.namelist()
-                      if n.lower().endswith(".txt")]
-
-        if not candidatos:
-            print("❌ ZIP sin TXT interno")
+    # Volcar el ZIP a un temporal: en memoria hasta SMN_SPOOL_BYTES, luego
+    # a disco; nunca hay una copia completa del cuerpo en un bytes
+    with tempfile.SpooledTemporaryFile(max_size=SMN_SPOOL_BYTES) as archivo_zip:
+        try:
+            with tramo("smn_volcado"):
+                total = cliente_http.volcar(response, archivo_zip, endpoint="smn")
+        except requests.RequestException as e:
+            print(f"❌ Error de red al leer el ZIP del pronóstico: {e}")
+            contar("marea_smn_total", resultado="error")
             PRON_OK = False
             return df_pron_vacio()
+        print(f"📦 ZIP del SMN: {total} bytes")
+        archivo_zip.seek(0)
+
+        with zipfile.ZipFile(archivo_zip, "r") as zip_ref:
+            candidatos = [n for n in zip_ref.namelist()
+                          if n.lower().endswith(".txt")]
+
+            if not candidatos:
+                print("❌ ZIP sin TXT interno")
+                PRON_OK = False
+                return df_pron_vacio()
+
+            txt_name = candidatos[0]
+
+            info = zip_ref.getinfo(txt_name)
+
+            print(f"📄 TXT dentro del ZIP: {txt_name} | size={info.file_size}")
+            if info.file_size == 0:
+
+                print("❌ TXT vacío en ZIP del SMN. Se preservará meteo previa.")
+                PRON_OK = False
+                return df_pron_vacio()
+
+            # Hash y muestra en una pasada por bloques (el parseo vuelve a
+            # descomprimir el miembro en streaming solo si el TXT cambió)
+            with tramo("smn_lectura_zip"):
+                sha256_txt, prefijo = resumir_miembro(zip_ref, txt_name)
+            print(f"🗜️ Tamaño TXT (bytes): {info.file_size}")
+
+            # Omitir decodificación y parseo si el TXT es idéntico al anterior
+            estado = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "sha256_txt": sha256_txt,
+                "estaciones": _ids_pronostico(),
+                "sectores_viento": SECTORES_VIENTO,
+            }
+            if estado["sha256_txt"] == estado_prev.get("sha256_txt"):
+                with tramo("smn_snapshot"):
+                    df_snapshot = _cargar_snapshot_pronostico()
+                if df_snapshot is not None:
+                    print("♻️ TXT del SMN sin cambios (mismo hash). Se usa el último pronóstico parseado.")
+                    _guardar_estado_pronostico(estado)
+                    contar("marea_smn_total", resultado="sin_cambios")
+                    PRON_OK = True
+                    return df_snapshot
+
+            # Elegir el códec mirando los bytes (BOM / UTF-8 válido); el TXT se
+            # decodifica una sola vez, durante el parseo
+            with tramo("smn_codificacion"):
+                enc = detectar_codificacion(prefijo)
+            print(f"🔤 Codificación detectada: {enc}")
+            if DEBUG_SMN:
+                _guardar_depuracion(archivo_zip, zip_ref, txt_name, enc)
+
+            # Parsear en una sola pasada leyendo el miembro del ZIP como stream
+            estaciones_pronostico = estado["estaciones"]
+            print(f"🔎 Buscando estaciones: {', '.join(estaciones_pronostico)}")
+            with tramo("smn_parseo"), zip_ref.open(txt_name) as miembro:
+                lineas = io.TextIOWrapper(miembro, encoding=enc, errors="ignore")
+                df_pronostico = parsear_pronostico(
+                    lineas, estaciones_pronostico, SECTORES_VIENTO)
+
+    for est in estaciones_pronostico:
+        n = int((df_pronostico["estacion_pronostico"] == est).sum())
+        print(f"📄 {est}: {n} filas extraídas" if n else f"⚠️ No se encontró {est} en el archivo")
+    print(f"✅ Pronóstico procesado: {len(df_pronostico)} registros.")
+    if not df_pronostico.empty:
+        print(df_pronostico.head(5))
+    PRON_OK = not df_pronostico.empty
+    contar("marea_smn_total", resultado="parseado" if PRON_OK else "vacio")
+    if PRON_OK:
+        with tramo("smn_guardado_snapshot"):
+            _guardar_snapshot_pronostico(df_pronostico, estado)
 
-        txt_name = candidatos[0]
+    return df_pronostico
 
-        info = zip_ref.getinfo(txt_name)
 
-        print(f"📄 TXT dentro del ZIP: {txt_name} | size={info.file_size}")
-        if info.file_size == 0:
+# ============================================================
+# Pronóstico global de la corrida (se carga al refrescar, no al importar)
+# ============================================================
+df_pronostico_global: Optional[pd.DataFrame] = None
+pronostico_por_estacion: dict = {}  # pronostico_id -> meteo indexada por instante
+huella_pronostico: dict = {}        # pronostico_id -> sha256 de su meteo
+
+
+def cargar_pronostico_global() -> pd.DataFrame:
+    """Descargar (o reutilizar) el pronóstico y dejarlo indexado por estación."""
+    global df_pronostico_global, pronostico_por_estacion, huella_pronostico
+    df = descargar_y_parsear_pronostico()
+    pronostico_por_estacion = {
+        str(est): indexar_serie(grupo[["fecha", "hora"] + PRON_COLS])
+        for est, grupo in df.groupby("estacion_pronostico", observed=True, sort=False)
+    } if not df.empty else {}
+    huella_pronostico = {est: huella_meteo(meteo)
+                         for est, meteo in pronostico_por_estacion.items()}
+    df_pronostico_global = df
+    print("📊 Pronóstico global (primeras filas):")
+    print(df_pronostico_global.head(10))
+    return df_pronostico_global
 
-            print("❌ TXT vacío en ZIP del SMN. Se preservará meteo previa.")
-            PRON_OK = False
-            return df_pron_vacio()
 
-        raw = zip_ref.read(txt_name)
-        print(f"🗜️ Tamaño TXT (bytes): {len(raw)}")
+# ============================================================
+# Índice temporal: instante con zona horaria, único y ordenado
+# ============================================================
+
 
-        # Guardar artefactos de depuración
-        debug_dir = (BASE_DIR / "marea" / "cache")
-        debug_dir.mkdir(parents=True, exist_ok=True)
-        with open(debug_dir / "debug_pron.zip", "wb") as f:
-            f.write(zip_bytes.getvalue())
-        with open(debug_dir / "debug_pron_raw.bin", "wb") as f:
-            f.write(raw)
+def a_instantes(valores) -> pd.DatetimeIndex:
+    """Convertir timestamps (con o sin offset) a instantes en ZONA_HORARIA."""
+    indice = pd.DatetimeIndex(pd.to_datetime(valores, format="ISO8601"))
+    if indice.tz is None:
+        return indice.tz_localize(ZONA_HORARIA)
+    return indice.tz_convert(ZONA_HORARIA)
 
-        # Intentar múltiples codificaciones y quedarnos con la primera que tenga líneas
-        contenido = None
-        for enc in ["latin1", "utf-8", "cp1252", "utf-16", "utf-16le", "utf-16be"]:
-            try:
-                tmp = raw.decode(enc, errors="ignore")
-                nlineas = len(tmp.splitlines())
-                print(f"🔤 Decodificado como {enc}: {nlineas} líneas")
-                if nlineas > 0:
-                    contenido = tmp
-                    # Dump para inspección rápida
-                    with open(debug_dir / f"debug_pron_{enc}.txt", "w", encoding="utf-8") as f:
-                        f.write(contenido)
-                    break
-            except Exception as e:
-                print(f"⚠️ Error decodificando {enc}: {e}")
-
-        if not contenido:
-
-            print(
-                "❌ No se pudo decodificar el contenido del TXT (0 líneas en todos los intentos)")
-            PRON_OK = False
-            return df_pron_vacio()
 
-    lineas = contenido.splitlines()
-    print(f"🧾 Líneas totales en TXT: {len(lineas)}")
+def unico_y_ordenado(df: pd.DataFrame, conservar: str = "last") -> pd.DataFrame:
+    """Quitar instantes repetidos y ordenar el índice (no-op si ya lo está)."""
+    if not df.index.is_unique:
+        df = df[~df.index.duplicated(keep=conservar)]
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
+
+
+def indexar_serie(df: pd.DataFrame) -> pd.DataFrame:
+    """Pasar columnas fecha/hora a un índice "instante" único y ordenado."""
+    instantes = a_instantes(df["fecha"].astype(str) + " " + df["hora"].astype(str))
+    df = df.drop(columns=["fecha", "hora"]).set_axis(instantes.rename("instante"))
+    return unico_y_ordenado(df)
+
+
+def desindexar_serie(df: pd.DataFrame) -> pd.DataFrame:
+    """Volver a columnas fecha/hora (texto local) al frente, como en el JSON."""
+    fechas = pd.Series(df.index.strftime("%Y-%m-%d"), index=df.index)
+    horas = pd.Series(df.index.strftime("%H:%M:%S"), index=df.index)
+    salida = df.assign(fecha=fechas, hora=horas)
+    columnas = ["fecha", "hora"] + [c for c in df.columns]
+    return salida[columnas].reset_index(drop=True)
+
+
+# ============================================================
+# Transición de día: fila "23:59" a partir de cada "00:00"
+# ============================================================
+
 
-    # Normalizar para comparar títulos de estación de forma robusta
-    def _norm(s: str) -> str:
-        return re.sub(r'[^A-Z0-9]+', '_', s.upper()).strip('_')
+def agregar_cierre_dia(df_ag: pd.DataFrame, inicio: pd.Timestamp) -> pd.DataFrame:
+    """Duplicar cada agregado de 00:00 (posterior a `inicio`) como 23:59 del día previo.
 
-    # Detectar encabezados tolerando líneas en blanco entre nombre y =====
+    `df_ag` está indexado por instante. Opera con máscara + desplazamiento
+    de un minuto sobre todo el bloque, sin recorrer filas. Si ya había una
+    medición a las 23:59, se conserva la medida.
+    """
+    indice = df_ag.index
+    mascara = (indice == indice.normalize()) & (indice > inicio)
 
-    def _is_eq(s: str) -> bool:
-        return re.fullmatch(r"\s*=+\s*", (s or "")) is not None
+    cierre = df_ag[mascara]
+    cierre = cierre.set_axis(cierre.index - pd.Timedelta(minutes=1))
 
-    headers_detectados = []
-    for i in range(len(lineas)):
-        nombre = lineas[i]
-        # nombre en MAYÚSCULAS/_, con espacios permitidos
-        if re.fullmatch(r"\s*[A-Z0-9_]+(?:\s+[A-Z0-9_]+)*\s*", nombre or ""):
-            before1 = lineas[i-1] if i-1 >= 0 else ""
-            before2 = lineas[i-2] if i-2 >= 0 else ""
-            after1 = lineas[i+1] if i+1 < len(lineas) else ""
-            after2 = lineas[i+2] if i+2 < len(lineas) else ""
-            if (_is_eq(before1) or _is_eq(before2)) and (_is_eq(after1) or _is_eq(after2)):
-                headers_detectados.append((_norm(nombre), nombre.strip(), i))
+    return unico_y_ordenado(pd.concat([df_ag, cierre]), conservar="first")
 
-    header_idx_set = {idx for _, _, idx in headers_detectados}
 
-    print(f"🔎 Encabezados detectados: {len(headers_detectados)}")
-    for h in headers_detectados[:10]:
-        print(f"   • raw='{h[1]}' | norm='{h[0]}' | idx={h[2]}")
+# ============================================================
+# Resoluciones reducidas para gráficos (3 h y diaria)
+# ============================================================
+# Bloques alineados a 00/03/06… hora local, el mismo paso que el pron5d
+PASO_SMN = "3h"
+
+
+def agregar_3h(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrupar la serie horaria en bloques de 3 h (mín/máx/promedio + meteo del bloque)."""
+    agregaciones = {
+        "altura_minima": "min",
+        "altura_maxima": "max",
+        "altura_promedio": "mean",
+    }
+    agregaciones.update({c: "first" for c in PRON_COLS if c in df.columns})
+    bloques = df.resample(PASO_SMN, origin="start_day").agg(agregaciones)
+    return desindexar_serie(bloques.dropna(subset=["altura_promedio"]))
+
+
+def extremos_diarios(df: pd.DataFrame) -> pd.DataFrame:
+    """Resumir cada día local: máxima y mínima con su hora, promedio y meteo."""
+    grupos = df.groupby(df.index.normalize())
+    hora_max = pd.DatetimeIndex(grupos["altura_maxima"].idxmax())
+    hora_min = pd.DatetimeIndex(grupos["altura_minima"].idxmin())
+    temperatura = pd.to_numeric(df.get("temperatura"), errors="coerce")
+    precipitacion = pd.to_numeric(df.get("precipitacion_mm"), errors="coerce")
+
+    diario = pd.DataFrame({
+        "altura_maxima": grupos["altura_maxima"].max(),
+        "hora_maxima": hora_max.strftime("%H:%M:%S"),
+        "altura_minima": grupos["altura_minima"].min(),
+        "hora_minima": hora_min.strftime("%H:%M:%S"),
+        "altura_promedio": grupos["altura_promedio"].mean(),
+        "temperatura_minima": temperatura.groupby(df.index.normalize()).min(),
+        "temperatura_maxima": temperatura.groupby(df.index.normalize()).max(),
+        "precipitacion_mm": precipitacion.groupby(df.index.normalize()).sum(min_count=1),
+    })
+    diario.insert(0, "fecha", diario.index.strftime("%Y-%m-%d"))
+    return diario.reset_index(drop=True)
+
+
+def escribir_resoluciones(cache_dir: Path, estacion_id: str, df_medido: pd.DataFrame) -> None:
+    """Escribir marea_<id>.3h.json y marea_<id>.diaria.json (con sus formatos)."""
+    for resolucion, reducir in (("3h", agregar_3h), ("diaria", extremos_diarios)):
+        datos = a_tipos_json(reducir(df_medido)).replace({np.nan: None})
+        escribir_cache(archivo_estacion(cache_dir, estacion_id, resolucion=resolucion),
+                       {"datos": datos.to_dict(orient="records")})
 
-    datos = []
 
-    # Definir patrón de filas de datos
-    pattern_datos = re.compile(
-        r"(\d{2}/[A-Z]{3}/\d{4})\s+(\d{2})Hs\.\s+([-]?\d+(?:\.\d+)?)"
-        r"\s+([A-Z]{1,3}|\d+)\s*\|\s*(\d+)\s+([\d\.]+)"
+# ============================================================
+# Etapas por estación sin red ni disco (ver benchmarks/bench_ingesta.py)
+# ============================================================
+
+
+def agregar_mediciones(data: list, inicio: pd.Timestamp,
+                       fin: pd.Timestamp) -> Optional[tuple]:
+    """Agregar las lecturas del INA por instante dentro de [inicio, fin).
+
+    Devuelve (agregado con filas 23:59, índice de instantes medidos) o None
+    si no quedan lecturas en la ventana. Las resoluciones reducidas usan
+    solo los instantes medidos.
+    """
+    df = pd.DataFrame(data)
+    df = df.set_axis(a_instantes(df["timestart"]).rename("instante"))
+    df = df[(df.index >= inicio) & (df.index < fin)]
+    if df.empty:
+        return None
+
+    # Agregar métricas por instante (índice único y ordenado)
+    df_ag = df.groupby(level="instante").agg(
+        altura_minima=("valor", "min"),
+        altura_maxima=("valor", "max"),
+        altura_promedio=("valor", "mean"),
     )
+    return agregar_cierre_dia(df_ag, inicio), df_ag.index
 
-    # Cargar estaciones de pronóstico (una sola vez)
-    with open(BASE_DIR / "marea" / "scripts" / "data" / "estaciones.json", encoding="utf-8") as f:
-        estaciones_pronostico = [cfg["pronostico_id"] for cfg in json.load(f)]
-
-    # Set normalizado para corte de bloque
-    estaciones_norm_set = {_norm(e) for e in estaciones_pronostico}
-
-    for estacion in estaciones_pronostico:
-        est_norm = _norm(estacion)
-        print(f"🔎 Buscando estación: {estacion} (norm='{est_norm}')...")
-        encontrada = False
-
-        # Ubicar índice del encabezado exacto por forma normalizada
-        idx_header = None
-        raw_header = None
-        for norm_name, raw_name, idx in headers_detectados:
-            if norm_name == est_norm:
-                idx_header = idx
-                raw_header = raw_name
-                encontrada = True
-                print(f"✅ Encontrada '{raw_name}' en línea {idx}")
-                break
-
-        if not encontrada:
-            print(f"⚠️ No se encontró {estacion} en el archivo")
-            continue
-
-        # Avanzar después de las líneas de ===== y los blancos del encabezado
-        l_idx = idx_header + 1
-        while l_idx < len(lineas) and (not lineas[l_idx].strip() or _is_eq(lineas[l_idx])):
-            l_idx += 1
-
-        bloque_lineas = []
-        while l_idx < len(lineas):
-            # Cortar si llegamos al siguiente encabezado detectado (otra estación)
-            if l_idx in header_idx_set and l_idx != idx_header:
-                break
-            l = lineas[l_idx]
-            # Omitir mini-encabezados de tabla y líneas vacías
-            if not l.strip() or any(k in l for k in ["FECHA", "TEMPERATURA", "VIENTO", "PRECIPITACION"]):
-                l_idx += 1
-                continue
-            bloque_lineas.append(l)
-            l_idx += 1
-
-        print(f"📦 Bloque '{estacion}': {len(bloque_lineas)} líneas crudas")
-        filas = pattern_datos.findall("\n".join(bloque_lineas))
-        print(f"📄 {estacion}: {len(filas)} filas extraídas")
-
-        for fecha, hora, temp, viento_dir, viento_vel, prec in filas:
-            def _parse_fecha_es(fecha_txt: str):
-                m = re.match(
-                    r"^(\d{2})/([A-Z]{3})/(\d{4})$", fecha_txt.strip().upper())
-                if not m:
-                    return None
-                d, mes_abbr, y = m.groups()
-                meses = {
-                    "ENE": 1, "FEB": 2, "MAR": 3, "ABR": 4, "MAY": 5, "JUN": 6,
-                    "JUL": 7, "AGO": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DIC": 12
-                }
-                mes = meses.get(mes_abbr)
-                if not mes:
-                    return None
-                return datetime(int(y), mes, int(d)).date()
 
-            fecha_dt = _parse_fecha_es(fecha)
-            if not fecha_dt:
-                continue
+def completar_meteo(df_ag: pd.DataFrame, df_meteo: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Unir la meteo indexada por instante (si hay) y asegurar todas las PRON_COLS."""
+    if df_meteo is not None and not df_meteo.empty:
+        df_ag = df_ag.join(df_meteo, how="left")
+    for c in PRON_COLS:
+        if c not in df_ag.columns:
+            df_ag[c] = None
+    return df_ag
 
-            abbr_to_name_deg = {a: (n, deg)
-                                for (a, n, deg) in DIRECCIONES_VIENTO}
 
-            grados = None
-            abrev = None
-            nombre = None
-            grados_base = None
+def preparar_salida(df_ag: pd.DataFrame, indice_medido: pd.DatetimeIndex) -> tuple:
+    """Devolver (instantes epoch, filas del JSON, serie de instantes medidos).
 
-            raw_dir = viento_dir.strip().upper()
+    Vuelve a fecha/hora de texto, convierte columnas tipadas del pronóstico
+    y NaN/NaT a None para que el JSON tenga 'null'.
+    """
+    instantes = df_ag.index.as_unit("s").asi8.tolist()
+    df_medido = df_ag[df_ag.index.isin(indice_medido)]
+    filas = a_tipos_json(desindexar_serie(df_ag)).replace({np.nan: None})
+    return instantes, filas.to_dict(orient="records"), df_medido
 
-            # Si viene como número (grados)
-            try:
-                grados = float(raw_dir.replace(",", "."))
-                abrev, nombre, grados_base = convertir_direccion(grados)
-            except ValueError:
-                # Si viene como abreviatura (E, NE, ESE, ...)
-                if raw_dir in abbr_to_name_deg:
-                    nombre, grados_base = abbr_to_name_deg[raw_dir]
-                    abrev = raw_dir
-                    grados = float(grados_base)
-                else:
-                    # fallback
-                    abrev, nombre, grados_base = ("N", "Norte", 0.0)
-                    grados = 0.0
-
-            datos.append({
-                "estacion_pronostico": estacion,
-                "fecha": fecha_dt.isoformat(),
-                "hora": f"{hora}:00:00",
-                "temperatura": float(temp),
-                "viento_direccion": grados,
-                "viento_direccion_abreviatura": abrev,
-                "viento_direccion_nombre": nombre,
-                "viento_direccion_grados": grados_base,
-                "viento_km_h": int(viento_vel),
-                "precipitacion_mm": float(prec),
-            })
-
-    df_pronostico = pd.DataFrame(datos)
-    print(f"✅ Pronóstico procesado: {len(df_pronostico)} registros.")
-    if not df_pronostico.empty:
-        print(df_pronostico.head(5))
-    PRON_OK = not df_pronostico.empty
 
-    return df_pronostico
+# ============================================================
+# Huella de entrada por estación (refresco incremental)
+# ============================================================
+# Si las lecturas del INA, la ventana y el tramo de pronóstico de una
+# estación son los de la última escritura, sus archivos ya reflejan esos
+# datos: se omiten agregación, merge y escritura, y los ETag no cambian.
+# Subir VERSION_SALIDA al cambiar el contenido de los archivos de cache.
+VERSION_SALIDA = 1
+
+
+def archivo_huella(cache_dir: Path, estacion_id: str) -> Path:
+    """Ruta de la huella de la última escritura de la estación."""
+    return Path(cache_dir) / f"marea_{estacion_id}.huella.json"
+
+
+def huella_datos(data: list) -> str:
+    """sha256 de las lecturas del INA serializadas en forma canónica."""
+    cuerpo = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(cuerpo.encode("utf-8")).hexdigest()
+
+
+def huella_meteo(df_meteo: pd.DataFrame) -> str:
+    """sha256 de la meteo indexada de una estación (valores e instantes)."""
+    filas = pd.util.hash_pandas_object(df_meteo, index=True).to_numpy()
+    return hashlib.sha256(filas.tobytes()).hexdigest()
+
+
+def huella_entrada(data: list, inicio: pd.Timestamp, fin: pd.Timestamp, meteo: str) -> dict:
+    """Todo lo que determina los archivos de la estación, en forma comparable."""
+    return {
+        "version": VERSION_SALIDA,
+        "configuracion": [HISTERESIS_M, FORMATOS_ADICIONALES, SECTORES_VIENTO],
+        "ventana": [inicio.isoformat(), fin.isoformat()],
+        "ina": huella_datos(data),
+        "meteo": meteo,
+    }
+
+
+def _leer_huella(cache_dir: Path, estacion_id: str) -> dict:
+    """Huella de la última escritura ({} si no hay)."""
+    try:
+        with open(archivo_huella(cache_dir, estacion_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _cache_completa(cache_dir: Path, estacion_id: str) -> bool:
+    """Verificar que sigan en disco los archivos que describe la huella."""
+    rutas = [archivo_estacion(cache_dir, estacion_id, resolucion=r) for r in RESOLUCIONES]
+    rutas.append(archivo_extremos(cache_dir, estacion_id))
+    return all(r.exists() for r in rutas)
 
 
 # ============================================================
@@ -406,179 +730,287 @@ def descargar_y_parsear_pronostico() -> pd.DataFrame:
 # ============================================================
 
 
-def actualizar_datos_marea(estacion_id: str, series_id: int, site_code: str, cal_id: int):
-    """Consultar INA, agregar métricas y fusionar con pronóstico si existe."""
-    argentina = pytz.timezone("America/Argentina/Buenos_Aires")
+def actualizar_datos_marea(estacion_id: str, series_id: int, site_code: str, cal_id: int,
+                           forzar: bool = FORZAR) -> Optional[bool]:
+    """Consultar INA, agregar métricas y fusionar con pronóstico si existe.
+
+    Devuelve True si se escribió la cache de la estación, None si la entrada
+    no cambió desde la última escritura (la cache sigue vigente y no se toca)
+    y False si falló. Si todavía no se cargó el pronóstico de la corrida, se
+    carga antes de consultar el INA.
+    """
+    if df_pronostico_global is None:
+        cargar_pronostico_global()
+
+    argentina = pytz.timezone(ZONA_HORARIA)
     ahora = datetime.now(argentina)
 
     try:
-        # Definir ventana [00:00 hoy, 23:59 + 3 días]
+        # Definir ventana [00:00 hoy - DIAS_PREVIOS, 23:59 del último día]
         inicio = ahora.replace(hour=0, minute=0, second=0,
-                               microsecond=0, tzinfo=None)
-        fin = inicio + timedelta(days=3, seconds=86399)
+                               microsecond=0, tzinfo=None) - timedelta(days=DIAS_PREVIOS)
+        fin_exclusivo = inicio + timedelta(days=DIAS_PREVIOS + DIAS_VENTANA)
+        fin = fin_exclusivo - timedelta(seconds=1)
 
         # Construir URL al endpoint del INA (mantener forma actual)
         url = (
-            f"https://alerta.ina.gob.ar/pub/datos/datosProno"
+            f"{INA_URL}"
             f"&timeStart={inicio.strftime('%Y-%m-%d')}"
             f"&timeEnd={fin.strftime('%Y-%m-%d')}"
             f"&seriesId={series_id}&calId={cal_id}&all=false&siteCode={site_code}&varId=2&format=json"
         )
 
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers)
+        try:
+            with tramo("ina_descarga"):
+                response = cliente_http.get(url, endpoint="ina")
+        except requests.RequestException as e:
+            print(f"❌ Error de red para {estacion_id}: {e}")
+            return False
         if response.status_code != 200:
             print(f"❌ Error HTTP para {estacion_id}: {response.status_code}")
-            return
+            return False
 
         # Parsear JSON del INA
         try:
-            data = response.json().get("data", [])
+            with tramo("ina_json"):
+                data = response.json().get("data", [])
         except json.JSONDecodeError as e:
             print(f"❌ Error al parsear JSON para {estacion_id}: {e}")
-            return
+            return False
 
         if not data:
             print(f"⚠️ No hay datos nuevos para {estacion_id}.")
-            return
-
-        # Normalizar a DataFrame y derivar fecha/hora
-        df = pd.DataFrame(data)
-        df["timestart_dt"] = pd.to_datetime(df["timestart"])
-        df["fecha"] = df["timestart_dt"].dt.date.astype(str)
-        df["hora"] = df["timestart_dt"].dt.time.astype(str)
-
-        # Filtrar ventana temporal útil
-        df = df[df["timestart_dt"] >= inicio]
-        df = df[df["timestart_dt"] < inicio + timedelta(days=4)]
-        if df.empty:
+            return False
+
+        inicio_local = pd.Timestamp(inicio).tz_localize(ZONA_HORARIA)
+        fin_local = pd.Timestamp(fin_exclusivo).tz_localize(ZONA_HORARIA)
+        pronostico_id = cargar_estaciones()[estacion_id].get("pronostico_id")
+        cache_dir = directorio_cache()
+
+        # Comparar la entrada con la de la última escritura; sin SMN nuevo la
+        # meteo se arrastra desde la cache, así que vale la huella previa
+        with tramo("huella"):
+            previa = _leer_huella(cache_dir, estacion_id)
+            meteo = (huella_pronostico.get(pronostico_id, "") if PRON_OK
+                     else previa.get("meteo", ""))
+            huella = huella_entrada(data, inicio_local, fin_local, meteo)
+        if not forzar and huella == previa and _cache_completa(cache_dir, estacion_id):
+            print(f"♻️ Sin cambios para {estacion_id}: se conserva la cache.")
+            return None
+
+        # Agregar por instante dentro de la ventana (zona horaria local)
+        with tramo("agregacion"):
+            agregado = agregar_mediciones(data, inicio_local, fin_local)
+        if agregado is None:
             print(f"⚠️ Datos vacíos para {estacion_id} después de filtrar.")
-            return
-
-        # Agregar métricas por (fecha, hora)
-        df_ag = (
-            df.groupby(["fecha", "hora"])
-            .agg(
-                altura_minima=("valor", "min"),
-                altura_maxima=("valor", "max"),
-                altura_promedio=("valor", "mean"),
-            )
-            .reset_index()
-        )
-
-        # Agregar fila 23:59 cuando hay valor en 00:00
-        df_ag["datetime"] = pd.to_datetime(
-            df_ag["fecha"] + " " + df_ag["hora"])
-        nuevas_filas = []
-        for _, row in df_ag.iterrows():
-            if row["hora"] == "00:00:00" and row["datetime"] > inicio:
-                nueva_fila = row.copy()
-                nueva_fila["datetime"] = row["datetime"] - timedelta(minutes=1)
-                nueva_fila["fecha"] = nueva_fila["datetime"].date().isoformat()
-                nueva_fila["hora"] = nueva_fila["datetime"].time().isoformat()
-                nuevas_filas.append(nueva_fila)
-
-        df_ag = pd.concat(
-            [df_ag, pd.DataFrame(nuevas_filas)], ignore_index=True)
-        df_ag = df_ag.drop(columns=["datetime"]).sort_values(
-            by=["fecha", "hora"])
+            return False
+        df_ag, indice_medido = agregado
 
         # Fusionar meteo preservando SMN previo si el ZIP viene vacío
-        pronostico_id = ESTACIONES[estacion_id].get("pronostico_id")
-
-        if not PRON_OK:
-            # arrastrar meteo previa desde cache si existe
-            try:
-                cache_dir_prev = Path("/app/marea/cache") if os.environ.get(
-                    "RAILWAY_ENVIRONMENT") else BASE_DIR / "marea" / "cache"
-                with open(cache_dir_prev / f"marea_{estacion_id}.json", "r", encoding="utf-8") as f:
-                    prev = json.load(f).get("datos", [])
-                df_prev = pd.DataFrame(prev)[["fecha", "hora"] + PRON_COLS]
-                df_prev = df_prev.drop_duplicates(
-                    subset=["fecha", "hora"], keep="last")
-                df_ag = df_ag.merge(df_prev, on=["fecha", "hora"], how="left")
-                print("ℹ️ SMN no actualizado. Se preservó meteo previa desde cache.")
-            except Exception as e:
-                print(
-                    f"ℹ️ No se pudo leer meteo previa para {estacion_id}: {e}")
-                for c in PRON_COLS:
-                    if c not in df_ag.columns:
-                        df_ag[c] = None
-        else:
-            if pronostico_id:
-                df_pron = df_pronostico_global[df_pronostico_global["estacion_pronostico"] == pronostico_id]
-                if not df_pron.empty:
-                    df_ag = df_ag.merge(
-                        df_pron[["fecha", "hora"] + PRON_COLS],
-                        on=["fecha", "hora"],
-                        how="left",
-                    )
-                else:
-                    for c in PRON_COLS:
-                        if c not in df_ag.columns:
-                            df_ag[c] = None
-            else:
-                for c in PRON_COLS:
-                    if c not in df_ag.columns:
-                        df_ag[c] = None
+        with tramo("fusion_meteo"):
+            df_meteo = None
+            if not PRON_OK:
+                # arrastrar meteo previa desde cache si existe
+                try:
+                    with open(cache_dir / f"marea_{estacion_id}.json", "r", encoding="utf-8") as f:
+                        prev = json.load(f).get("datos", [])
+                    df_meteo = indexar_serie(
+                        pd.DataFrame(prev)[["fecha", "hora"] + PRON_COLS])
+                    print("ℹ️ SMN no actualizado. Se preservó meteo previa desde cache.")
+                except Exception as e:
+                    print(
+                        f"ℹ️ No se pudo leer meteo previa para {estacion_id}: {e}")
+            elif pronostico_id:
+                df_meteo = pronostico_por_estacion.get(pronostico_id)
+            df_ag = completar_meteo(df_ag, df_meteo)
 
         print(
             f"🔗 Merge completado para {estacion_id}, filas finales: {len(df_ag)}")
 
-        # Definir directorio de cache según entorno (Railway vs local)
-        cache_dir = Path("/app/marea/cache") if os.environ.get(
-            "RAILWAY_ENVIRONMENT") else BASE_DIR / "marea" / "cache"
+        # Crear el directorio de cache según entorno (Railway vs local)
         cache_dir.mkdir(parents=True, exist_ok=True)
 
-        # asegurar que existan todas las columnas meteo
-        meteo_cols = [
-            "temperatura",
-            "viento_direccion",
-            "viento_direccion_abreviatura",
-            "viento_direccion_nombre",
-            "viento_direccion_grados",
-            "viento_km_h",
-            "precipitacion_mm",
-        ]
-        for c in meteo_cols:
-            if c not in df_ag.columns:
-                df_ag[c] = None
-
-        # convertir NaN/NaT a None para que el JSON tenga 'null'
-        df_ag = df_ag.replace({np.nan: None})
-
-        salida = {"datos": df_ag.to_dict(orient="records")}
-        with open(cache_dir / f"marea_{estacion_id}.json", "w", encoding="utf-8") as f:
-            json.dump(salida, f, indent=2, ensure_ascii=False)
+        with tramo("preparacion_json"):
+            instantes, filas, df_medido = preparar_salida(df_ag, indice_medido)
+
+        # Pleamares/bajamares sobre los instantes medidos (ver extremos.py)
+        with tramo("extremos"):
+            extremos = extremos_serie(df_medido["altura_promedio"])
+
+        # Persistir JSON + payload comprimido y ETag para las vistas
+        with tramo("escritura_cache"):
+            salida = {"datos": filas, "extremos": extremos}
+            escribir_cache(cache_dir / f"marea_{estacion_id}.json", salida)
+            escribir_cache(archivo_extremos(cache_dir, estacion_id),
+                           {"extremos": extremos}, formatos=[])
+            escribir_resoluciones(cache_dir, estacion_id, df_medido)
+
+        # Sumar la ventana al histórico (rangos pasados sin volver al INA)
+        if HISTORICO:
+            try:
+                with tramo("historico"):
+                    guardar_serie(ruta_historico(cache_dir), estacion_id,
+                                  instantes, salida["datos"])
+            except sqlite3.Error as e:
+                print(f"⚠️ No se pudo actualizar el histórico de {estacion_id}: {e}")
+
+        # La huella va al final: si algo falla antes, la próxima corrida reescribe
+        escribir_atomico(archivo_huella(cache_dir, estacion_id),
+                         json.dumps(huella).encode("utf-8"))
 
         print(f"✅ Datos guardados para {estacion_id}")
+        return True
 
     except Exception as e:
         # Registrar cualquier error inesperado y continuar con el resto
         print(f"❌ Error inesperado en {estacion_id}: {e}")
+        return False
+
+
+# ============================================================
+# Motor de actualización concurrente (todas las estaciones)
+# ============================================================
+
+
+def actualizar_estaciones(estaciones: Optional[dict] = None,
+                          max_concurrencia: Optional[int] = None,
+                          progreso: Optional[Callable[[dict], None]] = None,
+                          forzar: bool = FORZAR) -> list:
+    """Actualizar estaciones en paralelo y devolver un reporte por estación.
+
+    El pronóstico se (re)carga una vez al inicio de cada corrida; luego cada
+    estación consulta el INA en su propio hilo (pool acotado por
+    `max_concurrencia`) y se fusiona contra el mismo `df_pronostico_global`.
+    Al terminar se publica una nueva generación en manifest.json con las
+    estaciones que se reescribieron (las que no cambiaron no la disparan).
+    El reporte respeta el orden del catálogo:
+      [{"estacion", "ok", "sin_cambios", "duracion_s", "error"}, ...]
+    `progreso` recibe cada entrada del reporte apenas termina su estación
+    (desde el hilo que llamó a esta función; ver refresco.py).
+    """
+    estaciones = cargar_estaciones() if estaciones is None else estaciones
+    if not estaciones:
+        return []
+    cargar_pronostico_global()
+    limite = max_concurrencia or MAX_CONCURRENCIA
+    workers = max(1, min(limite, len(estaciones)))
+
+    def _ejecutar(est: str, config: dict) -> dict:
+        t0 = time.perf_counter()
+        error = None
+        try:
+            resultado = actualizar_datos_marea(
+                est, config["series_id"], config["site_code"], config["cal_id"],
+                forzar=forzar)
+        except Exception as e:
+            resultado, error = False, str(e)
+        ok, sin_cambios = resultado is not False, resultado is None
+        contar("marea_estaciones_total",
+               resultado="sin_cambios" if sin_cambios else "ok" if ok else "error")
+        return {
+            "estacion": est,
+            "ok": ok,
+            "sin_cambios": sin_cambios,
+            "duracion_s": round(time.perf_counter() - t0, 3),
+            "error": error,
+        }
+
+    reporte = []
+    if DIRECTORIO_PERFIL:
+        # cProfile solo ve el hilo que lo activó: perfilar en serie
+        for est, config in estaciones.items():
+            reporte.append(_ejecutar(est, config))
+            if progreso:
+                progreso(reporte[-1])
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="marea") as pool:
+            futuros = [pool.submit(_ejecutar, est, config)
+                       for est, config in estaciones.items()]
+            for futuro in as_completed(futuros):
+                reporte.append(futuro.result())
+                if progreso:
+                    progreso(reporte[-1])
+
+    orden = {est: i for i, est in enumerate(estaciones)}
+    reporte.sort(key=lambda r: orden[r["estacion"]])
+
+    actualizadas = [r["estacion"] for r in reporte if r["ok"] and not r["sin_cambios"]]
+    if actualizadas:
+        manifiesto = escribir_manifiesto(directorio_cache(), actualizadas)
+        print(f"🗂️ Generación {manifiesto['generacion']} publicada "
+              f"({len(actualizadas)}/{len(reporte)} estaciones)")
+    elif any(r["ok"] for r in reporte):
+        print("♻️ Ninguna estación cambió: se conserva la generación vigente")
+    return reporte
 
 
 # ============================================================
 # Punto de entrada del script
 # ============================================================
-# Descargar pronóstico global una única vez
-df_pronostico_global = descargar_y_parsear_pronostico()
 
-print("📊 Pronóstico global (primeras filas):")
-print(df_pronostico_global.head(10))
+
+def configurar_django() -> None:
+    """Preparar Django para ejecución como script (no se hace al importar)."""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mareas.settings")
+    django.setup()
+
+
+def publicar_metricas() -> None:
+    """Resumir tramos por consola y, si se pidió, dejar el archivo Prometheus.
+
+    MAREA_METRICAS_ARCHIVO=<ruta>.prom sigue la convención del textfile
+    collector de node_exporter (escritura atómica, se reemplaza por corrida).
+    """
+    for etiquetas, cantidad, total in registro.resumen_tramos():
+        print(f"⏲️ {etiquetas['tramo']}: {total:.3f}s en {cantidad} llamadas")
+    destino = os.getenv("MAREA_METRICAS_ARCHIVO")
+    if destino:
+        escribir_atomico(Path(destino), registro.exportar().encode("utf-8"))
+        print(f"📈 Métricas escritas en {destino}")
+
 
 if __name__ == "__main__":
+    configurar_django()
+
     # Ejecutar para una estación específica: python actualizacion.py <estacion>
     # Ejecutar para todas: python actualizacion.py  (o con --todas)
-    if len(sys.argv) > 1 and sys.argv[1] != "--todas":
-        est = sys.argv[1]
-        config = ESTACIONES.get(est)
+    # --forzar reescribe aunque la entrada no haya cambiado
+    forzar = FORZAR or "--forzar" in sys.argv
+    argumentos = [a for a in sys.argv[1:] if a != "--forzar"]
+    if argumentos and argumentos[0] != "--todas":
+        est = argumentos[0]
+        config = cargar_estaciones().get(est)
         if not config:
             print(f"❌ Estación '{est}' no definida.")
         else:
-            actualizar_datos_marea(
-                est, config["series_id"], config["site_code"], config["cal_id"])
+            with perfilar(f"actualizacion_{est}"):
+                ok = actualizar_datos_marea(
+                    est, config["series_id"], config["site_code"], config["cal_id"],
+                    forzar=forzar)
+            if ok:
+                escribir_manifiesto(directorio_cache(), [est])
+            publicar_metricas()
     else:
-        for est, config in ESTACIONES.items():
-            actualizar_datos_marea(
-                est, config["series_id"], config["site_code"], config["cal_id"])
+        # Mismo candado y estado que el refresco por API (refresco.py): si ya
+        # hay una corrida en curso (otro cron, POST /actualizar-mareas/) no se duplica
+        def _ejecutar(seguimiento):
+            seguimiento.comenzar(list(cargar_estaciones()))
+            return actualizar_estaciones(progreso=seguimiento.estacion, forzar=forzar)
+
+        t0 = time.perf_counter()
+        with perfilar("actualizacion"):
+            reporte = refrescar_sincronico(directorio_cache(), _ejecutar)
+        if reporte is None:
+            print("⏳ Ya hay una actualización en curso; se omite esta corrida.")
+            sys.exit(0)
+        for r in reporte:
+            estado = "♻️" if r["sin_cambios"] else "✅" if r["ok"] else "❌"
+            print(f"{estado} {r['estacion']}: {r['duracion_s']:.2f}s")
+        print(f"⏱️ Actualización completa en {time.perf_counter() - t0:.2f}s")
+        for endpoint, m in cliente_http.estadisticas().items():
+            print(f"🌐 {endpoint}: {m['solicitudes']} solicitudes, "
+                  f"{m['bytes']} bytes, {m['latencia_total_s']:.2f}s "
+                  f"(máx {m['latencia_max_s']:.2f}s), {m['reintentos']} reintentos")
+        publicar_metricas()
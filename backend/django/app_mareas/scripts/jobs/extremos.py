@@ -0,0 +1,120 @@
+"""
+===============================================================
+Pleamares y bajamares a partir de la serie horaria de alturas
+===============================================================
+
+1. Candidatos (NumPy, sin recorrer filas): cambios de signo de la
+   pendiente; las mesetas (pendiente 0) heredan el signo anterior.
+2. Hora y altura fina: parábola por el candidato y sus dos vecinos
+   (admite espaciado irregular); el vértice da el extremo entre horas.
+3. Histéresis: se alternan pleamar/bajamar y un extremo solo se acepta
+   si difiere al menos `histeresis` metros del anterior; los picos
+   intermedios menores (ruido, ondas cortas) se descartan y entre dos
+   del mismo tipo se conserva el más marcado.
+
+El paso 3 recorre solo los candidatos (unos pocos por día).
+
+Sin efectos secundarios al importar: usable desde el job y desde benchmarks.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Diferencia mínima (m) entre una pleamar y la bajamar siguiente (o viceversa)
+HISTERESIS_M = float(os.getenv("MAREA_HISTERESIS_M", "0.10"))
+
+PLEAMAR = "pleamar"
+BAJAMAR = "bajamar"
+
+
+# ============================================================
+# Detección
+# ============================================================
+
+
+def _candidatos(y: np.ndarray) -> tuple:
+    """Índices de máximos y mínimos locales interiores (mesetas incluidas)."""
+    signo = np.sign(np.diff(y))
+    # Propagar el último signo no nulo sobre las mesetas
+    ultimo = np.where(signo != 0, np.arange(len(signo)), 0)
+    signo = signo[np.maximum.accumulate(ultimo)]
+    cambio = np.diff(signo)
+    return np.flatnonzero(cambio == -2) + 1, np.flatnonzero(cambio == 2) + 1
+
+
+def _vertices(t: np.ndarray, y: np.ndarray, i: np.ndarray) -> tuple:
+    """Vértice de la parábola por (i-1, i, i+1) para cada índice (t en horas)."""
+    x0, x2 = t[i - 1] - t[i], t[i + 1] - t[i]
+    d0, d2 = y[i - 1] - y[i], y[i + 1] - y[i]
+    det = x0 * x2 * (x0 - x2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = (d0 * x2 - d2 * x0) / det
+        b = (x0 * x0 * d2 - x2 * x2 * d0) / det
+        xv = np.where(a != 0, -b / (2 * a), 0.0)
+    xv = np.clip(np.nan_to_num(xv), x0, x2)
+    yv = y[i] + np.nan_to_num(a * xv * xv + b * xv)
+    return t[i] + xv, yv
+
+
+def detectar_extremos(t: np.ndarray, y: np.ndarray,
+                      histeresis: float = HISTERESIS_M) -> list:
+    """Devolver [(tipo, t, altura), ...] ordenado por t.
+
+    `t` son horas (float, crecientes) y `y` alturas; se ignoran NaN.
+    """
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    validos = ~np.isnan(y)
+    t, y = t[validos], y[validos]
+    if len(y) < 3:
+        return []
+
+    picos, valles = _candidatos(y)
+    indices = np.concatenate([picos, valles])
+    tipos = np.array([PLEAMAR] * len(picos) + [BAJAMAR] * len(valles))
+    orden = np.argsort(indices, kind="stable")
+    indices, tipos = indices[orden], tipos[orden]
+    tv, yv = _vertices(t, y, indices)
+
+    # Alternancia + histéresis sobre los candidatos
+    extremos = []
+    for tipo, te, ye in zip(tipos.tolist(), tv.tolist(), yv.tolist()):
+        if extremos and extremos[-1][0] == tipo:
+            previo = extremos[-1][2]
+            if (ye > previo) if tipo == PLEAMAR else (ye < previo):
+                extremos[-1] = (tipo, te, ye)
+        elif not extremos or abs(ye - extremos[-1][2]) >= histeresis:
+            extremos.append((tipo, te, ye))
+    return extremos
+
+
+# ============================================================
+# Serie indexada -> sección "extremos" del JSON
+# ============================================================
+
+
+def extremos_serie(alturas: pd.Series, histeresis: float = HISTERESIS_M) -> list:
+    """Detectar extremos de una serie indexada por instante (con zona horaria).
+
+    Devuelve dicts listos para el JSON:
+      {"tipo", "instante" (ISO local), "fecha", "hora" (HH:MM), "altura"}
+    """
+    if alturas.empty:
+        return []
+    indice = alturas.index
+    horas = (indice - indice[0]) / pd.Timedelta(hours=1)
+    extremos = detectar_extremos(np.asarray(horas), alturas.to_numpy(dtype=float), histeresis)
+
+    salida = []
+    for tipo, h, altura in extremos:
+        instante = (indice[0] + pd.Timedelta(hours=h)).round("min")
+        salida.append({
+            "tipo": tipo,
+            "instante": instante.isoformat(),
+            "fecha": instante.strftime("%Y-%m-%d"),
+            "hora": instante.strftime("%H:%M"),
+            "altura": round(float(altura), 3),
+        })
+    return salida
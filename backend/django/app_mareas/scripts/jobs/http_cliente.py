@@ -0,0 +1,204 @@
+"""
+===============================================================
+Cliente HTTP compartido para las descargas del job (INA y SMN)
+===============================================================
+
+- Sesión `requests` única por proceso con pool de conexiones y keep-alive.
+- Timeouts de conexión y lectura en todas las solicitudes.
+- Reintentos con backoff exponencial y jitter ante errores de red, 429 y 5xx.
+  Cubren la solicitud y, sin `stream`, la lectura del cuerpo; un cuerpo en
+  streaming que se corta en `volcar` no se reintenta (se cuenta como error
+  y se propaga: quien llama decide, p. ej. el job conserva la meteo previa).
+- Límite de solicitudes por host (intervalo mínimo entre solicitudes).
+- Contadores por endpoint: solicitudes, errores, reintentos, bytes y latencia.
+
+Variables de entorno
+- MAREA_HTTP_TIMEOUT_CONEXION  segundos para conectar (5)
+- MAREA_HTTP_TIMEOUT_LECTURA   segundos entre bytes recibidos (30)
+- MAREA_HTTP_REINTENTOS        reintentos tras el primer intento (3)
+- MAREA_HTTP_BACKOFF           base del backoff exponencial en segundos (0.5)
+- MAREA_HTTP_POOL              conexiones keep-alive por host (16)
+- MAREA_INTERVALO_HOST         separación mínima entre solicitudes a un host (0.2)
+
+Uso
+    from app_mareas.scripts.jobs.http_cliente import cliente_http
+    resp = cliente_http.get(url, endpoint="ina")
+    resp = cliente_http.get(url, endpoint="smn", stream=True)
+    cliente_http.volcar(resp, archivo, endpoint="smn")   # cuerpo a archivo
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Estados HTTP que justifican reintentar
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+# ============================================================
+# Límite de solicitudes por host
+# ============================================================
+
+
+class LimitadorPorHost:
+    """Espaciar solicitudes a un mismo host respetando un intervalo mínimo."""
+
+    def __init__(self, intervalo_min: float):
+        self.intervalo_min = intervalo_min
+        self._proximo_turno = {}
+        self._lock = threading.Lock()
+
+    def esperar(self, url: str) -> None:
+        """Bloquear hasta que el host de la URL tenga turno disponible."""
+        if self.intervalo_min <= 0:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo_turno.get(host, 0.0))
+            self._proximo_turno[host] = turno + self.intervalo_min
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+# ============================================================
+# Cliente HTTP con pool, timeouts, reintentos y métricas
+# ============================================================
+
+
+class ClienteHTTP:
+    """Envolver una sesión requests con timeouts, reintentos y contadores."""
+
+    def __init__(
+        self,
+        timeout_conexion: float = 5.0,
+        timeout_lectura: float = 30.0,
+        reintentos: int = 3,
+        backoff: float = 0.5,
+        pool: int = 16,
+        limitador: Optional[LimitadorPorHost] = None,
+    ):
+        self.timeout = (timeout_conexion, timeout_lectura)
+        self.reintentos = max(0, reintentos)
+        self.backoff = backoff
+        self.limitador = limitador or LimitadorPorHost(0)
+
+        self.sesion = requests.Session()
+        self.sesion.headers.update({"User-Agent": "Mozilla/5.0"})
+        adaptador = HTTPAdapter(pool_connections=pool, pool_maxsize=pool,
+                                max_retries=0)
+        self.sesion.mount("http://", adaptador)
+        self.sesion.mount("https://", adaptador)
+
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    # ---------------- Métricas ----------------
+
+    def _registrar(self, endpoint: str, **valores) -> None:
+        """Acumular contadores del endpoint de forma segura entre hilos."""
+        with self._lock:
+            m = self._metricas.setdefault(endpoint, {
+                "solicitudes": 0,
+                "errores": 0,
+                "reintentos": 0,
+                "bytes": 0,
+                "latencia_total_s": 0.0,
+                "latencia_max_s": 0.0,
+            })
+            for clave, valor in valores.items():
+                if clave == "latencia_s":
+                    m["latencia_total_s"] += valor
+                    m["latencia_max_s"] = max(m["latencia_max_s"], valor)
+                else:
+                    m[clave] += valor
+
+    def estadisticas(self) -> dict:
+        """Devolver copia de los contadores por endpoint."""
+        with self._lock:
+            return {ep: dict(m) for ep, m in self._metricas.items()}
+
+    # ---------------- Solicitudes ----------------
+
+    def _esperar_backoff(self, intento: int) -> None:
+        """Dormir un tiempo aleatorio en [0, backoff * 2^intento] (full jitter)."""
+        time.sleep(random.uniform(0, self.backoff * (2 ** intento)))
+
+    def get(self, url: str, endpoint: str, headers: Optional[dict] = None,
+            stream: bool = False) -> requests.Response:
+        """GET con timeouts y reintentos; propaga la última falla de red.
+
+        Con `stream=True` el cuerpo no se lee aquí: se consume con `volcar`,
+        que registra los bytes y no reintenta si la transferencia se corta.
+        """
+        for intento in range(self.reintentos + 1):
+            ultimo = intento == self.reintentos
+            self.limitador.esperar(url)
+            t0 = time.perf_counter()
+            try:
+                resp = self.sesion.get(url, headers=headers,
+                                       timeout=self.timeout, stream=stream)
+                if not stream:
+                    _ = resp.content  # leer cuerpo dentro de la medición
+            except (requests.ConnectionError, requests.Timeout):
+                self._registrar(endpoint, solicitudes=1, errores=1,
+                                latencia_s=time.perf_counter() - t0)
+                if ultimo:
+                    raise
+                self._registrar(endpoint, reintentos=1)
+                self._esperar_backoff(intento)
+                continue
+
+            self._registrar(
+                endpoint,
+                solicitudes=1,
+                errores=int(resp.status_code >= 400),
+                bytes=0 if stream else len(resp.content),
+                latencia_s=time.perf_counter() - t0,
+            )
+            if resp.status_code in ESTADOS_REINTENTABLES and not ultimo:
+                resp.close()
+                self._registrar(endpoint, reintentos=1)
+                self._esperar_backoff(intento)
+                continue
+            return resp
+
+    def volcar(self, resp: requests.Response, destino, endpoint: str,
+               bloque: int = 64 * 1024) -> int:
+        """Copiar el cuerpo de una respuesta `stream=True` a `destino` por bloques.
+
+        Registra los bytes del endpoint, cierra la respuesta y devuelve el
+        total escrito; la memoria usada es un bloque, no el cuerpo entero.
+        Un corte a mitad de cuerpo (ChunkedEncodingError, ConnectionError,
+        timeout de lectura) suma un error y se propaga sin reintentar: lo
+        escrito en `destino` queda incompleto.
+        """
+        total = 0
+        try:
+            for parte in resp.iter_content(chunk_size=bloque):
+                destino.write(parte)
+                total += len(parte)
+        except requests.RequestException:
+            self._registrar(endpoint, errores=1)
+            raise
+        finally:
+            resp.close()
+            self._registrar(endpoint, bytes=total)
+        return total
+
+
+# Instancia compartida por el job (una sesión y un pool por proceso)
+cliente_http = ClienteHTTP(
+    timeout_conexion=float(os.getenv("MAREA_HTTP_TIMEOUT_CONEXION", "5")),
+    timeout_lectura=float(os.getenv("MAREA_HTTP_TIMEOUT_LECTURA", "30")),
+    reintentos=int(os.getenv("MAREA_HTTP_REINTENTOS", "3")),
+    backoff=float(os.getenv("MAREA_HTTP_BACKOFF", "0.5")),
+    pool=int(os.getenv("MAREA_HTTP_POOL", "16")),
+    limitador=LimitadorPorHost(float(os.getenv("MAREA_INTERVALO_HOST", "0.2"))),
+)
@@ -0,0 +1,354 @@
+"""
+===============================================================
+Parser del pronóstico SMN "pron5d" (TXT por localidades)
+===============================================================
+
+Recorre el TXT una sola vez, línea a línea, con una máquina de estados:
+- BUSCANDO: espera un encabezado de estación (nombre entre líneas "====",
+  tolerando una línea en blanco de cada lado).
+- EN_BLOQUE: dentro de una estación pedida, cada línea que coincide con el
+  patrón de filas se emite; el bloque termina en el siguiente encabezado.
+
+Solo se emiten filas de las estaciones pedidas y la lectura se corta cuando
+todas ya fueron procesadas, por lo que acepta cualquier iterable de líneas
+(p. ej. un `TextIOWrapper` sobre el miembro del ZIP) con memoria acotada.
+
+El DataFrame se arma en columnas tipadas (float32/int16 y categóricas)
+llenadas directamente por el parser, sin un dict por fila. El rumbo del
+viento se clasifica para todo el lote en una sola operación NumPy
+(rosa de 16 sectores; MAREA_ROSA_VIENTOS=8 usa la de 8).
+
+La codificación del TXT se detecta sobre los bytes (BOM o validación UTF-8
+de un prefijo) para decodificarlo una sola vez con el códec correcto.
+
+Sin efectos secundarios al importar: usable desde el job y desde benchmarks.
+"""
+
+import codecs
+import os
+import re
+from array import array
+from datetime import date
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# Catálogo de direcciones de viento
+# ============================================================
+# Definir rosa de vientos con abreviatura, nombre y ángulo base
+DIRECCIONES_VIENTO = [
+    ("N", "Norte", 0.0),
+    ("NE", "Nordeste", 45.0),
+    ("E", "Este", 90.0),
+    ("SE", "Sudeste", 135.0),
+    ("S", "Sur", 180.0),
+    ("SO", "Suroeste", 225.0),
+    ("O", "Oeste", 270.0),
+    ("NO", "Noroeste", 315.0),
+]
+
+# Rosa de 16 rumbos (agrega los intermedios a la de 8)
+DIRECCIONES_VIENTO_16 = [
+    ("N", "Norte", 0.0),
+    ("NNE", "Nor-nordeste", 22.5),
+    ("NE", "Nordeste", 45.0),
+    ("ENE", "Este-nordeste", 67.5),
+    ("E", "Este", 90.0),
+    ("ESE", "Este-sudeste", 112.5),
+    ("SE", "Sudeste", 135.0),
+    ("SSE", "Sud-sudeste", 157.5),
+    ("S", "Sur", 180.0),
+    ("SSO", "Sur-suroeste", 202.5),
+    ("SO", "Suroeste", 225.0),
+    ("OSO", "Oeste-suroeste", 247.5),
+    ("O", "Oeste", 270.0),
+    ("ONO", "Oeste-noroeste", 292.5),
+    ("NO", "Noroeste", 315.0),
+    ("NNO", "Nor-noroeste", 337.5),
+]
+
+ROSAS_VIENTO = {8: DIRECCIONES_VIENTO, 16: DIRECCIONES_VIENTO_16}
+# 16 rumbos como documenta el readme y muestra el cliente; 8 es opcional
+SECTORES_VIENTO = int(os.getenv("MAREA_ROSA_VIENTOS", "16"))
+
+# Abreviatura (8 o 16 rumbos) -> ángulo base; construido una sola vez
+ABREV_A_GRADOS = {a: deg for (a, _, deg) in DIRECCIONES_VIENTO_16}
+
+
+def codigos_direccion(grados, sectores: int = SECTORES_VIENTO) -> np.ndarray:
+    """Mapear un array de grados al índice del sector (-1 si falta el dato).
+
+    Cada sector cubre ±(180/sectores)° alrededor de su ángulo base, sin huecos
+    (p. ej. 111° cae en "ESE" con 16 sectores y en "E" con 8, no en el "N"
+    por defecto del catálogo previo).
+    """
+    g = np.asarray(grados, dtype=np.float64)
+    codigos = np.full(g.shape, -1, dtype=np.int16)
+    validos = np.isfinite(g)
+    ancho = 360.0 / sectores
+    codigos[validos] = np.floor(np.mod(g[validos], 360.0) / ancho + 0.5) % sectores
+    return codigos
+
+
+def clasificar_direcciones(grados, sectores: int = SECTORES_VIENTO) -> dict:
+    """Clasificar un lote de grados y devolver columnas de sector.
+
+    Devuelve abreviatura y nombre como categóricas y el ángulo base como
+    float32 (NaN donde falta el dato), listas para asignar a un DataFrame.
+    """
+    if sectores not in ROSAS_VIENTO:
+        raise ValueError(f"Rosa de vientos no soportada: {sectores} sectores")
+    rosa = ROSAS_VIENTO[sectores]
+    codigos = codigos_direccion(grados, sectores)
+    angulos = np.array([deg for _, _, deg in rosa] + [np.nan], dtype=np.float32)
+    return {
+        "viento_direccion_abreviatura": pd.Categorical.from_codes(
+            codigos, categories=[a for a, _, _ in rosa]),
+        "viento_direccion_nombre": pd.Categorical.from_codes(
+            codigos, categories=[n for _, n, _ in rosa]),
+        "viento_direccion_grados": angulos[codigos],  # -1 -> NaN
+    }
+
+
+# ============================================================
+# Detección de codificación del TXT
+# ============================================================
+# BOM -> códec; UTF-32 antes que UTF-16 (el BOM UTF-32LE empieza como el UTF-16LE)
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+# Bytes iniciales que se validan como UTF-8
+MUESTRA_CODIFICACION = 64 * 1024
+# Códec de respaldo para texto de 8 bits que no es UTF-8 (Windows, español)
+CODIFICACION_RESPALDO = "cp1252"
+
+
+def detectar_codificacion(datos: bytes, muestra: int = MUESTRA_CODIFICACION) -> str:
+    """Elegir el códec del TXT mirando solo bytes (sin decodificar a prueba).
+
+    1. BOM explícito (UTF-8/16/32).
+    2. Bytes nulos en la muestra: UTF-16 sin BOM (endianness según dónde
+       caen los ceros en texto mayormente ASCII).
+    3. Prefijo válido como UTF-8 (un carácter multibyte cortado al final de
+       la muestra no cuenta como error): "utf-8".
+    4. Si no: CODIFICACION_RESPALDO.
+    """
+    for bom, codec in BOMS:
+        if datos.startswith(bom):
+            return codec
+
+    prefijo = datos[:muestra]
+    if b"\x00" in prefijo:
+        pares, impares = prefijo[0::2].count(0), prefijo[1::2].count(0)
+        return "utf-16-be" if pares > impares else "utf-16-le"
+
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(prefijo, final=len(datos) <= muestra)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return CODIFICACION_RESPALDO
+
+
+# ============================================================
+# Patrones y utilidades de parseo
+# ============================================================
+PATRON_FILA = re.compile(
+    r"(\d{2})/([A-Z]{3})/(\d{4})\s+(\d{2})Hs\.\s+([-]?\d+(?:\.\d+)?)"
+    r"\s+([A-Z]{1,3}|\d+)\s*\|\s*(\d+)\s+([\d\.]+)"
+)
+PATRON_NOMBRE = re.compile(r"\s*[A-Z0-9_]+(?:\s+[A-Z0-9_]+)*\s*")
+PATRON_IGUALES = re.compile(r"\s*=+\s*")
+PATRON_NO_ALFANUM = re.compile(r"[^A-Z0-9]+")
+
+MESES = {
+    "ENE": 1, "FEB": 2, "MAR": 3, "ABR": 4, "MAY": 5, "JUN": 6,
+    "JUL": 7, "AGO": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DIC": 12,
+}
+
+# Columnas del DataFrame de pronóstico
+COLUMNAS = [
+    "estacion_pronostico",
+    "fecha",
+    "hora",
+    "temperatura",
+    "viento_direccion",
+    "viento_direccion_abreviatura",
+    "viento_direccion_nombre",
+    "viento_direccion_grados",
+    "viento_km_h",
+    "precipitacion_mm",
+]
+
+# Tipos de cada columna (las categóricas se arman desde códigos)
+TIPOS = {
+    "estacion_pronostico": "category",
+    "fecha": "category",
+    "hora": "category",
+    "temperatura": "float32",
+    "viento_direccion": "float32",
+    "viento_direccion_abreviatura": "category",
+    "viento_direccion_nombre": "category",
+    "viento_direccion_grados": "float32",
+    "viento_km_h": "int16",
+    "precipitacion_mm": "float32",
+}
+
+
+def normalizar_nombre(s: str) -> str:
+    """Normalizar título de estación para comparar de forma robusta."""
+    return PATRON_NO_ALFANUM.sub("_", s.upper()).strip("_")
+
+
+def _es_iguales(linea: str) -> bool:
+    """Indicar si la línea es un separador de "=" (con espacios opcionales)."""
+    return "=" in linea and PATRON_IGUALES.fullmatch(linea) is not None
+
+
+# ============================================================
+# Parser de una pasada (generador)
+# ============================================================
+
+
+def iterar_filas(lineas: Iterable[str], estaciones: Iterable[str]) -> Iterator[tuple]:
+    """Emitir filas crudas de las estaciones pedidas recorriendo el TXT una vez.
+
+    Cada fila es una tupla:
+      (estacion, fecha_iso, hora, temperatura, viento_dir, viento_km_h, precipitacion)
+    con `viento_dir` tal como viene en el TXT (grados o abreviatura).
+    """
+    pendientes = {normalizar_nombre(e): e for e in estaciones}
+    fechas = {}              # memo "19/AGO/2025" -> "2025-08-19"
+    actual = None            # estación pedida cuyo bloque se está leyendo
+    desde_iguales = 99       # líneas desde el último separador "===="
+    candidato = None         # (nombre_norm, líneas desde el candidato)
+
+    for linea in lineas:
+        linea = linea.rstrip("\r\n")
+
+        if _es_iguales(linea):
+            # Confirmar encabezado: nombre con "====" antes y después
+            if candidato is not None:
+                norm = candidato[0]
+                candidato = None
+                if actual is not None:
+                    actual = None
+                    if not pendientes:
+                        return
+                if norm in pendientes:
+                    actual = pendientes.pop(norm)
+            desde_iguales = 0
+            continue
+
+        desde_iguales += 1
+        if candidato is not None:
+            candidato = (candidato[0], candidato[1] + 1)
+            # El "====" de cierre va en la línea siguiente o la subsiguiente
+            if candidato[1] >= 2:
+                candidato = None
+
+        # Un nombre solo es candidato si hubo "====" en las 2 líneas previas
+        if desde_iguales <= 2 and PATRON_NOMBRE.fullmatch(linea):
+            candidato = (normalizar_nombre(linea), 0)
+            continue
+
+        if actual is None:
+            continue
+
+        m = PATRON_FILA.search(linea)
+        if not m:
+            continue
+        d, mes_abbr, y, hora, temp, viento_dir, viento_vel, prec = m.groups()
+        clave = (d, mes_abbr, y)
+        fecha = fechas.get(clave)
+        if fecha is None:
+            mes = MESES.get(mes_abbr)
+            fecha = date(int(y), mes, int(d)).isoformat() if mes else ""
+            fechas[clave] = fecha
+        if not fecha:
+            continue
+        yield (actual, fecha, f"{hora}:00:00", temp, viento_dir, viento_vel, prec)
+
+
+def _grados_direccion(raw_dir: str) -> float:
+    """Interpretar viento como grados o abreviatura (N, ESE, ...) -> grados."""
+    try:
+        return float(raw_dir.replace(",", "."))
+    except ValueError:
+        return ABREV_A_GRADOS.get(raw_dir, 0.0)  # fallback: Norte
+
+
+def _codigos(valores: dict, codigos: array) -> pd.Categorical:
+    """Armar categórica desde códigos int16 y el dict valor -> código."""
+    return pd.Categorical.from_codes(
+        np.frombuffer(codigos, dtype=np.int16), categories=list(valores))
+
+
+def parsear_pronostico(lineas: Iterable[str], estaciones: Iterable[str],
+                       sectores: int = SECTORES_VIENTO) -> pd.DataFrame:
+    """Parsear líneas del TXT y devolver DataFrame de pronóstico en columnas tipadas.
+
+    Cada fila se escribe en buffers `array` tipados (float32, int16 y códigos
+    de categóricas) y pandas arma el DataFrame sobre esos buffers sin copiarlos.
+    El sector del viento se calcula al final para todo el lote.
+    """
+    estaciones = list(dict.fromkeys(estaciones))
+    cod_estacion = {e: i for i, e in enumerate(estaciones)}
+    cod_fecha, cod_hora = {}, {}
+
+    c_estacion, c_fecha, c_hora = array("h"), array("h"), array("h")
+    c_km_h = array("h")
+    c_temp, c_grados, c_prec = array("f"), array("f"), array("f")
+
+    for est, fecha, hora, temp, viento_dir, viento_vel, prec in iterar_filas(lineas, estaciones):
+        c_estacion.append(cod_estacion[est])
+        c_fecha.append(cod_fecha.setdefault(fecha, len(cod_fecha)))
+        c_hora.append(cod_hora.setdefault(hora, len(cod_hora)))
+        c_temp.append(float(temp))
+        c_grados.append(_grados_direccion(viento_dir))
+        c_km_h.append(int(viento_vel))
+        c_prec.append(float(prec))
+
+    grados = np.frombuffer(c_grados, dtype=np.float32)
+    rumbos = clasificar_direcciones(grados, sectores)
+
+    return pd.DataFrame({
+        "estacion_pronostico": _codigos(cod_estacion, c_estacion),
+        "fecha": _codigos(cod_fecha, c_fecha),
+        "hora": _codigos(cod_hora, c_hora),
+        "temperatura": np.frombuffer(c_temp, dtype=np.float32),
+        "viento_direccion": grados,
+        **rumbos,
+        "viento_km_h": np.frombuffer(c_km_h, dtype=np.int16),
+        "precipitacion_mm": np.frombuffer(c_prec, dtype=np.float32),
+    }, columns=COLUMNAS, copy=False)
+
+
+# ============================================================
+# Conversión de tipos (snapshot / JSON)
+# ============================================================
+
+
+def tipar_pronostico(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplicar los tipos de columna del parser (p. ej. al leer un snapshot JSON)."""
+    return df.astype({c: t for c, t in TIPOS.items() if c in df.columns})
+
+
+def a_tipos_json(df: pd.DataFrame) -> pd.DataFrame:
+    """Pasar float32 a float64 y categóricas a object antes de serializar.
+
+    El float32 se convierte vía su representación corta ("13.8") para que el
+    JSON conserve el valor impreso en el TXT y no 13.800000190734863.
+    """
+    df = df.copy()
+    for c in df.columns:
+        if df[c].dtype == np.float32:
+            df[c] = df[c].astype(str).astype("float64")
+        elif isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype(object)
+    return df
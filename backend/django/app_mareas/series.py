@@ -0,0 +1,148 @@
+# ================================================================
+# Series en memoria por estación (filtros por tiempo y columnas)
+#
+# Propósito: responder ?desde=&hasta=, ?proximas_horas= y ?campos= de
+#            /marea/alturas/<id>/ sin recorrer filas ni diccionarios.
+#
+# Funcionamiento:
+#   - Cada archivo de cache se carga una vez por worker como un array por
+#     columna más un array ordenado de instantes (epoch en segundos).
+#   - Fuente: marea_<id>[.<resolución>].col.json si existe (ya viene por
+#     columna); si no, el .json de filas.
+#   - Instante de cada fila: fecha + hora local (00:00 si la resolución no
+#     tiene hora, como la diaria).
+#   - Un rango se resuelve con dos búsquedas binarias (bisect) y cortes
+#     de lista por columna; la proyección solo elige columnas.
+#   - Revalida con os.stat como cache_respuestas.py; LRU acotado por
+#     MAREA_CACHE_SERIES_MAX.
+#
+# Sin dependencias de Django ni pandas: importable desde vistas y scripts.
+# ================================================================
+
+"""
+Series por estación indexadas por instante, con recorte por búsqueda binaria.
+"""
+
+import json
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from app_mareas.cache_mareas import archivo_estacion
+from app_mareas.historico import a_epoch
+
+# Columnas que identifican el instante; se publican siempre
+CAMPOS_TIEMPO = ("fecha", "hora")
+
+# ===============================
+# Serie de una estación
+# ===============================
+
+
+def _instantes(fechas: list, horas: Optional[list]) -> list:
+    """Epoch de cada fila a partir de fecha y hora local."""
+    horas = horas or ["00:00:00"] * len(fechas)
+    return [a_epoch(datetime.fromisoformat(f"{f}T{h}")) for f, h in zip(fechas, horas)]
+
+
+class Serie:
+    """Columnas de un archivo de cache y sus instantes ordenados."""
+
+    __slots__ = ("firma", "instantes", "columnas")
+
+    def __init__(self, firma: tuple, columnas: dict):
+        self.firma = firma
+        self.columnas = columnas
+        self.instantes = _instantes(columnas.get("fecha", []), columnas.get("hora"))
+
+    @property
+    def campos(self) -> list:
+        """Columnas disponibles, en el orden del archivo."""
+        return list(self.columnas)
+
+    def __len__(self) -> int:
+        return len(self.instantes)
+
+    def rango(self, desde: Optional[int] = None, hasta: Optional[int] = None) -> tuple:
+        """Índices (i, j) de las filas con desde <= instante < hasta."""
+        i = 0 if desde is None else bisect_left(self.instantes, desde)
+        j = len(self.instantes) if hasta is None else bisect_left(self.instantes, hasta)
+        return i, max(i, j)
+
+    def _elegidos(self, campos: Optional[list]) -> list:
+        if campos is None:
+            return self.campos
+        return [c for c in self.campos if c in CAMPOS_TIEMPO or c in campos]
+
+    def columnar(self, i: int, j: int, campos: Optional[list] = None) -> dict:
+        """{campo: valores[i:j]} para los campos pedidos (más fecha/hora)."""
+        return {c: self.columnas[c][i:j] for c in self._elegidos(campos)}
+
+    def filas(self, i: int, j: int, campos: Optional[list] = None) -> list:
+        """Filas [i:j] como dicts con los campos pedidos (más fecha/hora)."""
+        elegidos = self._elegidos(campos)
+        valores = zip(*(self.columnas[c][i:j] for c in elegidos))
+        return [dict(zip(elegidos, fila)) for fila in valores]
+
+
+def cargar_serie(archivo: Path, firma: tuple) -> Serie:
+    """Leer el archivo (columnar o de filas) como una Serie."""
+    with open(archivo, "r", encoding="utf-8") as f:
+        datos = json.load(f).get("datos") or {}
+    if isinstance(datos, list):
+        campos = list(datos[0]) if datos else []
+        datos = {c: [fila.get(c) for fila in datos] for c in campos}
+    return Serie(firma, datos)
+
+
+# ===============================
+# Cache
+# ===============================
+
+
+class CacheSeries:
+    """LRU de series por archivo, seguro entre hilos."""
+
+    def __init__(self, max_entradas: int = 64):
+        self.max_entradas = max(1, max_entradas)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, cache_dir: Path, estacion_id: str,
+                resolucion: str = "horaria") -> Serie:
+        """Devolver la serie de la estación, recargándola si cambió el archivo.
+
+        Propaga FileNotFoundError si no hay archivo en ninguno de los dos formatos.
+        """
+        archivo = archivo_estacion(cache_dir, estacion_id, "columnar", resolucion)
+        try:
+            st = os.stat(archivo)
+        except FileNotFoundError:
+            archivo = archivo_estacion(cache_dir, estacion_id, "json", resolucion)
+            st = os.stat(archivo)
+        firma = (st.st_mtime_ns, st.st_ino, st.st_size)
+        clave = str(archivo)
+
+        with self._lock:
+            serie = self._entradas.get(clave)
+            if serie is not None and serie.firma == firma:
+                self._entradas.move_to_end(clave)
+                return serie
+
+        # Cargar fuera del lock para no bloquear a otras estaciones
+        serie = cargar_serie(archivo, firma)
+
+        with self._lock:
+            self._entradas[clave] = serie
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return serie
+
+
+# Instancia compartida por las vistas del worker
+cache_series = CacheSeries(int(os.getenv("MAREA_CACHE_SERIES_MAX", "64")))
@@ -0,0 +1,40 @@
+"""
+Configuración común de los tests (pytest).
+
+- Agrega backend/django al sys.path, como los scripts de benchmarks.
+- Configura Django con lo mínimo que usan las vistas (sin base de datos
+  ni apps de terceros), así los tests corren sin mareas/settings.py.
+- cache_dir: directorio de cache temporal para vistas y job (nunca se
+  escribe en app_mareas/cache).
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY="tests",
+        ALLOWED_HOSTS=["*"],
+        USE_TZ=True,
+        BASE_DIR=BASE_DIR,
+        INSTALLED_APPS=[],
+    )
+    django.setup()
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Redirigir directorio_cache() de las vistas a un directorio temporal."""
+    from app_mareas.views import alturas
+
+    monkeypatch.setattr(alturas, "directorio_cache", lambda: tmp_path)
+    return tmp_path
@@ -0,0 +1,33 @@
+"""
+Tests de cache_mareas.escribir_atomico: permisos y umask del proceso.
+"""
+
+import os
+import stat
+import subprocess
+import sys
+from pathlib import Path
+
+from app_mareas.cache_mareas import escribir_atomico
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+
+def test_importar_no_cambia_el_umask():
+    codigo = ("import os; os.umask(0o027); import app_mareas.cache_mareas; "
+              "print(oct(os.umask(0)))")
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=BASE_DIR,
+                            capture_output=True, text=True, check=True)
+    assert salida.stdout.strip() == "0o27"
+
+
+def test_archivo_publicado_con_modo_644(tmp_path):
+    anterior = os.umask(0o077)
+    try:
+        escribir_atomico(tmp_path / "marea_prueba.json", b"{}")
+    finally:
+        os.umask(anterior)
+    modo = stat.S_IMODE(os.stat(tmp_path / "marea_prueba.json").st_mode)
+    assert modo == 0o644
+    assert (tmp_path / "marea_prueba.json").read_bytes() == b"{}"
+    assert [p.name for p in tmp_path.iterdir()] == ["marea_prueba.json"]
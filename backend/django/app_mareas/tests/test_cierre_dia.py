@@ -0,0 +1,101 @@
+"""
+Tests de actualizacion.agregar_cierre_dia contra la implementación previa
+(iterrows), que se conserva en scripts/benchmarks/bench_cierre_dia.py.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app_mareas.scripts.benchmarks.bench_cierre_dia import (
+    agregados_sinteticos, cierre_referencia)
+from app_mareas.scripts.jobs.actualizacion import (
+    ZONA_HORARIA, agregar_cierre_dia, desindexar_serie, indexar_serie)
+
+INICIO = datetime(2025, 3, 1)
+
+
+def _filas(instantes, **columnas) -> pd.DataFrame:
+    """Agregados con fecha/hora de texto, como los arma la ingesta."""
+    instantes = pd.DatetimeIndex(instantes)
+    base = np.linspace(0.5, 1.5, len(instantes))
+    datos = {
+        "fecha": instantes.strftime("%Y-%m-%d"),
+        "hora": instantes.strftime("%H:%M:%S"),
+        "altura_minima": base - 0.05,
+        "altura_maxima": base + 0.05,
+        "altura_promedio": base,
+    }
+    datos.update(columnas)
+    return pd.DataFrame(datos)
+
+
+def _comparar(df_ag: pd.DataFrame, inicio: datetime = INICIO) -> pd.DataFrame:
+    """Verificar que ambas versiones den las mismas filas y devolver la nueva."""
+    inicio_local = pd.Timestamp(inicio).tz_localize(ZONA_HORARIA)
+    con_cierre = agregar_cierre_dia(indexar_serie(df_ag), inicio_local)
+    assert con_cierre.index.is_unique and con_cierre.index.is_monotonic_increasing
+
+    obtenido = desindexar_serie(con_cierre)
+    esperado = cierre_referencia(df_ag, inicio).reset_index(drop=True)
+    pd.testing.assert_frame_equal(obtenido, esperado)
+    return obtenido
+
+
+@pytest.mark.parametrize("dias", [4, 15, 60])
+def test_igual_a_la_referencia_con_huecos(dias):
+    _comparar(agregados_sinteticos(INICIO, dias, semilla=dias))
+
+
+def test_serie_que_termina_a_las_23():
+    df_ag = _filas(pd.date_range("2025-03-01 00:00", "2025-03-03 23:00", freq="h"))
+    obtenido = _comparar(df_ag)
+    cierres = obtenido[obtenido["hora"] == "23:59:00"]["fecha"].tolist()
+    # Sin 00:00 del 04/03 no hay cierre para el último día
+    assert cierres == ["2025-03-01", "2025-03-02"]
+
+
+def test_serie_de_un_solo_dia():
+    df_ag = _filas(pd.date_range("2025-03-05 00:00", "2025-03-05 23:00", freq="h"))
+    obtenido = _comparar(df_ag)
+    assert len(obtenido) == len(df_ag) + 1
+    assert obtenido.iloc[0][["fecha", "hora"]].tolist() == ["2025-03-04", "23:59:00"]
+
+
+def test_00_igual_a_inicio_no_genera_cierre():
+    df_ag = _filas(pd.date_range("2025-03-01 00:00", "2025-03-01 23:00", freq="h"))
+    obtenido = _comparar(df_ag)
+    assert len(obtenido) == len(df_ag)
+
+
+def test_indice_con_zona_sin_horario_de_verano():
+    # Instantes con offset explícito (UTC) se llevan a ZONA_HORARIA, sin DST
+    utc = pd.date_range("2025-03-01 03:00", periods=72, freq="h", tz="UTC")
+    df_ag = _filas(utc.tz_convert(ZONA_HORARIA).tz_localize(None))
+    df_idx = indexar_serie(df_ag.assign(
+        fecha=utc.strftime("%Y-%m-%d"), hora=utc.strftime("%H:%M:%S+00:00")))
+    assert str(df_idx.index.tz) == ZONA_HORARIA
+
+    inicio_local = pd.Timestamp(INICIO).tz_localize(ZONA_HORARIA)
+    con_cierre = agregar_cierre_dia(df_idx, inicio_local)
+    assert con_cierre.index.tz == df_idx.index.tz
+    pd.testing.assert_frame_equal(
+        desindexar_serie(con_cierre),
+        cierre_referencia(df_ag, INICIO).reset_index(drop=True))
+
+
+def test_valores_meteo_nan():
+    instantes = pd.date_range("2025-03-01 12:00", "2025-03-04 12:00", freq="h")
+    rng = np.random.default_rng(1)
+    viento = rng.uniform(0, 40, len(instantes))
+    viento[rng.random(len(instantes)) > 0.5] = np.nan
+    df_ag = _filas(instantes, viento_km_h=viento,
+                   temperatura=np.full(len(instantes), np.nan))
+    obtenido = _comparar(df_ag)
+    cierres = obtenido[obtenido["hora"] == "23:59:00"]
+    medianoche = obtenido[obtenido["hora"] == "00:00:00"]
+    assert cierres["temperatura"].isna().all()
+    np.testing.assert_array_equal(cierres["viento_km_h"].to_numpy(),
+                                  medianoche["viento_km_h"].to_numpy())
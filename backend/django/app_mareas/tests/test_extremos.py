@@ -0,0 +1,152 @@
+"""
+Tests de scripts/jobs/extremos.py (pleamares y bajamares sobre la serie
+horaria) y de /marea/extremos/<id>/?proximos=N.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+from django.test import RequestFactory
+
+from app_mareas.cache_mareas import archivo_extremos
+from app_mareas.scripts.jobs.extremos import (
+    BAJAMAR, HISTERESIS_M, PLEAMAR, detectar_extremos, extremos_serie)
+from app_mareas.views import extremos as vista_extremos
+
+rf = RequestFactory()
+
+# Marea semidiurna sintética: período M2 en horas
+PERIODO_H = 12.42
+AMPLITUD_M = 0.8
+HORAS = np.arange(4 * 24, dtype=float)
+
+
+def _marea(t: np.ndarray, fase: float = 0.3) -> np.ndarray:
+    return 1.2 + AMPLITUD_M * np.sin(2 * np.pi * t / PERIODO_H + fase)
+
+
+def _verdaderos(fase: float = 0.3, horas: np.ndarray = HORAS) -> list:
+    """Instantes (h) de pleamares y bajamares exactas dentro de `horas`."""
+    salida = []
+    for k in range(-1, 20):
+        for tipo, cuarto in ((PLEAMAR, 0.25), (BAJAMAR, 0.75)):
+            t = (cuarto + k - fase / (2 * np.pi)) * PERIODO_H
+            if horas[0] < t < horas[-1]:
+                salida.append((tipo, t))
+    return sorted(salida, key=lambda x: x[1])
+
+
+# ===============================
+# Detección
+# ===============================
+
+
+@pytest.mark.parametrize("fase", [0.0, 0.3, 1.7])
+def test_senoidal_extremos_a_pocos_minutos(fase):
+    extremos = detectar_extremos(HORAS, _marea(HORAS, fase))
+    verdaderos = _verdaderos(fase)
+
+    assert [tipo for tipo, _, _ in extremos] == [tipo for tipo, _ in verdaderos]
+    for (_, t, altura), (_, t_real) in zip(extremos, verdaderos):
+        # El vértice de la parábola corrige el muestreo horario
+        assert abs(t - t_real) * 60 < 5
+        assert abs(abs(altura - 1.2) - AMPLITUD_M) < 0.01
+
+
+def test_ruido_menor_a_la_histeresis_no_agrega_extremos():
+    # Cada 15 min: cerca de los picos el ruido invierte la pendiente muchas
+    # veces (sin histéresis salen ~60 extremos en lugar de 16)
+    horas = np.arange(0, 4 * 24, 0.25)
+    verdaderos = _verdaderos(horas=horas)
+    rng = np.random.default_rng(7)
+    ruido = rng.uniform(-0.4, 0.4, len(horas)) * HISTERESIS_M
+    y = _marea(horas) + ruido
+    assert len(detectar_extremos(horas, y, histeresis=0.0)) > 2 * len(verdaderos)
+
+    extremos = detectar_extremos(horas, y)
+
+    assert [tipo for tipo, _, _ in extremos] == [tipo for tipo, _ in verdaderos]
+    for (_, t, _), (_, t_real) in zip(extremos, verdaderos):
+        assert abs(t - t_real) < 1.5
+
+
+def test_serie_plana_con_ruido_no_tiene_extremos_de_marea():
+    rng = np.random.default_rng(3)
+    # Rango total del ruido por debajo de la histéresis: a lo sumo el primero
+    y = 1.0 + rng.uniform(-0.45, 0.45, len(HORAS)) * HISTERESIS_M
+    assert len(detectar_extremos(HORAS, y)) <= 1
+
+
+def test_nan_se_ignoran():
+    y = _marea(HORAS)
+    y[::5] = np.nan
+    extremos = detectar_extremos(HORAS, y)
+    assert len(extremos) == len(_verdaderos())
+
+
+def test_extremos_serie_en_hora_local():
+    indice = pd.date_range("2025-08-01", periods=len(HORAS), freq="h",
+                           tz="America/Argentina/Buenos_Aires")
+    salida = extremos_serie(pd.Series(_marea(HORAS), index=indice))
+
+    assert len(salida) == len(_verdaderos())
+    primero = salida[0]
+    assert primero["instante"].endswith("-03:00")
+    assert primero["instante"].startswith(f'{primero["fecha"]}T{primero["hora"]}')
+    assert extremos_serie(pd.Series(dtype=float)) == []
+
+
+# ===============================
+# Vista ?proximos=N
+# ===============================
+
+
+@pytest.fixture
+def archivo(tmp_path, monkeypatch):
+    """Extremos cada 6 h, desde 9 h antes de ahora (dos en el pasado)."""
+    monkeypatch.setattr(vista_extremos, "directorio_cache", lambda: tmp_path)
+    base = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=9)
+    extremos = [
+        {"tipo": PLEAMAR if i % 2 else BAJAMAR,
+         "instante": (base + timedelta(hours=6 * i)).isoformat(),
+         "altura": 1.0 + i / 10}
+        for i in range(8)
+    ]
+    ruta = archivo_extremos(tmp_path, "prueba")
+    ruta.write_text(json.dumps({"extremos": extremos}), encoding="utf-8")
+    return extremos
+
+
+def _pedir(params: dict, estacion_id="prueba"):
+    return vista_extremos.obtener_extremos_estacion(
+        rf.get(f"/marea/extremos/{estacion_id}/", params), estacion_id)
+
+
+def test_proximos_devuelve_los_siguientes_a_ahora(archivo):
+    resp = _pedir({"proximos": "2"})
+    assert resp.status_code == 200
+    assert json.loads(resp.content)["extremos"] == archivo[2:4]
+
+
+def test_proximos_mayor_a_los_disponibles(archivo):
+    resp = _pedir({"proximos": "50"})
+    assert json.loads(resp.content)["extremos"] == archivo[2:]
+
+
+@pytest.mark.parametrize("valor", ["0", "-1", "dos"])
+def test_proximos_invalido_da_400(archivo, valor):
+    assert _pedir({"proximos": valor}).status_code == 400
+
+
+def test_sin_proximos_sirve_el_archivo(archivo):
+    resp = _pedir({})
+    assert resp.status_code == 200
+    assert resp.has_header("ETag")
+    assert json.loads(resp.content)["extremos"] == archivo
+
+
+def test_sin_archivo_da_404(archivo):
+    assert _pedir({"proximos": "1"}, estacion_id="otra").status_code == 404
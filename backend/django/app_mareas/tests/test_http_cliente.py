@@ -0,0 +1,193 @@
+"""
+Tests de scripts/jobs/http_cliente.py contra un servidor http.server local.
+
+El servidor responde según un guion por ruta (lista de estados, o "lento"
+para no contestar antes del timeout de lectura) y cuenta las solicitudes.
+"""
+
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from app_mareas.scripts.jobs import http_cliente
+from app_mareas.scripts.jobs.http_cliente import ClienteHTTP, LimitadorPorHost
+
+CUERPO = b'{"ok": true}'
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        servidor = self.server
+        with servidor.lock:
+            guion = servidor.guiones.setdefault(self.path, [])
+            paso = guion.pop(0) if guion else 200
+            servidor.llegadas.append((self.path, time.monotonic()))
+        if paso == "lento":
+            time.sleep(servidor.demora)
+            paso = 200
+        if paso == "cortado":
+            # Anunciar más bytes de los que se envían y cerrar la conexión
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(CUERPO) * 10))
+            self.end_headers()
+            self.wfile.write(CUERPO)
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.send_response(paso)
+        if paso == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(CUERPO)))
+        self.end_headers()
+        try:
+            self.wfile.write(CUERPO)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.guiones = {}
+    srv.llegadas = []
+    srv.demora = 0.5
+    hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+    hilo.start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    """Registrar los backoff pedidos sin dormir de verdad."""
+    pedidas = []
+    monkeypatch.setattr(ClienteHTTP, "_esperar_backoff",
+                        lambda self, intento: pedidas.append(intento))
+    return pedidas
+
+
+def test_503_y_reintento_exitoso(servidor, esperas):
+    servidor.guiones["/ina"] = [503]
+    cliente = ClienteHTTP(reintentos=2, backoff=0.01)
+
+    resp = cliente.get(servidor.url + "/ina", endpoint="ina")
+
+    assert resp.status_code == 200
+    assert resp.content == CUERPO
+    assert esperas == [0]
+    m = cliente.estadisticas()["ina"]
+    assert (m["solicitudes"], m["errores"], m["reintentos"]) == (2, 1, 1)
+    assert m["bytes"] == 2 * len(CUERPO)
+
+
+def test_429_respeta_el_backoff(servidor, monkeypatch):
+    servidor.guiones["/smn"] = [429, 429]
+    dormidos = []
+    monkeypatch.setattr(http_cliente.random, "uniform", lambda a, b: b)
+    monkeypatch.setattr(http_cliente.time, "sleep", dormidos.append)
+    cliente = ClienteHTTP(reintentos=3, backoff=0.5)
+
+    resp = cliente.get(servidor.url + "/smn", endpoint="smn")
+
+    assert resp.status_code == 200
+    # Backoff exponencial: base * 2^intento (tope del jitter)
+    assert dormidos == [0.5, 1.0]
+    assert cliente.estadisticas()["smn"]["reintentos"] == 2
+
+
+def test_429_persistente_devuelve_la_ultima_respuesta(servidor, esperas):
+    servidor.guiones["/smn"] = [429, 429, 429]
+    cliente = ClienteHTTP(reintentos=2, backoff=0.01)
+
+    resp = cliente.get(servidor.url + "/smn", endpoint="smn")
+
+    assert resp.status_code == 429
+    assert esperas == [0, 1]
+    m = cliente.estadisticas()["smn"]
+    assert (m["solicitudes"], m["errores"], m["reintentos"]) == (3, 3, 2)
+
+
+def test_timeout_de_lectura_se_propaga_al_agotar_reintentos(servidor, esperas):
+    servidor.guiones["/ina"] = ["lento", "lento"]
+    cliente = ClienteHTTP(timeout_lectura=0.1, reintentos=1, backoff=0.01)
+
+    with pytest.raises(requests.Timeout):
+        cliente.get(servidor.url + "/ina", endpoint="ina")
+
+    assert esperas == [0]
+    m = cliente.estadisticas()["ina"]
+    assert (m["solicitudes"], m["errores"], m["reintentos"]) == (2, 2, 1)
+    assert m["bytes"] == 0
+
+
+def test_limitador_espacia_solicitudes_al_mismo_host(servidor):
+    intervalo = 0.1
+    cliente = ClienteHTTP(reintentos=0, limitador=LimitadorPorHost(intervalo))
+    hilos = [
+        threading.Thread(target=cliente.get, args=(servidor.url + f"/ina/{i}",),
+                         kwargs={"endpoint": "ina"})
+        for i in range(4)
+    ]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    instantes = sorted(t for _, t in servidor.llegadas)
+    assert len(instantes) == 4
+    separaciones = [b - a for a, b in zip(instantes, instantes[1:])]
+    # Margen por la resolución del reloj y el despacho de hilos
+    assert min(separaciones) >= intervalo * 0.8
+
+    m = cliente.estadisticas()["ina"]
+    assert (m["solicitudes"], m["errores"], m["reintentos"]) == (4, 0, 0)
+    assert m["bytes"] == 4 * len(CUERPO)
+    assert m["latencia_max_s"] <= m["latencia_total_s"]
+
+
+def test_limitador_no_frena_hosts_distintos():
+    limitador = LimitadorPorHost(10.0)
+    t0 = time.monotonic()
+    limitador.esperar("http://a.example/x")
+    limitador.esperar("http://b.example/x")
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_volcar_registra_bytes_y_cierra(servidor, esperas):
+    cliente = ClienteHTTP(reintentos=0)
+    resp = cliente.get(servidor.url + "/smn", endpoint="smn", stream=True)
+    destino = io.BytesIO()
+
+    assert cliente.volcar(resp, destino, endpoint="smn", bloque=4) == len(CUERPO)
+    assert destino.getvalue() == CUERPO
+    m = cliente.estadisticas()["smn"]
+    assert (m["solicitudes"], m["errores"], m["bytes"]) == (1, 0, len(CUERPO))
+
+
+def test_volcar_cortado_cuenta_error_y_no_reintenta(servidor, esperas):
+    servidor.guiones["/smn"] = ["cortado"]
+    cliente = ClienteHTTP(reintentos=3)
+    resp = cliente.get(servidor.url + "/smn", endpoint="smn", stream=True)
+
+    destino = io.BytesIO()
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        cliente.volcar(resp, destino, endpoint="smn")
+
+    assert esperas == []
+    assert len(servidor.llegadas) == 1
+    m = cliente.estadisticas()["smn"]
+    assert (m["solicitudes"], m["errores"], m["reintentos"]) == (1, 1, 0)
+    # Los bytes contados son los que llegaron a destino antes del corte
+    assert m["bytes"] == len(destino.getvalue()) < len(CUERPO) * 10
@@ -0,0 +1,187 @@
+"""
+Tests de actualizacion.descargar_y_parsear_pronostico: descarga condicional
+(ETag/Last-Modified) y snapshot por hash del TXT, contra un servidor
+http.server local que sirve el ZIP de cache/debug_pron.zip.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app_mareas.scripts.jobs import actualizacion
+from app_mareas.scripts.jobs.actualizacion import (
+    PRON_ESTADO, PRON_SNAPSHOT, descargar_y_parsear_pronostico)
+from app_mareas.scripts.jobs.http_cliente import ClienteHTTP
+
+ZIP_FIXTURE = Path(__file__).resolve().parents[1] / "cache" / "debug_pron.zip"
+ESTACIONES = {
+    "san_fernando": {"series_id": 1, "site_code": "1", "cal_id": 1,
+                     "pronostico_id": "SAN_FERNANDO"},
+}
+
+
+class _ManejadorSMN(BaseHTTPRequestHandler):
+    def do_GET(self):
+        srv = self.server
+        srv.pedidos.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == srv.etag:
+            self.send_response(304)
+            self.send_header("ETag", srv.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", srv.etag)
+        self.send_header("Last-Modified", "Tue, 19 Aug 2025 10:00:00 GMT")
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(srv.cuerpo)))
+        self.end_headers()
+        self.wfile.write(srv.cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def smn(tmp_path, monkeypatch):
+    """Servidor SMN local y job apuntando a él con cache temporal."""
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _ManejadorSMN)
+    srv.daemon_threads = True
+    srv.cuerpo = ZIP_FIXTURE.read_bytes()
+    srv.etag = '"v1"'
+    srv.pedidos = []
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(actualizacion, "SMN_URL",
+                        f"http://127.0.0.1:{srv.server_address[1]}/pron5d")
+    monkeypatch.setattr(actualizacion, "cliente_http", ClienteHTTP(reintentos=0))
+    monkeypatch.setattr(actualizacion, "directorio_cache", lambda: tmp_path)
+    monkeypatch.setattr(actualizacion, "_ESTACIONES", ESTACIONES)
+
+    parseos = []
+    original = actualizacion.parsear_pronostico
+
+    def _parsear(*args, **kwargs):
+        parseos.append(args[1])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(actualizacion, "parsear_pronostico", _parsear)
+    srv.parseos = parseos
+    srv.cache_dir = tmp_path
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _iguales(a: pd.DataFrame, b: pd.DataFrame) -> None:
+    """Mismos valores; el snapshot reconstruye las categóricas con las presentes."""
+    pd.testing.assert_frame_equal(a, b, check_categorical=False)
+
+
+def _estado(cache_dir: Path) -> dict:
+    return json.loads((cache_dir / PRON_ESTADO).read_text(encoding="utf-8"))
+
+
+def test_primera_descarga_parsea_y_guarda_snapshot(smn):
+    df = descargar_y_parsear_pronostico()
+
+    assert actualizacion.PRON_OK
+    assert len(df) > 0 and set(df["estacion_pronostico"]) == {"SAN_FERNANDO"}
+    assert smn.parseos == [["SAN_FERNANDO"]]
+    assert "If-None-Match" not in smn.pedidos[0]
+    estado = _estado(smn.cache_dir)
+    assert estado["etag"] == '"v1"' and estado["sha256_txt"]
+    assert (smn.cache_dir / PRON_SNAPSHOT).exists()
+
+
+def test_304_con_snapshot_no_vuelve_a_parsear(smn):
+    primero = descargar_y_parsear_pronostico()
+    segundo = descargar_y_parsear_pronostico()
+
+    assert smn.pedidos[1]["If-None-Match"] == '"v1"'
+    assert smn.pedidos[1]["If-Modified-Since"] == "Tue, 19 Aug 2025 10:00:00 GMT"
+    assert len(smn.pedidos) == 2
+    assert len(smn.parseos) == 1
+    assert actualizacion.PRON_OK
+    _iguales(segundo, primero)
+
+
+def test_304_sin_snapshot_util_descarga_completa(smn):
+    descargar_y_parsear_pronostico()
+    # Snapshot vacío: el 304 no alcanza y se pide el ZIP sin condicionales
+    (smn.cache_dir / PRON_SNAPSHOT).write_text("[]", encoding="utf-8")
+
+    df = descargar_y_parsear_pronostico()
+
+    assert len(smn.pedidos) == 3
+    assert smn.pedidos[1]["If-None-Match"] == '"v1"'
+    assert "If-None-Match" not in smn.pedidos[2]
+    assert len(smn.parseos) == 2
+    assert len(df) > 0
+
+
+def test_txt_identico_con_otro_etag_usa_el_snapshot(smn):
+    primero = descargar_y_parsear_pronostico()
+    smn.etag = '"v2"'  # el SMN republica el mismo TXT
+
+    segundo = descargar_y_parsear_pronostico()
+
+    assert len(smn.pedidos) == 2
+    assert len(smn.parseos) == 1
+    _iguales(segundo, primero)
+    # Se guardan los validadores nuevos para el próximo 304
+    assert _estado(smn.cache_dir)["etag"] == '"v2"'
+
+
+def test_cambio_de_catalogo_invalida_el_snapshot(smn, monkeypatch):
+    descargar_y_parsear_pronostico()
+    otras = dict(ESTACIONES, rosario={"series_id": 2, "site_code": "2", "cal_id": 2,
+                                      "pronostico_id": "ROSARIO_AERO"})
+    monkeypatch.setattr(actualizacion, "_ESTACIONES", otras)
+
+    df = descargar_y_parsear_pronostico()
+
+    assert "If-None-Match" not in smn.pedidos[1]
+    assert smn.parseos[1] == ["ROSARIO_AERO", "SAN_FERNANDO"]
+    assert set(df["estacion_pronostico"]) == {"ROSARIO_AERO", "SAN_FERNANDO"}
+
+
+def test_cambio_de_rosa_de_vientos_con_smn_en_304(smn, monkeypatch):
+    primero = descargar_y_parsear_pronostico()
+    assert "NNE" in set(primero["viento_direccion_abreviatura"])
+    assert _estado(smn.cache_dir)["sectores_viento"] == 16
+
+    # El SMN no cambió (respondería 304), pero el snapshot tiene rumbos de 16
+    monkeypatch.setattr(actualizacion, "SECTORES_VIENTO", 8)
+    segundo = descargar_y_parsear_pronostico()
+
+    assert "If-None-Match" not in smn.pedidos[1]
+    assert len(smn.parseos) == 2
+    assert set(segundo["viento_direccion_abreviatura"]) <= {
+        "N", "NE", "E", "SE", "S", "SO", "O", "NO"}
+    assert _estado(smn.cache_dir)["sectores_viento"] == 8
+
+    # Con la rosa de 8 ya guardada, el siguiente pedido vuelve a ser un 304
+    descargar_y_parsear_pronostico()
+    assert smn.pedidos[2]["If-None-Match"] == '"v1"'
+    assert len(smn.parseos) == 2
+
+
+def test_huella_de_estacion_depende_de_la_rosa(monkeypatch):
+    inicio = pd.Timestamp("2025-08-19", tz=actualizacion.ZONA_HORARIA)
+    fin = inicio + pd.Timedelta(days=4)
+    con_16 = actualizacion.huella_entrada([], inicio, fin, "meteo")
+    monkeypatch.setattr(actualizacion, "SECTORES_VIENTO", 8)
+    assert actualizacion.huella_entrada([], inicio, fin, "meteo") != con_16
+
+
+def test_depuracion_se_guarda_en_el_directorio_de_cache(smn, monkeypatch):
+    monkeypatch.setattr(actualizacion, "DEBUG_SMN", True)
+    descargar_y_parsear_pronostico()
+
+    assert (smn.cache_dir / "debug_pron.zip").read_bytes() == smn.cuerpo
+    assert (smn.cache_dir / "debug_pron_raw.bin").stat().st_size > 0
+    assert list(smn.cache_dir.glob("debug_pron_*.txt"))
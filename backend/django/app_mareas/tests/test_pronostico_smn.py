@@ -0,0 +1,62 @@
+"""
+Tests de pronostico_smn: rosa de vientos y detección de encabezados.
+"""
+
+import numpy as np
+import pytest
+
+from app_mareas.scripts.jobs.pronostico_smn import (
+    SECTORES_VIENTO, clasificar_direcciones, iterar_filas)
+
+SEPARADOR = " " + "=" * 40
+FILA = "  19/AGO/2025 {hora}Hs.        13.8       113 |  13         0.8 "
+
+
+def _txt(*bloques) -> list:
+    """Líneas de un TXT con "====" antes de cada bloque (nombre, líneas...)."""
+    lineas = [SEPARADOR]
+    for nombre, entre, filas in bloques:
+        lineas += [f" {nombre}"] + [""] * entre + [SEPARADOR]
+        lineas += [FILA.format(hora=h) for h in filas] + [SEPARADOR]
+    return lineas
+
+
+def _estaciones(lineas, pedidas) -> list:
+    return [(est, hora) for est, _, hora, *_ in iterar_filas(lineas, pedidas)]
+
+
+def test_rosa_de_16_por_defecto():
+    assert SECTORES_VIENTO == 16
+    rumbos = clasificar_direcciones([0.0, 22.5, 111.0, 350.0, np.nan])
+    assert list(rumbos["viento_direccion_abreviatura"][:4]) == ["N", "NNE", "ESE", "N"]
+    assert np.isnan(rumbos["viento_direccion_grados"][4])
+
+
+def test_rosa_de_8_opcional():
+    rumbos = clasificar_direcciones([22.4, 111.0, 337.6], sectores=8)
+    assert list(rumbos["viento_direccion_abreviatura"]) == ["N", "E", "N"]
+    np.testing.assert_array_equal(rumbos["viento_direccion_grados"], [0.0, 90.0, 0.0])
+
+
+def test_rosa_no_soportada():
+    with pytest.raises(ValueError):
+        clasificar_direcciones([0.0], sectores=12)
+
+
+@pytest.mark.parametrize("entre", [0, 1])
+def test_encabezado_con_hasta_un_blanco_antes_del_separador(entre):
+    lineas = _txt(("SAN_FERNANDO", entre, ["00", "03"]))
+    assert _estaciones(lineas, ["SAN_FERNANDO"]) == [
+        ("SAN_FERNANDO", "00:00:00"), ("SAN_FERNANDO", "03:00:00")]
+
+
+def test_nombre_con_dos_blancos_antes_del_separador_no_es_encabezado():
+    # Como el parser original: el "====" debe estar en i+1 o i+2
+    lineas = _txt(("SAN_FERNANDO", 2, ["00"]))
+    assert _estaciones(lineas, ["SAN_FERNANDO"]) == []
+
+
+def test_bloque_siguiente_corta_la_estacion():
+    lineas = _txt(("SAN_FERNANDO", 1, ["00"]), ("ROSARIO_AERO", 0, ["06"]))
+    assert _estaciones(lineas, ["SAN_FERNANDO", "ROSARIO_AERO"]) == [
+        ("SAN_FERNANDO", "00:00:00"), ("ROSARIO_AERO", "06:00:00")]
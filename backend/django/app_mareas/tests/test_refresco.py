@@ -0,0 +1,112 @@
+"""
+Tests de refresco.py y de POST /marea/actualizar-mareas/: leer el estado
+no toca el candado, la respuesta no comparte datos con el worker y un
+segundo POST con una corrida en curso responde 409.
+"""
+
+import json
+import subprocess
+import sys
+import threading
+
+from app_mareas import refresco
+from app_mareas.refresco import (
+    ARCHIVO_ESTADO, Candado, iniciar_refresco, leer_estado)
+
+
+def _escribir_estado(cache_dir, **datos):
+    (cache_dir / ARCHIVO_ESTADO).write_text(json.dumps(datos), encoding="utf-8")
+
+
+def test_leer_estado_no_toma_el_candado(tmp_path, monkeypatch):
+    _escribir_estado(tmp_path, estado="corriendo", pid=None)
+    llamadas = []
+    monkeypatch.setattr(refresco.fcntl, "flock", lambda *a: llamadas.append(a))
+    assert leer_estado(tmp_path)["estado"] == "corriendo"
+    assert llamadas == []
+
+
+def test_post_durante_lecturas_de_estado(tmp_path):
+    liberar = threading.Event()
+    iniciado, estado = iniciar_refresco(tmp_path, lambda seg: liberar.wait(5) and [])
+    assert iniciado and estado["pid"]
+    try:
+        # Mientras corre: el estado es "corriendo" y un segundo POST ve la corrida
+        for _ in range(50):
+            assert leer_estado(tmp_path)["estado"] == "corriendo"
+        iniciado, actual = iniciar_refresco(tmp_path, lambda seg: [])
+        assert not iniciado and actual["id"] == estado["id"]
+    finally:
+        liberar.set()
+
+
+def test_candado_libre_tras_lecturas(tmp_path):
+    _escribir_estado(tmp_path, estado="terminado", pid=None)
+    for _ in range(20):
+        leer_estado(tmp_path)
+    candado = Candado(tmp_path / refresco.ARCHIVO_CANDADO)
+    assert candado.adquirir()
+    candado.liberar()
+
+
+def test_corrida_de_proceso_muerto_se_informa_interrumpida(tmp_path):
+    hijo = subprocess.Popen([sys.executable, "-c", "pass"])
+    hijo.wait()
+    _escribir_estado(tmp_path, estado="corriendo", pid=hijo.pid)
+    assert leer_estado(tmp_path)["estado"] == "interrumpido"
+
+
+def test_sin_estado_devuelve_none(tmp_path):
+    assert leer_estado(tmp_path) is None
+
+
+def test_estado_devuelto_no_comparte_datos_con_el_worker(tmp_path):
+    liberar = threading.Event()
+    seguimientos = []
+
+    def ejecutar(seg):
+        seguimientos.append(seg)
+        liberar.wait(5)
+        return []
+
+    try:
+        iniciado, estado = iniciar_refresco(tmp_path, ejecutar)
+        assert iniciado
+        for _ in range(100):
+            if seguimientos:
+                break
+            threading.Event().wait(0.01)
+        # El worker avanza mientras la vista todavía serializa `estado`
+        seguimientos[0].estacion({"estacion": "a", "ok": True,
+                                  "duracion_s": 0.1, "error": None})
+        assert estado["estaciones"] == {}
+        assert estado["ok"] == 0
+    finally:
+        liberar.set()
+
+
+def test_post_con_corrida_en_curso_responde_409(tmp_path, monkeypatch):
+    from django.test import RequestFactory
+
+    from app_mareas.views import actualizar_alturas
+
+    liberar = threading.Event()
+    monkeypatch.setenv("MAREA_JOB_TOKEN", "secreto")
+    monkeypatch.setattr(actualizar_alturas, "directorio_cache", lambda: tmp_path)
+    monkeypatch.setattr(actualizar_alturas, "_ejecutar", lambda seg: liberar.wait(5) and [])
+    rf = RequestFactory()
+
+    def _post():
+        resp = actualizar_alturas.actualizar_mareas_view(
+            rf.post("/marea/actualizar-mareas/", HTTP_AUTHORIZATION="Bearer secreto"))
+        return resp.status_code, json.loads(resp.content)
+
+    try:
+        codigo, primero = _post()
+        assert codigo == 202 and primero["iniciado"] and primero["estado"] == "corriendo"
+        codigo, segundo = _post()
+        assert codigo == 409
+        assert not segundo["iniciado"]
+        assert segundo["id"] == primero["id"] and segundo["estado"] == "corriendo"
+    finally:
+        liberar.set()
@@ -0,0 +1,147 @@
+"""
+Tests de actualizacion.actualizar_datos_marea: omitir la escritura cuando la
+huella de entrada (lecturas del INA, ventana y meteo) no cambió.
+
+El INA es un servidor http.server local que devuelve `srv.payload`; el
+pronóstico de la corrida se fija a mano (sin SMN).
+"""
+
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+import pytz
+
+from app_mareas.scripts.jobs import actualizacion
+from app_mareas.scripts.jobs.actualizacion import (
+    DIAS_VENTANA, ZONA_HORARIA, actualizar_datos_marea, archivo_huella)
+from app_mareas.scripts.jobs.http_cliente import ClienteHTTP
+
+ESTACION = "prueba"
+
+
+def payload_ina(desplazamiento: float = 0.0) -> bytes:
+    """Lecturas horarias de la ventana actual (marea sintética)."""
+    hoy = datetime.now(pytz.timezone(ZONA_HORARIA)).strftime("%Y-%m-%d")
+    instantes = pd.date_range(hoy, periods=DIAS_VENTANA * 24, freq="h")
+    horas = np.arange(len(instantes))
+    alturas = 1.2 + 0.8 * np.sin(2 * np.pi * horas / 12.42) + desplazamiento
+    data = [{"timestart": t, "valor": round(float(v), 3)}
+            for t, v in zip(instantes.strftime("%Y-%m-%dT%H:%M:%S"), alturas)]
+    return json.dumps({"data": data}).encode("utf-8")
+
+
+class _ManejadorINA(BaseHTTPRequestHandler):
+    def do_GET(self):
+        cuerpo = self.server.payload
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ina(tmp_path, monkeypatch):
+    """INA local, cache temporal y pronóstico de la corrida ya cargado."""
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _ManejadorINA)
+    srv.daemon_threads = True
+    srv.payload = payload_ina()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(actualizacion, "INA_URL",
+                        f"http://127.0.0.1:{srv.server_address[1]}/ina?x=1")
+    monkeypatch.setattr(actualizacion, "cliente_http", ClienteHTTP(reintentos=0))
+    monkeypatch.setattr(actualizacion, "directorio_cache", lambda: tmp_path)
+    monkeypatch.setattr(actualizacion, "HISTORICO", False)
+    monkeypatch.setattr(actualizacion, "_ESTACIONES", {
+        ESTACION: {"series_id": 1, "site_code": "1", "cal_id": 1,
+                   "pronostico_id": "SAN_FERNANDO"}})
+    monkeypatch.setattr(actualizacion, "df_pronostico_global", actualizacion.df_pron_vacio())
+    monkeypatch.setattr(actualizacion, "pronostico_por_estacion", {})
+    monkeypatch.setattr(actualizacion, "huella_pronostico", {"SAN_FERNANDO": "meteo-1"})
+    monkeypatch.setattr(actualizacion, "PRON_OK", True)
+    srv.cache_dir = tmp_path
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _actualizar(**kwargs):
+    return actualizar_datos_marea(ESTACION, 1, "1", 1, **kwargs)
+
+
+def _archivos(cache_dir) -> dict:
+    """{nombre: (mtime_ns, contenido)} de todo lo escrito en la cache."""
+    return {p.name: (p.stat().st_mtime_ns, p.read_bytes())
+            for p in sorted(cache_dir.iterdir()) if p.is_file()}
+
+
+def _huella(cache_dir) -> dict:
+    return json.loads(archivo_huella(cache_dir, ESTACION).read_text(encoding="utf-8"))
+
+
+def test_entrada_sin_cambios_no_toca_los_archivos(ina):
+    assert _actualizar(forzar=False) is True
+    antes = _archivos(ina.cache_dir)
+    assert f"marea_{ESTACION}.json" in antes
+
+    assert _actualizar(forzar=False) is None
+    assert _archivos(ina.cache_dir) == antes
+
+
+def test_cambio_en_el_ina_reescribe(ina):
+    assert _actualizar(forzar=False) is True
+    antes = _archivos(ina.cache_dir)
+
+    ina.payload = payload_ina(desplazamiento=0.1)
+    assert _actualizar(forzar=False) is True
+
+    despues = _archivos(ina.cache_dir)
+    nombre = f"marea_{ESTACION}.json"
+    assert despues[nombre][1] != antes[nombre][1]
+    assert _huella(ina.cache_dir)["ina"] != json.loads(antes[f"marea_{ESTACION}.huella.json"][1])["ina"]
+
+
+def test_smn_caido_arrastra_la_huella_de_meteo(ina, monkeypatch):
+    assert _actualizar(forzar=False) is True
+    antes = _archivos(ina.cache_dir)
+
+    # Sin SMN en esta corrida: la meteo sale de la cache, vale la huella previa
+    monkeypatch.setattr(actualizacion, "PRON_OK", False)
+    monkeypatch.setattr(actualizacion, "huella_pronostico", {})
+    assert _actualizar(forzar=False) is None
+    assert _archivos(ina.cache_dir) == antes
+    assert _huella(ina.cache_dir)["meteo"] == "meteo-1"
+
+
+def test_meteo_nueva_reescribe(ina, monkeypatch):
+    assert _actualizar(forzar=False) is True
+    monkeypatch.setattr(actualizacion, "huella_pronostico", {"SAN_FERNANDO": "meteo-2"})
+    assert _actualizar(forzar=False) is True
+    assert _huella(ina.cache_dir)["meteo"] == "meteo-2"
+
+
+def test_falta_una_resolucion_fuerza_la_escritura(ina):
+    assert _actualizar(forzar=False) is True
+    faltante = ina.cache_dir / f"marea_{ESTACION}.3h.json"
+    faltante.unlink()
+
+    assert _actualizar(forzar=False) is True
+    assert faltante.exists()
+
+
+def test_forzar_ignora_la_huella(ina):
+    assert _actualizar(forzar=False) is True
+    antes = _archivos(ina.cache_dir)
+
+    assert _actualizar(forzar=True) is True
+    nombre = f"marea_{ESTACION}.json"
+    assert _archivos(ina.cache_dir)[nombre][0] != antes[nombre][0]
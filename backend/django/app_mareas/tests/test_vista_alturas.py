@@ -0,0 +1,244 @@
+"""
+Tests de /marea/alturas/<id>/ (recorte por tiempo, ?campos=, ?stream=1)
+y del lote /marea/alturas/?ids=.
+"""
+
+import gzip
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from django.test import RequestFactory
+
+from app_mareas.cache_mareas import escribir_cache
+from app_mareas.historico import a_epoch
+from app_mareas.views import alturas
+from app_mareas.views.alturas import (
+    MAX_LOTE, obtener_alturas_estacion, obtener_alturas_lote)
+
+rf = RequestFactory()
+
+FILAS = [
+    {"fecha": "2025-08-01", "hora": f"{h:02d}:00:00", "altura_promedio": 1.0 + h / 10}
+    for h in range(6)
+]
+
+
+def _escribir_estacion(cache_dir, estacion_id="prueba"):
+    with open(cache_dir / f"marea_{estacion_id}.json", "w", encoding="utf-8") as f:
+        json.dump({"datos": FILAS}, f)
+
+
+def _pedir(params: dict, estacion_id="prueba", **extra):
+    return obtener_alturas_estacion(
+        rf.get("/marea/alturas/prueba/", params, **extra), estacion_id)
+
+
+def test_desde_vacio_se_toma_como_ausente(cache_dir):
+    _escribir_estacion(cache_dir)
+    resp = _pedir({"desde": ""})
+    assert resp.status_code == 200
+    assert json.loads(resp.content)["datos"] == FILAS
+
+
+def test_hasta_vacio_se_toma_como_ausente(cache_dir):
+    _escribir_estacion(cache_dir)
+    resp = _pedir({"hasta": ""})
+    assert resp.status_code == 200
+    assert json.loads(resp.content)["datos"] == FILAS
+
+
+def test_desde_y_hasta_vacios(cache_dir):
+    _escribir_estacion(cache_dir)
+    resp = _pedir({"desde": "", "hasta": "", "campos": "altura_promedio"})
+    assert resp.status_code == 200
+    assert len(json.loads(resp.content)["datos"]) == len(FILAS)
+
+
+def test_rango_dentro_de_la_ventana(cache_dir):
+    _escribir_estacion(cache_dir)
+    resp = _pedir({"desde": "2025-08-01T02:00", "hasta": "2025-08-01T04:00"})
+    assert resp.status_code == 200
+    horas = [f["hora"] for f in json.loads(resp.content)["datos"]]
+    assert horas == ["02:00:00", "03:00:00"]
+
+
+def test_desde_invalido_da_400(cache_dir):
+    _escribir_estacion(cache_dir)
+    assert _pedir({"desde": "ayer"}).status_code == 400
+
+
+# ===============================
+# Proyección y próximas horas
+# ===============================
+
+
+def test_campos_elige_columnas_y_conserva_fecha_hora(cache_dir):
+    filas = [dict(f, altura_maxima=f["altura_promedio"] + 0.1) for f in FILAS]
+    with open(cache_dir / "marea_prueba.json", "w", encoding="utf-8") as f:
+        json.dump({"datos": filas}, f)
+
+    resp = _pedir({"campos": "altura_maxima"})
+    assert resp.status_code == 200
+    assert json.loads(resp.content)["datos"] == [
+        {"fecha": f["fecha"], "hora": f["hora"], "altura_maxima": f["altura_maxima"]}
+        for f in filas]
+
+
+def test_campo_desconocido_da_400(cache_dir):
+    _escribir_estacion(cache_dir)
+    resp = _pedir({"campos": "altura_promedio,oleaje"})
+    assert resp.status_code == 400
+    assert "oleaje" in json.loads(resp.content)["error"]
+
+
+def test_proximas_horas_desde_el_comienzo_de_la_hora(cache_dir, monkeypatch):
+    _escribir_estacion(cache_dir)
+    ahora = a_epoch(datetime(2025, 8, 1, 2, 40))
+    monkeypatch.setattr(alturas, "time", SimpleNamespace(time=lambda: ahora))
+
+    resp = _pedir({"proximas_horas": "2", "campos": "altura_promedio"})
+
+    assert resp.status_code == 200
+    cuerpo = json.loads(resp.content)
+    assert [f["hora"] for f in cuerpo["datos"]] == ["02:00:00", "03:00:00"]
+    assert cuerpo["desde"] == "2025-08-01T02:00:00-03:00"
+    assert cuerpo["hasta"] == "2025-08-01T04:00:00-03:00"
+
+
+def test_proximas_horas_al_final_de_la_ventana(cache_dir, monkeypatch):
+    _escribir_estacion(cache_dir)
+    ahora = a_epoch(datetime(2025, 8, 1, 5, 0))
+    monkeypatch.setattr(alturas, "time", SimpleNamespace(time=lambda: ahora))
+
+    horas = [f["hora"] for f in json.loads(_pedir({"proximas_horas": "12"}).content)["datos"]]
+    assert horas == ["05:00:00"]
+
+
+def test_proximas_horas_invalidas_dan_400(cache_dir):
+    _escribir_estacion(cache_dir)
+    assert _pedir({"proximas_horas": "0"}).status_code == 400
+    assert _pedir({"proximas_horas": "muchas"}).status_code == 400
+    assert _pedir({"proximas_horas": "2", "desde": "2025-08-01"}).status_code == 400
+
+
+# ===============================
+# Streaming desde disco
+# ===============================
+
+
+def _escribir_con_sidecars(cache_dir, estacion_id="prueba") -> dict:
+    """Escribir el JSON legible con .meta y variantes, como el job."""
+    return escribir_cache(cache_dir / f"marea_{estacion_id}.json", {"datos": FILAS},
+                          formatos=[])["json"]
+
+
+def _leer(resp) -> bytes:
+    """Consumir el cuerpo y cerrar el archivo, como el servidor al terminar."""
+    try:
+        return b"".join(resp.streaming_content)
+    finally:
+        resp.close()
+
+
+def test_stream_sirve_el_archivo_con_etag_debil(cache_dir):
+    meta = _escribir_con_sidecars(cache_dir)
+    resp = _pedir({"stream": "1"})
+
+    assert resp.status_code == 200
+    assert resp.streaming
+    assert "Content-Disposition" not in resp
+    # El archivo es el JSON legible, no el cuerpo minificado del .meta
+    assert resp["ETag"] == f"W/{meta['etag']}"
+    assert json.loads(_leer(resp)) == {"datos": FILAS}
+
+
+def test_stream_responde_304_con_el_etag_debil(cache_dir):
+    _escribir_con_sidecars(cache_dir)
+    primera = _pedir({"stream": "1"})
+    etag = primera["ETag"]
+    primera.close()
+
+    resp = _pedir({"stream": "1"}, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+    assert resp["ETag"] == etag
+    # El ETag débil también vale contra el fuerte de la vista sin stream
+    assert _pedir({}, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def test_stream_con_gzip_usa_la_variante_del_job(cache_dir):
+    meta = _escribir_con_sidecars(cache_dir)
+    resp = _pedir({"stream": "1"}, HTTP_ACCEPT_ENCODING="gzip")
+
+    assert resp["Content-Encoding"] == "gzip"
+    assert resp["ETag"] == f'{meta["etag"][:-1]}-gzip"'
+    assert json.loads(gzip.decompress(_leer(resp))) == {"datos": FILAS}
+
+
+def test_stream_sin_archivo_da_404(cache_dir):
+    assert _pedir({"stream": "1"}).status_code == 404
+
+
+# ===============================
+# Lote de estaciones
+# ===============================
+
+
+def _pedir_lote(params: dict, **extra):
+    return obtener_alturas_lote(rf.get("/marea/alturas/", params, **extra))
+
+
+def _cuerpo(resp) -> bytes:
+    return b"".join(resp.streaming_content)
+
+
+def test_lote_sin_ids_da_400(cache_dir):
+    assert _pedir_lote({}).status_code == 400
+
+
+def test_lote_con_id_invalido_da_400(cache_dir):
+    _escribir_estacion(cache_dir)
+    resp = _pedir_lote({"ids": "prueba,../otra"})
+    assert resp.status_code == 400
+    assert "../otra" in json.loads(resp.content)["error"]
+
+
+def test_lote_con_demasiadas_estaciones_da_400(cache_dir):
+    ids = ",".join(f"e{i}" for i in range(MAX_LOTE + 1))
+    assert _pedir_lote({"ids": ids}).status_code == 400
+
+
+def test_lote_concatenado_es_json_valido(cache_dir):
+    _escribir_estacion(cache_dir, "a")
+    _escribir_estacion(cache_dir, "b")
+    resp = _pedir_lote({"ids": "a,b,a,c"})
+
+    assert resp.status_code == 200
+    assert "Content-Encoding" not in resp
+    assert json.loads(_cuerpo(resp)) == {
+        "estaciones": {"a": {"datos": FILAS}, "b": {"datos": FILAS}},
+        "faltantes": ["c"],
+    }
+
+
+def test_lote_con_gzip(cache_dir):
+    _escribir_estacion(cache_dir, "a")
+    _escribir_estacion(cache_dir, "b")
+    plano = _pedir_lote({"ids": "a,b"})
+    resp = _pedir_lote({"ids": "a,b"}, HTTP_ACCEPT_ENCODING="gzip")
+
+    assert resp["Content-Encoding"] == "gzip"
+    assert resp["ETag"].endswith('-gzip"') and resp["ETag"] != plano["ETag"]
+    assert json.loads(gzip.decompress(_cuerpo(resp))) == json.loads(_cuerpo(plano))
+
+
+def test_lote_sin_ninguna_estacion_da_404(cache_dir):
+    resp = _pedir_lote({"ids": "a,b"})
+    assert resp.status_code == 404
+    assert json.loads(resp.content)["faltantes"] == ["a", "b"]
+
+
+def test_lote_responde_304_con_el_etag(cache_dir):
+    _escribir_estacion(cache_dir, "a")
+    etag = _pedir_lote({"ids": "a"})["ETag"]
+    assert _pedir_lote({"ids": "a"}, HTTP_IF_NONE_MATCH=etag).status_code == 304
@@ -0,0 +1,107 @@
+"""
+Tests de /marea/metricas/: nombres y tipos Prometheus, tramos del job y
+tiempos de las vistas (metricas.tramo / medir_vista).
+"""
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from app_mareas.metricas import Registro, medir_vista, tramo
+from app_mareas.scripts.jobs import http_cliente
+from app_mareas.scripts.jobs.http_cliente import ClienteHTTP
+from app_mareas.views.metricas import metricas
+
+rf = RequestFactory()
+
+
+@pytest.fixture
+def registro(monkeypatch):
+    """Registro vacío en lugar del compartido del proceso."""
+    from app_mareas import metricas as modulo
+    from app_mareas.views import metricas as vista
+
+    nuevo = Registro()
+    monkeypatch.setattr(modulo, "registro", nuevo)
+    monkeypatch.setattr(vista, "registro", nuevo)
+    return nuevo
+
+
+def _exportado(monkeypatch) -> str:
+    monkeypatch.delenv("MAREA_METRICAS_TOKEN", raising=False)
+    resp = metricas(rf.get("/marea/metricas/"))
+    assert resp.status_code == 200
+    return resp.content.decode()
+
+
+def _tipos(cuerpo: str) -> dict:
+    return {
+        partes[2]: partes[3]
+        for partes in (linea.split() for linea in cuerpo.splitlines())
+        if partes[:2] == ["#", "TYPE"]
+    }
+
+
+def test_contadores_de_cache_con_sufijo_total(monkeypatch):
+    tipos = _tipos(_exportado(monkeypatch))
+
+    for clave in ("aciertos", "fallos", "descartes"):
+        assert tipos[f"marea_cache_respuestas_{clave}_total"] == "counter"
+        assert f"marea_cache_respuestas_{clave}" not in tipos
+    for clave in ("entradas", "max_entradas", "bytes"):
+        assert tipos[f"marea_cache_respuestas_{clave}"] == "gauge"
+
+
+def test_contadores_http_con_sufijo_total(monkeypatch):
+    cliente = ClienteHTTP()
+    cliente._registrar("ina", solicitudes=3, errores=1, reintentos=1, bytes=120,
+                       latencia_s=0.25)
+    monkeypatch.setattr(http_cliente, "cliente_http", cliente)
+    cuerpo = _exportado(monkeypatch)
+    tipos = _tipos(cuerpo)
+
+    esperados = {
+        "marea_http_solicitudes_total": "3",
+        "marea_http_errores_total": "1",
+        "marea_http_reintentos_total": "1",
+        "marea_http_bytes_total": "120",
+        "marea_http_latencia_segundos_total": "0.25",
+    }
+    for nombre, valor in esperados.items():
+        assert tipos[nombre] == "counter"
+        assert f'{nombre}{{endpoint="ina"}} {valor}' in cuerpo.splitlines()
+    assert not any(n.startswith("marea_http_") and not n.endswith("_total") for n in tipos)
+
+
+def test_tramos_del_job_como_histograma(registro, monkeypatch):
+    with tramo("smn_parseo"):
+        pass
+    with pytest.raises(RuntimeError):
+        with tramo("smn_parseo"):
+            raise RuntimeError("falla")  # el tramo se mide igual
+
+    lineas = _exportado(monkeypatch).splitlines()
+    assert "# TYPE marea_tramo_segundos histogram" in lineas
+    assert 'marea_tramo_segundos_count{tramo="smn_parseo"} 2' in lineas
+    assert 'marea_tramo_segundos_bucket{tramo="smn_parseo",le="+Inf"} 2' in lineas
+    assert registro.resumen_tramos()[0][:2] == ({"tramo": "smn_parseo"}, 2)
+
+
+def test_medir_vista_registra_duracion_y_codigo(registro, monkeypatch):
+    @medir_vista("prueba")
+    def vista_ok(request):
+        return HttpResponse(status=201)
+
+    @medir_vista("prueba")
+    def vista_rota(request):
+        raise ValueError("rota")
+
+    vista_ok(rf.get("/"))
+    vista_ok(rf.get("/"))
+    with pytest.raises(ValueError):
+        vista_rota(rf.get("/"))
+
+    lineas = _exportado(monkeypatch).splitlines()
+    assert 'marea_vista_total{codigo="201",vista="prueba"} 2' in lineas
+    assert 'marea_vista_total{codigo="500",vista="prueba"} 1' in lineas
+    assert 'marea_vista_segundos_count{vista="prueba"} 3' in lineas
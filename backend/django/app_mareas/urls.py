@@ -9,7 +9,7 @@ Enrutamiento de la app marea.
 """
 
 from django.urls import path
-from .views import ping, alturas, estaciones, actualizar_alturas
+from .views import ping, alturas, estaciones, actualizar_alturas, extremos, metricas
 
 # ==========================
 # URL patterns
@@ -18,14 +18,28 @@ urlpatterns = [
     # Verificar salud del servicio
     path("ping/", ping, name="ping"),
 
+    # Obtener alturas cacheadas de varias estaciones (?ids=a,b,c)
+    path("alturas/", alturas.obtener_alturas_lote, name="alturas_lote"),
+
     # Obtener alturas cacheadas por estación
     path("alturas/<str:estacion_id>/",
          alturas.obtener_alturas_estacion, name="alturas_por_estacion"),
 
+    # Obtener próximas pleamares/bajamares por estación
+    path("extremos/<str:estacion_id>/",
+         extremos.obtener_extremos_estacion, name="extremos_por_estacion"),
+
     # Listar estaciones disponibles
     path("estaciones/", estaciones.listar_estaciones, name="listar_estaciones"),
 
     # Actualizar y cachear datos de todas las estaciones
     path("actualizar-mareas/", actualizar_alturas.actualizar_mareas_view,
          name="actualizar_alturas"),
+
+    # Consultar el avance del último refresco
+    path("actualizar-mareas/estado/", actualizar_alturas.estado_actualizacion_view,
+         name="estado_actualizacion"),
+
+    # Exponer métricas del proceso (formato Prometheus)
+    path("metricas/", metricas.metricas, name="metricas"),
 ]
@@ -4,6 +4,14 @@
 # Propósito: expone un endpoint protegido por token para actualizar y
 #            cachear alturas de marea por estación.
 #
+# Modos (ver refresco.py):
+#   - POST: encola el refresco en un hilo y responde 202 al instante con el
+#     id de la corrida; si ya hay una en curso responde 409 con el estado de
+#     esa corrida (sin duplicar).
+#   - GET: corre el refresco dentro de la solicitud y devuelve el reporte
+#     (compatibilidad); 409 si ya hay una corrida en curso.
+#   - GET estado/: avance por estación de la última corrida.
+#
 # Autenticación:
 #   - Header:  Authorization: Bearer <REEMPLAZAR: MAREA_JOB_TOKEN>
 #   - Alternativas (solo si su caso lo requiere): ?token=<...> o body form 'token'
@@ -18,8 +26,11 @@ import hmac
 import logging
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
-from app_mareas.scripts.jobs.actualizacion import actualizar_datos_marea, ESTACIONES
+from django.views.decorators.http import require_GET, require_http_methods
+
+from app_mareas.cache_mareas import directorio_cache
+from app_mareas.metricas import medir_vista
+from app_mareas.refresco import iniciar_refresco, leer_estado, refrescar_sincronico
 
 logger = logging.getLogger(__name__)
 
@@ -38,28 +49,71 @@ def _token_valido(provisto: str, esperado: str) -> bool:
     """Comparar tokens con tiempo constante."""
     return bool(esperado) and hmac.compare_digest(provisto, esperado)
 
-# ---------------- Vista ----------------
+
+def _autorizado(request) -> bool:
+    """Validar el token del job (MAREA_JOB_TOKEN)."""
+    return _token_valido(_extraer_token(request), os.getenv("MAREA_JOB_TOKEN", ""))
+
+
+def _ejecutar(seguimiento) -> list:
+    """Correr el job informando el avance por estación al seguimiento."""
+    # Importar el job recién aquí: pandas y el pronóstico no se cargan al
+    # arrancar el worker, solo cuando se pide un refresco
+    from app_mareas.scripts.jobs.actualizacion import actualizar_estaciones, cargar_estaciones
+
+    seguimiento.comenzar(list(cargar_estaciones()))
+    return actualizar_estaciones(progreso=seguimiento.estacion)
+
+# ---------------- Vistas ----------------
 
 
 @csrf_exempt
+@medir_vista("actualizar_mareas")
 @require_http_methods(["GET", "POST"])
 def actualizar_mareas_view(request):
-    """Actualizar todas las estaciones y devolver resumen JSON."""
-    esperado = os.getenv("MAREA_JOB_TOKEN", "")
-    provisto = _extraer_token(request)
-
-    if not _token_valido(provisto, esperado):
+    """POST: lanzar el refresco en segundo plano. GET: correrlo y devolver el resumen."""
+    if not _autorizado(request):
         return JsonResponse({"error": "Unauthorized"}, status=401)
 
+    cache_dir = directorio_cache()
+    if request.method == "POST":
+        iniciado, estado = iniciar_refresco(cache_dir, _ejecutar)
+        cuerpo = {
+            "iniciado": iniciado,
+            "id": estado and estado["id"],
+            "estado": estado and estado["estado"],
+            "estado_url": "/marea/actualizar-mareas/estado/",
+        }
+        if not iniciado:
+            cuerpo["error"] = "Ya hay una actualización en curso"
+        return JsonResponse(cuerpo, status=202 if iniciado else 409)
+
+    reporte = refrescar_sincronico(cache_dir, _ejecutar)
+    if reporte is None:
+        return JsonResponse({"error": "Ya hay una actualización en curso",
+                             "estado": leer_estado(cache_dir)}, status=409)
+
     ok, errores = [], []
-    for est, config in ESTACIONES.items():
-        try:
-            actualizar_datos_marea(
-                est, config["series_id"], config["site_code"], config["cal_id"])
-            ok.append(est)
-        except Exception as e:
-            logger.exception("Error actualizando estación %s", est)
-            errores.append({"estacion": est, "error": str(e)})
+    for r in reporte:
+        if r["ok"]:
+            ok.append(r["estacion"])
+        else:
+            logger.error("Error actualizando estación %s: %s",
+                         r["estacion"], r["error"])
+            errores.append({"estacion": r["estacion"],
+                           "error": r["error"] or "sin actualizar"})
 
     status = 200 if not errores else 200  # mantener 200 y reportar parcial
-    return JsonResponse({"ok": ok, "errores": errores}, status=status)
+    return JsonResponse({"ok": ok, "errores": errores, "reporte": reporte}, status=status)
+
+
+@medir_vista("estado_actualizacion")
+@require_GET
+def estado_actualizacion_view(request):
+    """Devolver el avance de la última corrida (o 404 si nunca hubo una)."""
+    if not _autorizado(request):
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+    estado = leer_estado(directorio_cache())
+    if estado is None:
+        return JsonResponse({"error": "Sin actualizaciones registradas"}, status=404)
+    return JsonResponse(estado, json_dumps_params={"ensure_ascii": False})
@@ -7,47 +7,345 @@
 #   - Archivos generados por un job previo en:
 #       * Producción (Railway): /app/marea/cache/marea_<estacion_id>.json
 #       * Desarrollo local:     <repo>/marea/cache/marea_<estacion_id>.json
+#   - El cuerpo codificado se mantiene en memoria por worker y se
+#     recarga solo si cambia el archivo (ver cache_respuestas.py).
+#   - ETag/Last-Modified calculados por el job al escribir (304 Not
+#     Modified) y variantes gzip/brotli precomprimidas.
+#   - Formato elegible con ?formato=json|columnar|msgpack o con
+#     Accept: application/x-msgpack (ver cache_mareas.FORMATOS).
+#   - ?resolucion=horaria|3h|diaria elige la serie completa, bloques de
+#     3 h o máxima/mínima diaria (para gráficos chicos).
+#   - ?desde=&hasta= (AAAA-MM-DD o AAAA-MM-DDTHH:MM, hora local) y
+#     ?proximas_horas=N recortan la serie por tiempo; ?campos=a,b elige
+#     columnas (fecha y hora van siempre). Si el rango cae en la ventana
+#     del job se resuelve sobre la serie en memoria (series.py, búsqueda
+#     binaria); si empieza antes, se consulta el histórico SQLite que
+#     acumula el job (ver historico.py, solo resolución horaria).
+#   - ?stream=1 no arma el cuerpo en memoria: la ventana se envía desde
+#     disco con FileResponse (variante .br/.gz si el cliente la acepta; si
+#     no, el JSON legible) y los rangos del histórico en JSON se generan
+#     por tandas (respuesta chunked). Memoria constante por request.
+#   - /marea/alturas/?ids=a,b,c devuelve varias estaciones en una sola
+#     respuesta (JSON o columnar), armada con los cuerpos en memoria.
 # ================================================================
 
 """
 Exponer alturas de marea cacheadas por estación.
 """
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 import os
+import re
+import time
 from pathlib import Path
-import json
+from typing import Optional
+
+from app_mareas.cache_mareas import (
+    FORMATOS, RESOLUCIONES, a_columnar, archivo_estacion, codificar_compacto,
+    directorio_cache, msgpack)
+from app_mareas.cache_respuestas import (
+    cache_respuestas, cargar_crudo, cargar_json, responder, responder_archivo, responder_lote)
+from app_mareas.historico import (
+    COLUMNAS, a_iso, consultar_rango, iterar_rango, parsear_limite, ruta_historico)
+from app_mareas.metricas import medir_vista
+from app_mareas.series import CAMPOS_TIEMPO, cache_series
+
+# Máximo de días por consulta al histórico (y de ?proximas_horas)
+MAX_DIAS_RANGO = int(os.getenv("MAREA_HISTORICO_MAX_DIAS", "366"))
+
+# Parámetros que activan el recorte por tiempo o columnas
+PARAMETROS_FILTRO = ("desde", "hasta", "proximas_horas", "campos")
+
+# Máximo de estaciones por lote (/marea/alturas/?ids=)
+MAX_LOTE = int(os.getenv("MAREA_LOTE_MAX", "32"))
+
+# Identificadores de estación válidos (forman parte del nombre de archivo)
+PATRON_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# ===============================
+# Utilidades
+# ===============================
+
+
+def _formato_pedido(request) -> str:
+    """Elegir formato por query (?formato=) o por cabecera Accept."""
+    formato = request.GET.get("formato")
+    if formato:
+        return formato
+    accept = request.META.get("HTTP_ACCEPT", "")
+    if "application/x-msgpack" in accept or "application/msgpack" in accept:
+        return "msgpack"
+    return "json"
+
+
+def _pide_stream(request) -> bool:
+    """Indicar si se pidió respuesta en streaming (?stream=1)."""
+    return request.GET.get("stream", "").lower() in ("1", "true", "si", "sí")
+
+
+def _json_por_tandas(desde: int, hasta: int, tandas):
+    """Generar el mismo JSON compacto que la respuesta en memoria, por tandas."""
+    cabecera = codificar_compacto({"desde": a_iso(desde), "hasta": a_iso(hasta)})
+    yield cabecera[:-1] + b',"datos":['
+    separador = b""
+    for filas in tandas:
+        yield separador + codificar_compacto(filas)[1:-1]
+        separador = b","
+    yield b"]}"
+
+
+def _validar_rango(desde: int, hasta: int) -> None:
+    """Lanzar ValueError si el rango está vacío o es demasiado largo."""
+    if hasta <= desde:
+        raise ValueError("El rango está vacío (hasta <= desde)")
+    if hasta - desde > MAX_DIAS_RANGO * 86400:
+        raise ValueError(f"El rango supera {MAX_DIAS_RANGO} días")
+
+
+def _limites(request) -> tuple:
+    """Interpretar desde/hasta o proximas_horas como (desde, hasta) epoch.
+
+    (None, None) si no se pidió recorte por tiempo; hasta es None si solo
+    vino desde (la ventana llega hasta su última fila, el histórico hasta
+    ahora). Lanza ValueError con un mensaje para el cliente si los
+    parámetros no son válidos.
+    """
+    # Un parámetro vacío (?desde=) cuenta como ausente
+    texto_desde = request.GET.get("desde") or None
+    texto_hasta = request.GET.get("hasta") or None
+    texto_horas = request.GET.get("proximas_horas") or None
+    if texto_horas is not None:
+        if texto_desde or texto_hasta:
+            raise ValueError("proximas_horas no se combina con desde/hasta")
+        try:
+            horas = int(texto_horas)
+        except ValueError:
+            horas = 0
+        if not 1 <= horas <= MAX_DIAS_RANGO * 24:
+            raise ValueError(f"proximas_horas debe estar entre 1 y {MAX_DIAS_RANGO * 24}")
+        # Desde el comienzo de la hora en curso (incluye la fila actual)
+        ahora = int(time.time())
+        desde = ahora - ahora % 3600
+        return desde, desde + horas * 3600
+    if texto_desde is None and texto_hasta is None:
+        return None, None
+
+    try:
+        # Sin desde: los 7 días previos a hasta (o a ahora)
+        hasta = parsear_limite(texto_hasta, fin=True) if texto_hasta else None
+        referencia = hasta if hasta is not None else int(time.time()) + 1
+        desde = parsear_limite(texto_desde) if texto_desde else referencia - 7 * 86400
+    except ValueError:
+        raise ValueError("Parámetros desde/hasta inválidos")
+    if hasta is not None:
+        _validar_rango(desde, hasta)
+    return desde, hasta
+
+
+def _campos_pedidos(request) -> Optional[list]:
+    """Columnas de ?campos=a,b (None si no se pidió proyección)."""
+    texto = request.GET.get("campos")
+    if texto is None:
+        return None
+    return [c.strip() for c in texto.split(",") if c.strip()]
+
+
+def _proyectar(filas: list, campos: Optional[list]) -> list:
+    """Quedarse con fecha/hora y los campos pedidos de cada fila."""
+    if campos is None:
+        return filas
+    elegidos = [c for c in COLUMNAS if c in CAMPOS_TIEMPO or c in campos]
+    return [{c: fila[c] for c in elegidos} for fila in filas]
+
+
+def _responder_payload(datos: dict, formato: str):
+    """Codificar el payload (filas o ya columnar) en el formato pedido."""
+    if formato == "json":
+        return HttpResponse(codificar_compacto(datos), content_type=FORMATOS["json"][1])
+    if isinstance(datos.get("datos"), list):
+        datos = a_columnar(datos)
+    if formato == "msgpack":
+        if msgpack is None:
+            return JsonResponse({"error": "MessagePack no disponible"}, status=406)
+        return HttpResponse(msgpack.packb(datos, use_bin_type=True),
+                            content_type=FORMATOS["msgpack"][1])
+    return HttpResponse(codificar_compacto(datos), content_type=FORMATOS["columnar"][1])
+
+
+def _responder_rango(request, estacion_id: str, formato: str, cache_dir: Path,
+                     desde: int, hasta: int, campos: Optional[list]):
+    """Responder filas del histórico en [desde, hasta)."""
+    if campos is not None:
+        desconocidos = [c for c in campos if c not in COLUMNAS]
+        if desconocidos:
+            return JsonResponse({"error": f"Campos desconocidos: {', '.join(desconocidos)}"}, status=400)
+
+    # Streaming solo en JSON: columnar y msgpack necesitan todas las filas
+    if _pide_stream(request) and formato == "json":
+        ruta = ruta_historico(cache_dir)
+        if not ruta.exists():
+            return JsonResponse({"error": "Histórico no disponible"}, status=404)
+        tandas = (_proyectar(filas, campos)
+                  for filas in iterar_rango(ruta, estacion_id, desde, hasta))
+        return StreamingHttpResponse(_json_por_tandas(desde, hasta, tandas),
+                                     content_type=FORMATOS["json"][1])
+
+    filas = consultar_rango(ruta_historico(cache_dir), estacion_id, desde, hasta)
+    if filas is None:
+        return JsonResponse({"error": "Histórico no disponible"}, status=404)
+
+    datos = {"desde": a_iso(desde), "hasta": a_iso(hasta), "datos": _proyectar(filas, campos)}
+    return _responder_payload(datos, formato)
+
+
+def _responder_filtrado(request, estacion_id: str, formato: str, resolucion: str,
+                        cache_dir: Path):
+    """Recortar por tiempo y columnas sobre la serie en memoria o el histórico."""
+    try:
+        desde, hasta = _limites(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    campos = _campos_pedidos(request)
+
+    try:
+        serie = cache_series.obtener(cache_dir, estacion_id, resolucion)
+    except FileNotFoundError:
+        serie = None
+
+    # Rangos que empiezan antes de la ventana del job: histórico (solo horaria)
+    pasado = desde is not None and not request.GET.get("proximas_horas") and (
+        serie is None or not serie.instantes or desde < serie.instantes[0])
+    if pasado:
+        if resolucion != "horaria":
+            return JsonResponse(
+                {"error": "El histórico se sirve solo con resolución horaria"}, status=400)
+        # Sin hasta, el histórico llega hasta ahora
+        if hasta is None:
+            hasta = int(time.time()) + 1
+            try:
+                _validar_rango(desde, hasta)
+            except ValueError as e:
+                return JsonResponse({"error": str(e)}, status=400)
+        return _responder_rango(request, estacion_id, formato, cache_dir, desde, hasta, campos)
+    if serie is None:
+        return JsonResponse({"error": f"Archivo no encontrado para estación {estacion_id} ({resolucion})"}, status=404)
+
+    if campos is not None:
+        desconocidos = [c for c in campos if c not in serie.columnas]
+        if desconocidos:
+            return JsonResponse({"error": f"Campos desconocidos: {', '.join(desconocidos)}"}, status=400)
+
+    i, j = serie.rango(desde, hasta)
+    datos = {} if desde is None else {"desde": a_iso(desde),
+                                      "hasta": a_iso(hasta) if hasta is not None else None}
+    datos["datos"] = serie.filas(i, j, campos) if formato == "json" else serie.columnar(i, j, campos)
+    return _responder_payload(datos, formato)
+
 
 # ===============================
 # Vista: obtener alturas por estación
 # ===============================
 
 
+@medir_vista("alturas")
 def obtener_alturas_estacion(request, estacion_id):
     """
     Devolver JSON de alturas para la estación indicada.
-    Ejemplo: /marea/alturas/san_fernando/
+    Ejemplo: /marea/alturas/san_fernando/?formato=columnar
+             /marea/alturas/san_fernando/?resolucion=3h
+             /marea/alturas/san_fernando/?desde=2025-08-01&hasta=2025-08-07
+             /marea/alturas/san_fernando/?proximas_horas=12&campos=altura_promedio
+             /marea/alturas/san_fernando/?stream=1
     """
     try:
+        formato = _formato_pedido(request)
+        if formato not in FORMATOS:
+            return JsonResponse({"error": f"Formato no soportado: {formato}"}, status=400)
+        resolucion = request.GET.get("resolucion") or "horaria"
+        if resolucion not in RESOLUCIONES:
+            return JsonResponse({"error": f"Resolución no soportada: {resolucion}"}, status=400)
+
         # Determinar directorio de cache según entorno
-        if os.environ.get("RAILWAY_ENVIRONMENT"):
-            # Producción (Railway)
-            cache_dir = Path("/app/marea/cache")
-        else:
-            cache_dir = Path(__file__).resolve(
-            ).parents[2] / "marea" / "cache"  # Desarrollo local
-
-        # Construir ruta del archivo de la estación
-        archivo = cache_dir / f"marea_{estacion_id}.json"
-
-        # Validar existencia del archivo
-        if not archivo.exists():
-            return JsonResponse({"error": f"Archivo no encontrado para estación {estacion_id}"}, status=404)
-
-        # Leer y devolver contenido JSON
-        with open(archivo, "r", encoding="utf-8") as f:
-            datos = json.load(f)
-            return JsonResponse(datos, safe=False)
+        cache_dir = directorio_cache()
+
+        # Recorte por tiempo o columnas: serie en memoria o histórico
+        if any(p in request.GET for p in PARAMETROS_FILTRO):
+            return _responder_filtrado(request, estacion_id, formato, resolucion, cache_dir)
+
+        # Construir ruta del archivo de la estación en el formato pedido
+        archivo = archivo_estacion(cache_dir, estacion_id, formato, resolucion)
+
+        # Enviar desde disco sin cargar el cuerpo en la cache del worker
+        if _pide_stream(request):
+            try:
+                return responder_archivo(request, archivo, content_type=FORMATOS[formato][1],
+                                         vary="Accept, Accept-Encoding")
+            except FileNotFoundError:
+                return JsonResponse({"error": f"Archivo no encontrado para estación {estacion_id} ({formato}, {resolucion})"}, status=404)
+
+        # Obtener cuerpo ya codificado (se relee solo si cambió el archivo);
+        # columnar/msgpack ya están minificados y se sirven tal cual
+        cargar = cargar_json if formato == "json" else cargar_crudo
+        try:
+            entrada = cache_respuestas.obtener(archivo, cargar)
+        except FileNotFoundError:
+            return JsonResponse({"error": f"Archivo no encontrado para estación {estacion_id} ({formato}, {resolucion})"}, status=404)
+
+        return responder(request, entrada, content_type=FORMATOS[formato][1],
+                         vary="Accept, Accept-Encoding")
+
+    except Exception as e:
+        # Responder error genérico controlado
+        return JsonResponse({"error": f"Error al cargar datos: {str(e)}"}, status=500)
+
+
+# ===============================
+# Vista: varias estaciones en una respuesta
+# ===============================
+
+
+@medir_vista("alturas_lote")
+def obtener_alturas_lote(request):
+    """
+    Devolver alturas de varias estaciones en un solo objeto JSON.
+    Ejemplo: /marea/alturas/?ids=san_fernando,rosario&resolucion=3h
+    Respuesta: {"estaciones": {id: <payload de la estación>}, "faltantes": [ids]}
+    """
+    try:
+        formato = _formato_pedido(request)
+        if formato not in ("json", "columnar"):
+            return JsonResponse({"error": "El lote se sirve solo en json o columnar"}, status=400)
+        resolucion = request.GET.get("resolucion") or "horaria"
+        if resolucion not in RESOLUCIONES:
+            return JsonResponse({"error": f"Resolución no soportada: {resolucion}"}, status=400)
+
+        # Ids sin repetir, en el orden pedido
+        ids = list(dict.fromkeys(
+            i.strip() for i in request.GET.get("ids", "").split(",") if i.strip()))
+        if not ids:
+            return JsonResponse({"error": "Indicar estaciones con ?ids=a,b,c"}, status=400)
+        if len(ids) > MAX_LOTE:
+            return JsonResponse({"error": f"Máximo {MAX_LOTE} estaciones por lote"}, status=400)
+        invalidos = [i for i in ids if not PATRON_ID.match(i)]
+        if invalidos:
+            return JsonResponse({"error": f"Estaciones inválidas: {', '.join(invalidos)}"}, status=400)
+
+        # Reunir los cuerpos ya codificados; las que no tienen cache se informan
+        cache_dir = directorio_cache()
+        cargar = cargar_json if formato == "json" else cargar_crudo
+        entradas, faltantes = {}, []
+        for estacion_id in ids:
+            archivo = archivo_estacion(cache_dir, estacion_id, formato, resolucion)
+            try:
+                entradas[estacion_id] = cache_respuestas.obtener(archivo, cargar)
+            except FileNotFoundError:
+                faltantes.append(estacion_id)
+        if not entradas:
+            return JsonResponse({"error": "Ninguna estación tiene datos en cache",
+                                 "faltantes": faltantes}, status=404)
+
+        return responder_lote(request, entradas, faltantes,
+                              content_type=FORMATOS[formato][1], vary="Accept, Accept-Encoding")
 
     except Exception as e:
         # Responder error genérico controlado
@@ -5,6 +5,8 @@
 #
 # Supuestos:
 #   - Archivo en: <BASE_DIR>/marea/scripts/data/estaciones.json
+#   - Cuerpo, ETag y variantes comprimidas se cachean en memoria y se
+#     recalculan solo si cambia el archivo (304 Not Modified).
 # ================================================================
 
 """
@@ -14,13 +16,16 @@ Listar estaciones de medición desde el archivo estático.
 from django.conf import settings
 from django.http import JsonResponse
 from pathlib import Path
-import json
+
+from app_mareas.cache_respuestas import cache_respuestas, responder
+from app_mareas.metricas import medir_vista
 
 # ===============================
 # Vista: listar todas las estaciones
 # ===============================
 
 
+@medir_vista("estaciones")
 def listar_estaciones(request):
     """
     Devolver contenido de estaciones.json.
@@ -31,14 +36,13 @@ def listar_estaciones(request):
         archivo = Path(settings.BASE_DIR) / "marea" / \
             "scripts" / "data" / "estaciones.json"
 
-        # Validar existencia
-        if not archivo.exists():
+        # Obtener cuerpo ya codificado (se relee solo si cambió el archivo)
+        try:
+            entrada = cache_respuestas.obtener(archivo)
+        except FileNotFoundError:
             return JsonResponse({"error": "Archivo estaciones.json no encontrado"}, status=404)
 
-        # Leer y devolver JSON
-        with open(archivo, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return JsonResponse(data, safe=False)
+        return responder(request, entrada)
 
     except Exception as e:
         # Responder error controlado
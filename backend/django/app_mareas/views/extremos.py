@@ -0,0 +1,68 @@
+# ================================================================
+# Endpoint Django ejemplo
+#
+# Propósito: exponer pleamares y bajamares precalculadas por estación.
+#
+# Entradas/supuestos:
+#   - Archivo generado por el job en <cache>/marea_<estacion_id>.extremos.json
+#     (ver scripts/jobs/extremos.py).
+#   - Sin parámetros se sirve el archivo tal cual (cuerpo en memoria,
+#     ETag, 304 y gzip/brotli como en alturas).
+#   - ?proximos=N devuelve solo los N extremos siguientes a la hora actual.
+# ================================================================
+
+"""
+Exponer pleamares/bajamares cacheadas por estación.
+"""
+
+import json
+from datetime import datetime, timezone
+
+from django.http import JsonResponse
+
+from app_mareas.cache_mareas import archivo_extremos, directorio_cache
+from app_mareas.cache_respuestas import cache_respuestas, responder
+from app_mareas.metricas import medir_vista
+
+# ===============================
+# Vista: obtener extremos por estación
+# ===============================
+
+
+@medir_vista("extremos")
+def obtener_extremos_estacion(request, estacion_id):
+    """
+    Devolver pleamares/bajamares de la estación indicada.
+    Ejemplo: /marea/extremos/san_fernando/?proximos=2
+    """
+    try:
+        proximos = request.GET.get("proximos")
+        if proximos is not None:
+            try:
+                proximos = int(proximos)
+            except ValueError:
+                proximos = 0
+            if proximos < 1:
+                return JsonResponse({"error": "proximos debe ser un entero positivo"}, status=400)
+
+        archivo = archivo_extremos(directorio_cache(), estacion_id)
+        try:
+            entrada = cache_respuestas.obtener(archivo)
+        except FileNotFoundError:
+            return JsonResponse({"error": f"Extremos no encontrados para estación {estacion_id}"}, status=404)
+
+        if proximos is None:
+            return responder(request, entrada)
+
+        # Filtrar sobre el cuerpo ya en memoria (unas decenas de extremos)
+        ahora = datetime.now(timezone.utc)
+        extremos = [
+            e for e in json.loads(entrada.cuerpo).get("extremos", [])
+            if datetime.fromisoformat(e["instante"]) >= ahora
+        ]
+        return JsonResponse({"extremos": extremos[:proximos]},
+                            json_dumps_params={"ensure_ascii": False})
+
+    except Exception as e:
+        # Responder error genérico controlado
+        return JsonResponse({"error": f"Error al cargar extremos: {str(e)}"}, status=500)
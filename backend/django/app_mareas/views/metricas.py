@@ -0,0 +1,94 @@
+# ================================================================
+# Endpoint Django ejemplo
+#
+# Propósito: exponer métricas del proceso en formato de texto Prometheus.
+#
+# Contenido:
+#   - marea_vista_*: duración y códigos de respuesta de cada vista.
+#   - marea_tramo_segundos: etapas del job si corrió en este proceso
+#     (POST /marea/actualizar-mareas/).
+#   - marea_cache_respuestas_*: ocupación (gauge) y aciertos, fallos y
+#     descartes (counter, sufijo _total) de la caché en memoria.
+#   - marea_http_*_total: contadores del cliente HTTP por endpoint (solo
+#     si el job ya se usó en este proceso).
+#
+# Autenticación (opcional):
+#   - Si MAREA_METRICAS_TOKEN está definido se exige
+#     Authorization: Bearer <token>.
+#
+# Nota: las métricas son por proceso (cada worker expone las suyas).
+# ================================================================
+
+"""
+Exponer métricas del servicio para Prometheus.
+"""
+
+import hmac
+import os
+import sys
+
+from django.http import HttpResponse
+
+from app_mareas.cache_respuestas import cache_respuestas
+from app_mareas.metricas import registro
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Contadores acumulados de la caché de respuestas; el resto es ocupación
+CONTADORES_CACHE = ("aciertos", "fallos", "descartes")
+
+# Contador del cliente HTTP -> nombre exportado
+CONTADORES_HTTP = {
+    "solicitudes": "marea_http_solicitudes_total",
+    "errores": "marea_http_errores_total",
+    "reintentos": "marea_http_reintentos_total",
+    "bytes": "marea_http_bytes_total",
+    "latencia_total_s": "marea_http_latencia_segundos_total",
+}
+
+# ===============================
+# Vista: métricas
+# ===============================
+
+
+def _autorizado(request) -> bool:
+    """Validar el token Bearer si MAREA_METRICAS_TOKEN está configurado."""
+    esperado = os.getenv("MAREA_METRICAS_TOKEN", "")
+    if not esperado:
+        return True
+    auth = request.META.get("HTTP_AUTHORIZATION", "")
+    provisto = auth[7:].strip() if auth.startswith("Bearer ") else ""
+    return hmac.compare_digest(provisto, esperado)
+
+
+def _metricas_externas() -> list:
+    """Líneas de la caché de respuestas y del cliente HTTP del job."""
+    lineas = []
+    for clave, valor in cache_respuestas.estadisticas().items():
+        if clave in CONTADORES_CACHE:
+            nombre, tipo = f"marea_cache_respuestas_{clave}_total", "counter"
+        else:
+            nombre, tipo = f"marea_cache_respuestas_{clave}", "gauge"
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        lineas.append(f"{nombre} {valor}")
+
+    # No importar el job desde aquí: arrastraría pandas al worker web
+    modulo = sys.modules.get("app_mareas.scripts.jobs.http_cliente")
+    if modulo is not None:
+        estadisticas = modulo.cliente_http.estadisticas()
+        for clave, nombre in CONTADORES_HTTP.items():
+            lineas.append(f"# TYPE {nombre} counter")
+            for endpoint, m in sorted(estadisticas.items()):
+                lineas.append(f'{nombre}{{endpoint="{endpoint}"}} {m[clave]}')
+    return lineas
+
+
+def metricas(request):
+    """
+    Devolver métricas en formato de texto Prometheus.
+    Ruta: /marea/metricas/
+    """
+    if not _autorizado(request):
+        return HttpResponse("Unauthorized\n", status=401, content_type=CONTENT_TYPE)
+    cuerpo = registro.exportar() + "\n".join(_metricas_externas()) + "\n"
+    return HttpResponse(cuerpo, content_type=CONTENT_TYPE)
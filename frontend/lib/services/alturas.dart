@@ -2,10 +2,20 @@
 // Cliente HTTP para obtener alturas de marea por estación desde el backend.
 // Qué hace:
 // - Construye la URL /marea/alturas/<estacion>/ usando `baseUrl` (inyectable).
+// - `resolucion` opcional: 'horaria' (default), '3h' o 'diaria' para gráficos
+//   chicos que no necesitan la serie completa.
+// - `proximasHoras` y `campos` opcionales: el backend recorta la serie por
+//   tiempo y columnas (fecha y hora vienen siempre).
 // - Hace GET, parsea JSON y devuelve `List<dynamic>` en `data['datos']`.
+// - `obtenerAlturasLote` trae varias estaciones en un solo GET
+//   (/marea/alturas/?ids=a,b,c), p. ej. para precargar todas al iniciar.
 // - Lanza Exception con detalle en errores HTTP, de red o parsing.
 // Uso:
 // - `AlturasService().obtenerAlturasPorEstacion('san_fernando')`.
+// - `AlturasService().obtenerAlturasPorEstacion('san_fernando', resolucion: '3h')`.
+// - `AlturasService().obtenerAlturasPorEstacion('san_fernando',
+//       proximasHoras: 12, campos: ['altura_promedio'])`.
+// - `AlturasService().obtenerAlturasLote(['san_fernando', 'rosario'])`.
 // Testeo:
 // - Inyectar `baseUrl` a un mock server para pruebas.
 // Seguridad:
@@ -25,9 +35,16 @@ class AlturasService {
   AlturasService({this.baseUrl = backendBaseUrl});
 
   // Consultar alturas de una estación y devolver lista de registros.
-  Future<List<dynamic>> obtenerAlturasPorEstacion(String estacionId) async {
-    // Construir URL del recurso.
-    final url = Uri.parse('$baseUrl/marea/alturas/$estacionId/');
+  Future<List<dynamic>> obtenerAlturasPorEstacion(String estacionId,
+      {String resolucion = 'horaria', int? proximasHoras, List<String>? campos}) async {
+    // Construir URL del recurso (la resolución horaria es la del backend por defecto).
+    final parametros = {
+      if (resolucion != 'horaria') 'resolucion': resolucion,
+      if (proximasHoras != null) 'proximas_horas': '$proximasHoras',
+      if (campos != null) 'campos': campos.join(','),
+    };
+    final recurso = Uri.parse('$baseUrl/marea/alturas/$estacionId/');
+    final url = parametros.isEmpty ? recurso : recurso.replace(queryParameters: parametros);
 
     try {
       // Ejecutar GET al backend.
@@ -53,4 +70,38 @@ class AlturasService {
       throw Exception('Error al conectar con el servidor: $e');
     }
   }
+
+  // Consultar varias estaciones en un solo request y devolver
+  // {estación: registros}; las estaciones sin datos no aparecen.
+  Future<Map<String, List<dynamic>>> obtenerAlturasLote(List<String> estacionIds,
+      {String resolucion = 'horaria'}) async {
+    final parametros = {
+      'ids': estacionIds.join(','),
+      if (resolucion != 'horaria') 'resolucion': resolucion,
+    };
+    final url = Uri.parse('$baseUrl/marea/alturas/').replace(queryParameters: parametros);
+
+    try {
+      final respuesta = await http.get(url);
+
+      if (respuesta.statusCode == 200) {
+        final data = json.decode(respuesta.body);
+        final resultado = <String, List<dynamic>>{};
+        if (data is Map && data['estaciones'] is Map) {
+          (data['estaciones'] as Map).forEach((id, payload) {
+            if (payload is Map && payload['datos'] is List) {
+              resultado[id as String] = payload['datos'];
+            }
+          });
+        }
+        return resultado;
+      } else if (respuesta.statusCode == 404) {
+        return {}; // ninguna estación tiene datos todavía
+      } else {
+        throw Exception('Error ${respuesta.statusCode}: ${respuesta.body}');
+      }
+    } catch (e) {
+      throw Exception('Error al conectar con el servidor: $e');
+    }
+  }
 }